@@ -1,9 +1,13 @@
 """The nes-py NES emulator for Python 2 & 3."""
 from .nes_env import NESEnv
+from .nes_env import expand_palette
+from .movie import Movie
+from .vector_nes_env import VectorNESEnv
+from .subproc_vector_nes_env import SubprocVectorNESEnv
 
 from .wrappers.vision_only import VisionOnlyNES
 from .wrappers.pixel_reward import PixelShiftReward
 
 
 # explicitly define the outward facing API of this package
-__all__ = [NESEnv.__name__, "VisionOnlyNES", "PixelShiftReward"]
+__all__ = [NESEnv.__name__, expand_palette.__name__, Movie.__name__, VectorNESEnv.__name__, SubprocVectorNESEnv.__name__, "VisionOnlyNES", "PixelShiftReward"]
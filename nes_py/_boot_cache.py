@@ -0,0 +1,106 @@
+"""A persistent on-disk cache of the states that boot scripts reach."""
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+
+# the button bitmap of the START button
+_START = 0b00001000
+
+
+# the default boot script: wait for the title screen, press START, and wait
+# for the game to start (one action per frame)
+DEFAULT_BOOT_SCRIPT = (0,) * 60 + (_START,) * 5 + (0,) * 180
+
+
+# the default directory of the cache (overridden by $NESPY_BOOT_CACHE)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'nes-py', 'boot')
+
+
+def cache_dir():
+    """Return the directory of the boot state cache."""
+    return os.environ.get('NESPY_BOOT_CACHE', DEFAULT_CACHE_DIR)
+
+
+def script_bytes(script):
+    """
+    Return a boot script as bytes.
+
+    Args:
+        script (iterable): the button bitmap to hold for each frame
+
+    Returns:
+        (bytes) the boot script with a byte per frame
+
+    """
+    script = np.asarray(list(script), dtype=np.int64)
+    if script.ndim != 1 or ((script < 0) | (script > 255)).any():
+        raise ValueError('boot_script must be a sequence of actions in [0, 255]')
+    return script.astype(np.uint8).tobytes()
+
+
+def boot_state_path(directory, rom, script, core):
+    """
+    Return the path to the boot state of a ROM and boot script.
+
+    Args:
+        directory (str): the directory of the cache
+        rom (numpy.ndarray): the bytes of the ROM file
+        script (bytes): the boot script from `script_bytes`
+        core (bytes): an identifier of the emulator core, so states of other
+            versions of the core miss the cache
+
+    Returns:
+        (str) the path to the file of the boot state
+
+    """
+    digest = hashlib.sha256()
+    for part in (np.ascontiguousarray(rom).tobytes(), script, core):
+        digest.update(hashlib.sha256(part).digest())
+    return os.path.join(directory, digest.hexdigest() + '.state')
+
+
+def read_state(path):
+    """
+    Return the state in a file of the cache.
+
+    Args:
+        path (str): the path to the file of the state
+
+    Returns:
+        (bytes) the state, or None if the file does not exist
+
+    """
+    try:
+        with open(path, 'rb') as state_file:
+            return state_file.read()
+    except OSError:
+        return None
+
+
+def write_state(path, state):
+    """
+    Write a state to a file of the cache.
+
+    The file is replaced atomically, so workers that boot concurrently never
+    read a partial state.
+
+    Args:
+        path (str): the path to the file of the state
+        state (bytes): the state to write
+
+    Returns:
+        None
+
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as state_file:
+            state_file.write(state)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
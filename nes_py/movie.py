@@ -0,0 +1,165 @@
+"""Movies of the controller inputs of an NES emulator."""
+import bisect
+import struct
+import zlib
+import numpy as np
+
+
+class Movie(object):
+    """
+    The controller inputs of every frame of a run with periodic keyframes.
+
+    A movie starts from a binary state (see `NESEnv.get_state`) and holds
+    the button bitmaps of both controllers for each frame, so replaying it
+    from the state deterministically reproduces the run. Further binary
+    states (keyframes) every few frames let `NESEnv.seek` reach any frame
+    by re-simulating at most `keyframe_interval` frames.
+
+    """
+
+    # the magic number at the start of a movie file
+    MAGIC = b'NESM'
+    # the version of the movie file format
+    VERSION = 1
+    # the header: magic, version, keyframe interval, frames, keyframes
+    _HEADER = struct.Struct('<4sIIII')
+    # the header of a keyframe: the frame it precedes and its size
+    _KEYFRAME = struct.Struct('<II')
+
+    def __init__(self, inputs, keyframes, keyframe_interval):
+        """
+        Initialize a new movie.
+
+        Args:
+            inputs (numpy.ndarray): the button bitmaps of the 2 controllers
+                for each frame, with shape (frames, 2)
+            keyframes (list): the (frame, state) pairs of the binary states
+                that precede frames, including the state of frame 0
+            keyframe_interval (int): the number of frames between keyframes
+
+        Returns:
+            None
+
+        """
+        self.inputs = np.asarray(inputs, dtype=np.uint8).reshape(-1, 2)
+        self.keyframes = sorted((int(frame), bytes(state)) for frame, state in keyframes)
+        if not self.keyframes or self.keyframes[0][0] != 0:
+            raise ValueError('a movie needs the state of its first frame')
+        if self.keyframes[-1][0] > len(self.inputs):
+            raise ValueError('a keyframe of the movie is past its last frame')
+        self.keyframe_interval = int(keyframe_interval)
+
+    def __len__(self):
+        """Return the number of frames in the movie."""
+        return len(self.inputs)
+
+    def __repr__(self):
+        """Return a debugging representation of the movie."""
+        msg = '{}(frames={}, keyframes={})'
+        return msg.format(self.__class__.__name__, len(self), len(self.keyframes))
+
+    @property
+    def start_state(self):
+        """Return the binary state that the movie starts from."""
+        return self.keyframes[0][1]
+
+    def keyframe(self, frame):
+        """
+        Return the last keyframe before a frame.
+
+        Args:
+            frame (int): the number of frames into the movie
+
+        Returns:
+            (tuple) the frame the keyframe precedes and its binary state. The
+            keyframe precedes `frame` strictly unless `frame` is 0, so
+            seeking draws at least one frame
+
+        """
+        frames = [keyframe_frame for keyframe_frame, _ in self.keyframes]
+        index = max(bisect.bisect_left(frames, frame) - 1, 0)
+        return self.keyframes[index]
+
+    def to_bytes(self):
+        """
+        Serialize the movie to compressed bytes.
+
+        Returns:
+            (bytes) the movie file
+
+        """
+        header = self._HEADER.pack(self.MAGIC, self.VERSION,
+            self.keyframe_interval, len(self.inputs), len(self.keyframes)
+        )
+        parts = [self.inputs.tobytes()]
+        for frame, state in self.keyframes:
+            parts.append(self._KEYFRAME.pack(frame, len(state)))
+            parts.append(state)
+        return header + zlib.compress(b''.join(parts))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Deserialize a movie from bytes.
+
+        Args:
+            data (bytes): a movie file from `to_bytes`
+
+        Returns:
+            (Movie) the movie
+
+        """
+        data = bytes(data)
+        if len(data) < cls._HEADER.size:
+            raise ValueError('data is not a movie')
+        magic, version, interval, frames, count = cls._HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError('data is not a movie of this version')
+        try:
+            payload = zlib.decompress(data[cls._HEADER.size:])
+            inputs = np.frombuffer(payload, dtype=np.uint8, count=2 * frames)
+            offset = inputs.size
+            keyframes = []
+            for _ in range(count):
+                frame, size = cls._KEYFRAME.unpack_from(payload, offset)
+                offset += cls._KEYFRAME.size
+                keyframes.append((frame, payload[offset:offset + size]))
+                offset += size
+        except (zlib.error, struct.error, ValueError) as error:
+            raise ValueError('the movie is corrupt') from error
+        if offset != len(payload):
+            raise ValueError('the movie is corrupt')
+        return cls(inputs, keyframes, interval)
+
+    def save(self, path):
+        """
+        Write the movie to a file.
+
+        Args:
+            path (str): the path to the file to write
+
+        Returns:
+            None
+
+        """
+        with open(path, 'wb') as movie_file:
+            movie_file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a movie from a file.
+
+        Args:
+            path (str): the path to the file from `save`
+
+        Returns:
+            (Movie) the movie
+
+        """
+        with open(path, 'rb') as movie_file:
+            return cls.from_bytes(movie_file.read())
+
+
+# explicitly define the outward facing API of this module
+__all__ = [Movie.__name__]
@@ -8,19 +8,25 @@
 #ifndef CARTRIDGE_HPP
 #define CARTRIDGE_HPP
 
+#include <cstddef>
+#include <memory>
 #include <vector>
 #include <string>
 #include "common.hpp"
+#include "pattern_cache.hpp"
 
 namespace NES {
 
-/// A cartridge holding game ROM and a special hardware mapper emulation
+/// A cartridge holding game ROM and a special hardware mapper emulation.
+/// Copies of a cartridge share its read-only ROM data and decoded patterns
 class Cartridge {
  private:
     /// the PRG ROM
-    std::vector<NES_Byte> prg_rom;
+    std::shared_ptr<const std::vector<NES_Byte>> prg_rom;
     /// the CHR ROM
-    std::vector<NES_Byte> chr_rom;
+    std::shared_ptr<const std::vector<NES_Byte>> chr_rom;
+    /// the decoded patterns of the CHR ROM
+    std::shared_ptr<const PatternCache> chr_patterns;
     /// the name table mirroring mode
     NES_Byte name_table_mirroring;
     /// the mapper ID number
@@ -31,18 +37,24 @@ class Cartridge {
  public:
     /// Initialize a new cartridge
     Cartridge() :
+        prg_rom(std::make_shared<std::vector<NES_Byte>>()),
+        chr_rom(std::make_shared<std::vector<NES_Byte>>()),
+        chr_patterns(std::make_shared<PatternCache>()),
         name_table_mirroring(0),
         mapper_number(0),
         has_extended_ram(false) { }
 
     /// Return the ROM data.
-    const inline std::vector<NES_Byte>& getROM() { return prg_rom; }
+    const inline std::vector<NES_Byte>& getROM() const { return *prg_rom; }
 
     /// Return the VROM data.
-    const inline std::vector<NES_Byte>& getVROM() { return chr_rom; }
+    const inline std::vector<NES_Byte>& getVROM() const { return *chr_rom; }
+
+    /// Return the decoded patterns of the VROM data.
+    const inline PatternCache& getVROMPatterns() const { return *chr_patterns; }
 
     /// Return the mapper ID number.
-    inline NES_Byte getMapper() { return mapper_number; }
+    inline NES_Byte getMapper() const { return mapper_number; }
 
     /// Return the name table mirroring mode.
     inline NES_Byte getNameTableMirroring() { return name_table_mirroring; }
@@ -52,6 +64,15 @@ class Cartridge {
 
     /// Load a ROM file into the cartridge and build the corresponding mapper.
     void loadFromFile(std::string path);
+
+    /// Load an iNES ROM image from memory into the cartridge. The ROM data
+    /// is shared with every other cartridge in the process with the same
+    /// data (see ROMCache), so the buffer may be released afterward.
+    ///
+    /// @param data a pointer to the bytes of the ROM image
+    /// @param size the number of bytes in the ROM image
+    ///
+    void loadFromBuffer(const NES_Byte* data, std::size_t size);
 };
 
 }  // namespace NES
@@ -9,6 +9,7 @@
 #define CONTROLLER_HPP
 
 #include "common.hpp"
+#include "state.hpp"
 
 namespace NES {
 
@@ -46,6 +47,24 @@ class Controller {
     /// @return a state from the controller
     ///
     NES_Byte read();
+
+    /// Write the state of the controller to a binary emulator state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    inline void save_state(StateWriter& writer) const {
+        writer.write(is_strobe);
+        writer.write(joypad_bits);
+    }
+
+    /// Read the state of the controller from a binary emulator state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    inline void load_state(StateReader& reader) {
+        reader.read(is_strobe);
+        reader.read(joypad_bits);
+    }
 };
 
 }  // namespace NES
@@ -8,9 +8,12 @@
 #ifndef CPU_HPP
 #define CPU_HPP
 
+#include <array>
+#include <utility>
 #include "common.hpp"
 #include "cpu_opcodes.hpp"
 #include "main_bus.hpp"
+#include "state.hpp"
 
 namespace NES {
 
@@ -82,43 +85,70 @@ class CPU {
 
     /// Execute an implied mode instruction.
     ///
+    /// @tparam opcode the opcode of the operation to perform
     /// @param bus the bus to read and write data from and to
-    /// @param opcode the opcode of the operation to perform
     /// @return true if the instruction succeeds
     ///
-    bool implied(MainBus &bus, NES_Byte opcode);
+    template <NES_Byte opcode>
+    bool implied(MainBus &bus);
 
     /// Execute a branch instruction.
     ///
+    /// @tparam opcode the opcode of the operation to perform
     /// @param bus the bus to read and write data from and to
-    /// @param opcode the opcode of the operation to perform
     /// @return true if the instruction succeeds
     ///
-    bool branch(MainBus &bus, NES_Byte opcode);
+    template <NES_Byte opcode>
+    bool branch(MainBus &bus);
 
     /// Execute a type 0 instruction.
     ///
+    /// @tparam opcode the opcode of the operation to perform
     /// @param bus the bus to read and write data from and to
-    /// @param opcode the opcode of the operation to perform
     /// @return true if the instruction succeeds
     ///
-    bool type0(MainBus &bus, NES_Byte opcode);
+    template <NES_Byte opcode>
+    bool type0(MainBus &bus);
 
     /// Execute a type 1 instruction.
     ///
+    /// @tparam opcode the opcode of the operation to perform
     /// @param bus the bus to read and write data from and to
-    /// @param opcode the opcode of the operation to perform
     /// @return true if the instruction succeeds
     ///
-    bool type1(MainBus &bus, NES_Byte opcode);
+    template <NES_Byte opcode>
+    bool type1(MainBus &bus);
 
     /// Execute a type 2 instruction.
     ///
+    /// @tparam opcode the opcode of the operation to perform
     /// @param bus the bus to read and write data from and to
-    /// @param opcode the opcode of the operation to perform
     /// @return true if the instruction succeeds
     ///
-    bool type2(MainBus &bus, NES_Byte opcode);
+    template <NES_Byte opcode>
+    bool type2(MainBus &bus);
+
+    /// Execute an instruction, decoding the opcode at compile time.
+    ///
+    /// @tparam opcode the opcode of the operation to perform
+    /// @param bus the bus to read and write data from and to
+    ///
+    template <NES_Byte opcode>
+    void execute(MainBus &bus);
+
+    /// a pointer to the method that executes an opcode
+    typedef void (CPU::*Instruction)(MainBus &bus);
+
+    /// Return the table of the methods that execute each opcode.
+    ///
+    /// @tparam opcodes the opcodes in the table
+    /// @return the methods that execute the opcodes, indexed by opcode
+    ///
+    template <std::size_t... opcodes>
+    static std::array<Instruction, sizeof...(opcodes)> instructions(std::index_sequence<opcodes...>);
+
+    /// the methods that execute each opcode, indexed by opcode
+    static const std::array<Instruction, 256> INSTRUCTIONS;
 
     /// Reset the emulator using the given starting address.
     ///
@@ -159,12 +189,35 @@ class CPU {
     ///
     void cycle(MainBus &bus);
 
+    /// Return the number of cycles before the CPU executes its next
+    /// instruction, during which it does not touch the bus.
+    inline int get_idle_cycles() const { return skip_cycles > 1 ? skip_cycles - 1 : 0; }
+
+    /// Run idle cycles, i.e., the same as calling `cycle` a number of times
+    /// that is at most `get_idle_cycles`.
+    ///
+    /// @param count the number of idle cycles to run
+    ///
+    inline void skip_idle_cycles(int count) { cycles += count; skip_cycles -= count; }
+
     /// Skip DMA cycles.
     ///
     /// 513 = 256 read + 256 write + 1 dummy read
     /// &1 -> +1 if on odd cycle
     ///
     inline void skip_DMA_cycles() { skip_cycles += 513 + (cycles & 1); }
+
+    /// Write the state of the CPU to a binary emulator state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    void save_state(StateWriter& writer) const;
+
+    /// Read the state of the CPU from a binary emulator state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    void load_state(StateReader& reader);
 };
 
 }  // namespace NES
@@ -8,17 +8,49 @@
 #ifndef EMULATOR_HPP
 #define EMULATOR_HPP
 
+#include <cstring>
+#include <memory>
 #include <string>
+#include <vector>
 #include "common.hpp"
 #include "cartridge.hpp"
 #include "controller.hpp"
 #include "cpu.hpp"
 #include "ppu.hpp"
 #include "main_bus.hpp"
+#include "observation.hpp"
+#include "movie_recorder.hpp"
+#include "rewind_buffer.hpp"
+#include "snapshot_store.hpp"
 #include "picture_bus.hpp"
 
 namespace NES {
 
+/// A snapshot of a state that the emulator restores repeatedly (the backup
+/// state and the states to reset to) with copies of the RGB screen and the
+/// observation, so restores copy them instead of drawing them again
+struct CachedSnapshot {
+    /// the state of the hardware and the screen of palette indexes
+    Snapshot snapshot;
+    /// the screen as packed 24-bit RGB
+    NES_Byte rgb_screen[VISIBLE_SCANLINES][SCANLINE_VISIBLE_DOTS][3];
+    /// the observation (null if the emulator had none)
+    std::unique_ptr<Observation> observation;
+
+    /// Initialize a new, empty cached snapshot.
+    CachedSnapshot() { }
+
+    /// Initialize a new cached snapshot as a copy of another.
+    ///
+    /// @param other the cached snapshot to copy
+    ///
+    CachedSnapshot(const CachedSnapshot& other) : snapshot(other.snapshot) {
+        std::memcpy(rgb_screen, other.rgb_screen, sizeof(rgb_screen));
+        if (other.observation)
+            observation.reset(new Observation(*other.observation));
+    }
+};
+
 /// An NES Emulator and OpenAI Gym interface
 class Emulator {
  private:
@@ -26,6 +58,8 @@ class Emulator {
     static const int CYCLES_PER_FRAME = 29781;
     /// the virtual cartridge with ROM and mapper data
     Cartridge cartridge;
+    /// the mapper of the cartridge (shared by the IO buses)
+    std::unique_ptr<Mapper> mapper;
     /// the 2 controllers on the emulator
     Controller controllers[2];
 
@@ -38,14 +72,113 @@ class Emulator {
     /// the emulators' PPU
     PPU ppu;
 
-    /// the main data bus of the emulator
-    MainBus backup_bus;
-    /// the picture bus from the PPU of the emulator
-    PictureBus backup_picture_bus;
-    /// The emulator's CPU
-    CPU backup_cpu;
-    /// the emulators' PPU
-    PPU backup_ppu;
+    /// the backup state of the emulator (null until the first backup)
+    std::unique_ptr<CachedSnapshot> backup_state;
+    /// the numbered snapshots of the emulator
+    SnapshotStore snapshots;
+    /// the history of keyframes and inputs to rewind with
+    RewindBuffer rewind_buffer;
+    /// the recorder of the inputs and keyframes of a movie
+    MovieRecorder movie;
+    /// the pool of states to reset to (shared with clones, so adding or
+    /// clearing states changes the pool of every clone)
+    std::shared_ptr<std::vector<std::shared_ptr<const CachedSnapshot>>> reset_states;
+
+    /// a copy of the second to last RGB frame of a multi-frame step
+    std::vector<NES_Byte> pool_buffer;
+    /// the screen as packed, row-major 24-bit RGB (refreshed after frames)
+    NES_Byte rgb_screen[VISIBLE_SCANLINES][SCANLINE_VISIBLE_DOTS][3];
+    /// the RGB screen that frames are drawn to (the RGB screen above unless
+    /// the owner provides a buffer, e.g., in memory shared between processes)
+    NES_Byte* rgb_output;
+    /// the small observation computed after frames (null when disabled)
+    std::unique_ptr<Observation> observation;
+    /// a copy of the second to last observation of a multi-frame step
+    std::vector<NES_Byte> pool_observation;
+
+    /// Connect the CPU, PPU, controllers, and mapper of the cartridge to the
+    /// IO buses.
+    void connect();
+
+    /// Write the header of a binary state of the emulator.
+    ///
+    /// @param writer the writer to append the header to
+    ///
+    void save_header(StateWriter& writer) const;
+
+    /// Write the state of the hardware (CPU, PPU, buses, mapper, and
+    /// controllers) to a binary state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    void save_hardware(StateWriter& writer) const;
+
+    /// Read the state of the hardware from a binary state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    void load_hardware(StateReader& reader);
+
+    /// Copy the state of the hardware and the screen into a snapshot.
+    ///
+    /// @param snapshot the snapshot to overwrite with the current state
+    ///
+    void save(Snapshot& snapshot) const;
+
+    /// Copy the state of the hardware and the screen from a snapshot.
+    ///
+    /// @param snapshot the snapshot to restore the state from
+    ///
+    void load(const Snapshot& snapshot);
+
+    /// Copy the state of the hardware and the screen of palette indexes from
+    /// a snapshot, leaving the RGB screen and the observation to the caller.
+    ///
+    /// @param snapshot the snapshot to restore the state from
+    ///
+    void load_without_drawing(const Snapshot& snapshot);
+
+    /// Copy the state of the hardware and the screens into a cached snapshot.
+    ///
+    /// @param cached the cached snapshot to overwrite with the current state
+    ///
+    void save(CachedSnapshot& cached) const;
+
+    /// Copy the state of the hardware and the screens from a cached snapshot.
+    /// The observation is drawn again only if it changed since the save.
+    ///
+    /// @param cached the cached snapshot to restore the state from
+    ///
+    void load(const CachedSnapshot& cached);
+
+    /// Record a frame in the rewind buffer and run it.
+    ///
+    /// @param render whether the PPU draws the frame to the screen
+    ///
+    void run_frame(bool render);
+
+    /// Run the CPU and PPU for a single frame.
+    ///
+    /// @param render whether the PPU draws the frame to the screen
+    ///
+    void emulate_frame(bool render);
+
+    /// Record the inputs of the next frame (and a keyframe before it if one
+    /// is due) in the rewind buffer.
+    void record_frame();
+
+    /// Record the inputs of the next frame (and a keyframe before it if one
+    /// is due) in the movie.
+    void record_movie_frame();
+
+    /// Look up the palette indexes of the PPU screen into the RGB screen.
+    void update_rgb_screen();
+
+    /// Update the RGB screen and the observation from the PPU screen.
+    inline void update_screens() {
+        update_rgb_screen();
+        if (observation) observation->update(get_screen_buffer());
+    }
 
  public:
     /// The width of the NES screen in pixels
@@ -59,11 +192,80 @@ class Emulator {
     ///
     explicit Emulator(std::string rom_path);
 
-    /// Return a 32-bit pointer to the screen buffer's first address.
+    /// Initialize a new emulator with an iNES ROM image in memory.
     ///
-    /// @return a 32-bit pointer to the screen buffer's first address
+    /// @param rom a pointer to the bytes of the ROM image (copied or shared
+    ///        from the ROM cache, so the buffer may be released afterward)
+    /// @param size the number of bytes in the ROM image
     ///
-    inline NES_Pixel* get_screen_buffer() { return ppu.get_screen_buffer(); }
+    Emulator(const NES_Byte* rom, std::size_t size);
+
+    /// Initialize a new emulator at the state of another emulator (including
+    /// its backup state, reset states, and observation, but not its numbered
+    /// slots or the buffer it draws the RGB screen to). The emulators share the read-only ROM data of the cartridge
+    /// and the reset states.
+    ///
+    /// @param other the emulator to clone
+    ///
+    Emulator(const Emulator& other);
+
+    /// the emulator wires callbacks to itself and cannot be assigned
+    Emulator& operator=(const Emulator&) = delete;
+
+    /// Return a pointer to the first address of the screen of 6-bit indexes
+    /// into the system palette.
+    ///
+    /// @return a pointer to the C-contiguous HEIGHT x WIDTH index screen
+    ///
+    inline NES_Byte* get_screen_buffer() { return ppu.get_screen_buffer(); }
+
+    /// Return a pointer to the first byte of the packed 24-bit RGB screen.
+    ///
+    /// @return a pointer to the C-contiguous HEIGHT x WIDTH x 3 RGB screen
+    ///
+    inline NES_Byte* get_rgb_screen_buffer() { return rgb_output; }
+
+    /// Draw the packed 24-bit RGB screen into a buffer owned by the caller
+    /// (which must outlive its use by the emulator) instead of the screen of
+    /// the emulator. The buffer receives the current screen immediately.
+    ///
+    /// @param buffer a pointer to a C-contiguous HEIGHT x WIDTH x 3 buffer,
+    ///        or null to draw to the screen of the emulator again
+    ///
+    inline void set_rgb_screen_buffer(NES_Byte* buffer) {
+        rgb_output = buffer ? buffer : **rgb_screen;
+        update_rgb_screen();
+    }
+
+    /// Compute an observation of a region of the screen after each frame.
+    ///
+    /// @param mode the kind of pixels in the observation
+    /// @param top the first row of the region (inclusive)
+    /// @param bottom the last row of the region (exclusive)
+    /// @param left the first column of the region (inclusive)
+    /// @param right the last column of the region (exclusive)
+    /// @param factor_y the number of rows in each output row (averaged for
+    ///        GRAY, otherwise the stride between rows)
+    /// @param factor_x the number of columns in each output column (averaged
+    ///        for GRAY, otherwise the stride between columns)
+    ///
+    void set_observation(
+        Observation::Mode mode,
+        int top,
+        int bottom,
+        int left,
+        int right,
+        int factor_y,
+        int factor_x
+    );
+
+    /// Return a pointer to the first address of the observation buffer.
+    ///
+    /// @return a pointer to the row-major observation (null when disabled)
+    ///
+    inline NES_Byte* get_observation_buffer() {
+        return observation ? observation->get_buffer() : nullptr;
+    }
 
     /// Return a 8-bit pointer to the RAM buffer's first address.
     ///
@@ -81,26 +283,208 @@ class Emulator {
     }
 
     /// Load the ROM into the NES.
-    inline void reset() { cpu.reset(bus); ppu.reset(); }
+    inline void reset() {
+        cpu.reset(bus);
+        ppu.reset();
+        rewind_buffer.clear();
+        movie.stop();
+        update_screens();
+    }
 
     /// Perform a step on the emulator, i.e., a single frame.
-    void step();
+    ///
+    /// @param render whether to draw the frame. when false, the frame keeps
+    ///        its timing (VBlank / NMI, scrolling, sprite-zero hits) but the
+    ///        screens keep the last drawn frame
+    ///
+    void step(bool render = true);
+
+    /// Perform a number of steps on the emulator with fixed controller input.
+    /// Only the frames that reach the screen (the last frame, or the last two
+    /// frames when max-pooling) are drawn.
+    ///
+    /// @param frames the number of frames to emulate
+    /// @param max_pool whether to replace the RGB screen and observation
+    ///        with the pixel-wise maximum of the last two frames (removes
+    ///        sprite flicker). an INDEX observation keeps the index of the
+    ///        brighter frame of each pixel. the index screen always holds the
+    ///        last frame
+    ///
+    void step(int frames, bool max_pool);
 
     /// Create a backup state on the emulator.
     inline void backup() {
-        backup_bus = bus;
-        backup_picture_bus = picture_bus;
-        backup_cpu = cpu;
-        backup_ppu = ppu;
+        if (!backup_state) backup_state.reset(new CachedSnapshot());
+        save(*backup_state);
+    }
+
+    /// Restore the backup state on the emulator (if there is one).
+    inline void restore() { if (backup_state) load(*backup_state); }
+
+    /// Save the state of the emulator to a numbered slot, evicting the least
+    /// recently used slots if the slots exceed their memory capacity.
+    ///
+    /// @param id the ID of the slot to save the state to
+    ///
+    inline void save_slot(int id) { save(snapshots.save(id)); }
+
+    /// Save the state of the emulator to a numbered slot as a delta that
+    /// stores only the pages of the state that differ from the full state in
+    /// another slot, evicting the least recently used slots if the slots
+    /// exceed their memory capacity.
+    ///
+    /// @param id the ID of the slot to save the state to
+    /// @param base the ID of the slot with the full state to compare to
+    /// @return true if the state was saved, false if the base slot is empty
+    ///         or holds a delta
+    ///
+    inline bool save_delta_slot(int id, int base) {
+        save(snapshots.get_buffer());
+        return snapshots.save_delta(id, base);
+    }
+
+    /// Load the state of the emulator from a numbered slot.
+    ///
+    /// @param id the ID of the slot to load the state from
+    /// @return true if the slot held a state, false if it is empty (or the
+    ///         state was evicted)
+    ///
+    inline bool load_slot(int id) {
+        auto snapshot = snapshots.load(id);
+        if (snapshot == nullptr)
+            return false;
+        load(*snapshot);
+        return true;
     }
 
-    /// Restore the backup state on the emulator.
-    inline void restore() {
-        bus = backup_bus;
-        picture_bus = backup_picture_bus;
-        cpu = backup_cpu;
-        ppu = backup_ppu;
+    /// Delete the state in a numbered slot.
+    ///
+    /// @param id the ID of the slot to delete
+    /// @return true if the slot held a state
+    ///
+    inline bool drop_slot(int id) { return snapshots.drop(id); }
+
+    /// Set the maximal number of bytes for the numbered slots to occupy.
+    ///
+    /// @param bytes the new capacity of the slots in bytes
+    ///
+    inline void set_slot_capacity(std::size_t bytes) { snapshots.set_capacity(bytes); }
+
+    /// Add the state of the emulator to the pool of states to reset to.
+    inline void add_reset_state() {
+        std::shared_ptr<CachedSnapshot> snapshot(new CachedSnapshot());
+        save(*snapshot);
+        reset_states->push_back(snapshot);
     }
+
+    /// Return the number of states in the pool of states to reset to.
+    inline int get_reset_state_count() const { return reset_states->size(); }
+
+    /// Remove the states in the pool of states to reset to.
+    inline void clear_reset_states() { reset_states->clear(); }
+
+    /// Load a state from the pool of states to reset to.
+    ///
+    /// @param index the index of the state in the pool
+    /// @return true if the state was loaded, false if the index is invalid
+    ///
+    inline bool load_reset_state(int index) {
+        if (index < 0 || index >= static_cast<int>(reset_states->size()))
+            return false;
+        load(*(*reset_states)[index]);
+        return true;
+    }
+
+    /// Record a keyframe every few frames and the inputs of every frame to
+    /// rewind with, clearing the history.
+    ///
+    /// @param interval the number of frames between keyframes (0 disables
+    ///        recording)
+    /// @param capacity the maximal number of bytes for the history to occupy
+    ///        (the newest keyframe is always kept)
+    ///
+    inline void set_rewind(int interval, std::size_t capacity) {
+        rewind_buffer.configure(interval, capacity);
+    }
+
+    /// Return the number of frames that can be rewound.
+    inline int get_rewind_frames() const { return rewind_buffer.get_frames(); }
+
+    /// Return the number of bytes occupied by the rewind history.
+    inline std::size_t get_rewind_usage() const { return rewind_buffer.get_usage(); }
+
+    /// Rewind the emulator by restoring the newest keyframe at or before a
+    /// number of frames ago and re-simulating the recorded inputs. The
+    /// history after the target frame is discarded.
+    ///
+    /// @param frames the number of frames to rewind
+    /// @return true if the emulator rewound, false if the history holds
+    ///         fewer frames
+    ///
+    bool rewind(int frames);
+
+    /// Start recording a movie of the controller inputs of every frame, with
+    /// a binary state (see save_state) before the first frame and every few
+    /// frames after it. Resetting, loading a state, or rewinding stops the
+    /// recording, as the movie cannot reproduce them.
+    ///
+    /// @param interval the number of frames between keyframes
+    ///
+    inline void start_movie(int interval) {
+        movie.start(interval);
+        save_state(movie.add_keyframe());
+    }
+
+    /// Stop recording the movie (the movie stays available).
+    inline void stop_movie() { movie.stop(); }
+
+    /// Return the recorded movie.
+    inline const MovieRecorder& get_movie() const { return movie; }
+
+    /// Play frames with recorded controller inputs.
+    ///
+    /// @param inputs the inputs of the 2 controllers (2 bytes per frame)
+    /// @param frames the number of frames to play
+    /// @param every the number of frames between copied observations
+    /// @param source the buffer of the emulator to copy the observations
+    ///        from (a screen or the observation buffer)
+    /// @param size the number of bytes in an observation
+    /// @param observations the buffer to copy an observation to after every
+    ///        `every` frames, or null to draw only the last frame
+    ///
+    void replay(
+        const NES_Byte* inputs,
+        int frames,
+        int every,
+        const NES_Byte* source,
+        std::size_t size,
+        NES_Byte* observations
+    );
+
+    /// Return the number of bytes occupied by the numbered slots.
+    inline std::size_t get_slot_usage() const { return snapshots.get_usage(); }
+
+    /// Serialize the state of the emulator to a compact, versioned binary
+    /// state. The state is portable across emulators of the same ROM.
+    ///
+    /// @param state the buffer to overwrite with the binary state
+    ///
+    void save_state(std::vector<NES_Byte>& state) const;
+
+    /// Deserialize the state of the emulator from a binary state.
+    ///
+    /// @param data a pointer to the binary state
+    /// @param size the number of bytes in the binary state
+    /// @return true if the state was loaded, false if it is not a valid state
+    ///         of this version for this ROM (the emulator is left unchanged)
+    ///
+    bool load_state(const NES_Byte* data, std::size_t size);
+
+    /// Return the number of bytes in a binary state of the emulator.
+    ///
+    /// @return the size of the binary state in bytes
+    ///
+    std::size_t state_size() const;
 };
 
 }  // namespace NES
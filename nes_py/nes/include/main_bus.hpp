@@ -9,9 +9,9 @@
 #define MAIN_BUS_HPP
 
 #include <vector>
-#include <unordered_map>
 #include "common.hpp"
 #include "mapper.hpp"
+#include "state.hpp"
 
 namespace NES {
 
@@ -30,21 +30,11 @@ enum IORegisters {
     JOY2 = 0x4017,
 };
 
-/// An enum functor object for calculating the hash of an enum class
-/// https://stackoverflow.com/questions/18837857/cant-use-enum-class-as-unordered-map-key
-struct EnumClassHash {
-    template <typename T>
-    std::size_t operator()(T t) const { return static_cast<std::size_t>(t); }
-};
-
-/// a type for write callback functions
-typedef std::function<void(NES_Byte)> WriteCallback;
-/// a map type from IORegsiters to WriteCallbacks
-typedef std::unordered_map<IORegisters, WriteCallback, EnumClassHash> IORegisterToWriteCallbackMap;
-/// a type for read callback functions
-typedef std::function<NES_Byte(void)> ReadCallback;
-/// a map type from IORegsiters to ReadCallbacks
-typedef std::unordered_map<IORegisters, ReadCallback, EnumClassHash> IORegisterToReadCallbackMap;
+// the devices behind the IO registers (defined in headers that include this)
+class CPU;
+class PPU;
+class PictureBus;
+class Controller;
 
 /// The main bus for data to travel along the NES hardware
 class MainBus {
@@ -55,14 +45,41 @@ class MainBus {
     std::vector<NES_Byte> extended_ram;
     /// a pointer to the mapper on the cartridge
     Mapper* mapper;
-    /// a map of IO registers to callback methods for writes
-    IORegisterToWriteCallbackMap write_callbacks;
-    /// a map of IO registers to callback methods for reads
-    IORegisterToReadCallbackMap read_callbacks;
+    /// the CPU to stall during OAM DMA
+    CPU* cpu;
+    /// the PPU behind the PPU registers
+    PPU* ppu;
+    /// the picture bus that the PPU accesses through PPUDATA
+    PictureBus* picture_bus;
+    /// the 2 controllers behind the joypad registers
+    Controller* controllers;
+    /// the number of cycles that the PPU lags behind the CPU
+    int ppu_lag;
+
+    /// Read a byte from a register of the PPU.
+    ///
+    /// @param address the address of the register (or a mirror of it)
+    /// @return the byte in the register
+    ///
+    NES_Byte read_ppu_register(NES_Address address);
+
+    /// Write a byte to a register of the PPU.
+    ///
+    /// @param address the address of the register (or a mirror of it)
+    /// @param value the byte to write to the register
+    ///
+    void write_ppu_register(NES_Address address, NES_Byte value);
 
  public:
     /// Initialize a new main bus.
-    MainBus() : ram(0x800, 0), mapper(nullptr) { }
+    MainBus() :
+        ram(0x800, 0),
+        mapper(nullptr),
+        cpu(nullptr),
+        ppu(nullptr),
+        picture_bus(nullptr),
+        controllers(nullptr),
+        ppu_lag(0) { }
 
     /// Return a 8-bit pointer to the RAM buffer's first address.
     ///
@@ -91,18 +108,50 @@ class MainBus {
     ///
     void set_mapper(Mapper* mapper);
 
-    /// Set a callback for when writes occur.
-    inline void set_write_callback(IORegisters reg, WriteCallback callback) {
-        write_callbacks.insert({reg, callback});
+    /// Connect the devices that the IO registers dispatch to.
+    ///
+    /// @param cpu the CPU to stall during OAM DMA
+    /// @param ppu the PPU behind the PPU registers
+    /// @param picture_bus the picture bus of the PPU
+    /// @param controllers the 2 controllers behind the joypad registers
+    ///
+    inline void set_devices(
+        CPU* cpu,
+        PPU* ppu,
+        PictureBus* picture_bus,
+        Controller* controllers
+    ) {
+        this->cpu = cpu;
+        this->ppu = ppu;
+        this->picture_bus = picture_bus;
+        this->controllers = controllers;
     }
 
-    /// Set a callback for when reads occur.
-    inline void set_read_callback(IORegisters reg, ReadCallback callback) {
-        read_callbacks.insert({reg, callback});
-    }
+    /// Let the PPU lag behind the CPU by more cycles. The bus runs the
+    /// cycles (see `sync_ppu`) before the CPU touches anything that the PPU
+    /// reads or writes, so the CPU can run ahead of the PPU in between.
+    ///
+    /// @param cycles the number of PPU cycles to defer
+    ///
+    inline void add_ppu_lag(int cycles) { ppu_lag += cycles; }
+
+    /// Run the PPU cycles that the PPU lags behind the CPU.
+    void sync_ppu();
 
     /// Return a pointer to the page in memory.
     const NES_Byte* get_page_pointer(NES_Byte page);
+
+    /// Write the state of the main bus to a binary emulator state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    void save_state(StateWriter& writer) const;
+
+    /// Read the state of the main bus from a binary emulator state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    void load_state(StateReader& reader);
 };
 
 }  // namespace NES
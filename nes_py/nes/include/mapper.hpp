@@ -11,6 +11,7 @@
 #include <functional>
 #include "common.hpp"
 #include "cartridge.hpp"
+#include "state.hpp"
 
 namespace NES {
 
@@ -36,6 +37,9 @@ class Mapper {
     ///
     explicit Mapper(Cartridge* game) : cartridge(game) { }
 
+    /// Destroy the mapper.
+    virtual ~Mapper() { }
+
     /// Return the name table mirroring mode of this mapper.
     inline virtual NameTableMirroring getNameTableMirroring() {
         return static_cast<NameTableMirroring>(cartridge->getNameTableMirroring());
@@ -65,12 +69,32 @@ class Mapper {
     ///
     virtual NES_Byte readCHR(NES_Address address) = 0;
 
+    /// Read the decoded pixels of a row of a pattern from the CHR RAM.
+    ///
+    /// @param address the 16-bit address of a byte of the row
+    /// @return a pointer to the 8 pixels of the row from left to right,
+    ///         followed by the 8 pixels from right to left
+    ///
+    virtual const NES_Byte* readCHRPattern(NES_Address address) = 0;
+
     /// Write a byte to an address in the CHR RAM.
     ///
     /// @param address the 16-bit address to write to
     /// @param value the byte to write to the given address
     ///
     virtual void writeCHR(NES_Address address, NES_Byte value) = 0;
+
+    /// Write the bank state and CHR RAM of the mapper to a binary state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    virtual void save_state(StateWriter& writer) const { }
+
+    /// Read the bank state and CHR RAM of the mapper from a binary state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    virtual void load_state(StateReader& reader) { }
 };
 
 }  // namespace NES
@@ -60,12 +60,34 @@ class MapperCNROM : public Mapper {
         return cartridge->getVROM()[address | (select_chr << 13)];
     }
 
+    /// Read the decoded pixels of a row of a pattern from the CHR RAM.
+    ///
+    /// @param address the 16-bit address of a byte of the row
+    /// @return a pointer to the 8 pixels of the row from left to right,
+    ///         followed by the 8 pixels from right to left
+    ///
+    inline const NES_Byte* readCHRPattern(NES_Address address) {
+        return cartridge->getVROMPatterns().get_row(address | (select_chr << 13));
+    }
+
     /// Write a byte to an address in the CHR RAM.
     ///
     /// @param address the 16-bit address to write to
     /// @param value the byte to write to the given address
     ///
     void writeCHR(NES_Address address, NES_Byte value);
+
+    /// Write the bank state and CHR RAM of the mapper to a binary state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    void save_state(StateWriter& writer) const;
+
+    /// Read the bank state and CHR RAM of the mapper from a binary state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    void load_state(StateReader& reader);
 };
 
 }  // namespace NES
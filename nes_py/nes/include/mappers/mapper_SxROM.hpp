@@ -46,6 +46,8 @@ class MapperSxROM : public Mapper {
     std::size_t second_bank_chr;
     /// The character RAM on the cartridge
     std::vector<NES_Byte> character_ram;
+    /// The decoded patterns of the character RAM
+    PatternCache character_patterns;
 
     /// TODO: what does this do
     void calculatePRGPointers();
@@ -91,6 +93,21 @@ class MapperSxROM : public Mapper {
             return cartridge->getVROM()[second_bank_chr + (address & 0xfff)];
     }
 
+    /// Read the decoded pixels of a row of a pattern from the CHR RAM.
+    ///
+    /// @param address the 16-bit address of a byte of the row
+    /// @return a pointer to the 8 pixels of the row from left to right,
+    ///         followed by the 8 pixels from right to left
+    ///
+    inline const NES_Byte* readCHRPattern(NES_Address address) {
+        if (has_character_ram)
+            return character_patterns.get_row(address);
+        else if (address < 0x1000)
+            return cartridge->getVROMPatterns().get_row(first_bank_chr + address);
+        else
+            return cartridge->getVROMPatterns().get_row(second_bank_chr + (address & 0xfff));
+    }
+
     /// Write a byte to an address in the CHR RAM.
     ///
     /// @param address the 16-bit address to write to
@@ -100,6 +117,18 @@ class MapperSxROM : public Mapper {
 
     /// Return the name table mirroring mode of this mapper.
     inline NameTableMirroring getNameTableMirroring() { return mirroring; }
+
+    /// Write the bank state and CHR RAM of the mapper to a binary state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    void save_state(StateWriter& writer) const;
+
+    /// Read the bank state and CHR RAM of the mapper from a binary state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    void load_state(StateReader& reader);
 };
 
 }  // namespace NES
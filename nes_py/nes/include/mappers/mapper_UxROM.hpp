@@ -24,6 +24,8 @@ class MapperUxROM : public Mapper {
     NES_Address select_prg;
     /// The character RAM on the mapper
     std::vector<NES_Byte> character_ram;
+    /// The decoded patterns of the character RAM
+    PatternCache character_patterns;
 
  public:
     /// Create a new mapper with a cartridge.
@@ -55,12 +57,32 @@ class MapperUxROM : public Mapper {
     ///
     NES_Byte readCHR(NES_Address address);
 
+    /// Read the decoded pixels of a row of a pattern from the CHR RAM.
+    ///
+    /// @param address the 16-bit address of a byte of the row
+    /// @return a pointer to the 8 pixels of the row from left to right,
+    ///         followed by the 8 pixels from right to left
+    ///
+    const NES_Byte* readCHRPattern(NES_Address address);
+
     /// Write a byte to an address in the CHR RAM.
     ///
     /// @param address the 16-bit address to write to
     /// @param value the byte to write to the given address
     ///
     void writeCHR(NES_Address address, NES_Byte value);
+
+    /// Write the bank state and CHR RAM of the mapper to a binary state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    void save_state(StateWriter& writer) const;
+
+    /// Read the bank state and CHR RAM of the mapper from a binary state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    void load_state(StateReader& reader);
 };
 
 }  // namespace NES
@@ -0,0 +1,93 @@
+//  Program:      nes-py
+//  File:         movie_recorder.hpp
+//  Description:  A recorder of controller inputs and keyframes for movies
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#ifndef MOVIE_RECORDER_HPP
+#define MOVIE_RECORDER_HPP
+
+#include <cstdint>
+#include <vector>
+#include "common.hpp"
+
+namespace NES {
+
+/// A recorder of the controller inputs of every frame (a movie) with a
+/// binary state (a keyframe) every few frames to seek with. The first
+/// keyframe is the state the movie starts from
+class MovieRecorder {
+ private:
+    /// the number of frames between keyframes (0 when not recording)
+    int interval;
+    /// the inputs of the 2 controllers for each frame
+    std::vector<NES_Byte> inputs;
+    /// the index of the frame each keyframe precedes
+    std::vector<int> keyframe_frames;
+    /// the binary state of each keyframe
+    std::vector<std::vector<NES_Byte>> keyframes;
+
+ public:
+    /// Initialize a new recorder that is not recording.
+    MovieRecorder() : interval(0) { }
+
+    /// Clear the movie and start recording.
+    ///
+    /// @param interval the number of frames between keyframes
+    ///
+    inline void start(int interval) {
+        this->interval = interval > 0 ? interval : 1;
+        inputs.clear();
+        keyframe_frames.clear();
+        keyframes.clear();
+    }
+
+    /// Stop recording (the movie stays available).
+    inline void stop() { interval = 0; }
+
+    /// Return true if the recorder is recording.
+    inline bool is_recording() const { return interval > 0; }
+
+    /// Return the number of recorded frames.
+    inline int get_frames() const { return inputs.size() / 2; }
+
+    /// Return true if the next frame needs a keyframe before it.
+    inline bool needs_keyframe() const { return get_frames() % interval == 0; }
+
+    /// Add a keyframe before the next frame.
+    ///
+    /// @return the buffer to write the binary state of the emulator to
+    ///
+    inline std::vector<NES_Byte>& add_keyframe() {
+        keyframe_frames.push_back(get_frames());
+        keyframes.emplace_back();
+        return keyframes.back();
+    }
+
+    /// Record the inputs of the controllers in the next frame.
+    ///
+    /// @param player_1 the button bitmap of the first controller
+    /// @param player_2 the button bitmap of the second controller
+    ///
+    inline void add_input(NES_Byte player_1, NES_Byte player_2) {
+        inputs.push_back(player_1);
+        inputs.push_back(player_2);
+    }
+
+    /// Return a pointer to the inputs (2 bytes per frame).
+    inline const NES_Byte* get_inputs() const { return inputs.data(); }
+
+    /// Return the number of keyframes.
+    inline int get_keyframe_count() const { return keyframes.size(); }
+
+    /// Return the index of the frame a keyframe precedes.
+    inline int get_keyframe_frame(int index) const { return keyframe_frames[index]; }
+
+    /// Return the binary state of a keyframe.
+    inline const std::vector<NES_Byte>& get_keyframe(int index) const { return keyframes[index]; }
+};
+
+}  // namespace NES
+
+#endif  // MOVIE_RECORDER_HPP
@@ -0,0 +1,123 @@
+//  Program:      nes-py
+//  File:         observation.hpp
+//  Description:  This class houses the logic and data for small observations
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#ifndef OBSERVATION_HPP
+#define OBSERVATION_HPP
+
+#include <vector>
+#include "common.hpp"
+
+namespace NES {
+
+/// An observation of a region of the screen, either grayscale and area
+/// downsampled, or RGB / palette indexes subsampled with a stride
+class Observation {
+ public:
+    /// The kinds of pixels in an observation
+    enum Mode {
+        /// luma averaged over blocks of pixels (1 byte per pixel)
+        GRAY = 0,
+        /// 24-bit RGB of the top left pixel of blocks (3 bytes per pixel)
+        RGB = 1,
+        /// the palette index of the top left pixel of blocks (1 byte per pixel)
+        INDEX = 2,
+    };
+
+ private:
+    /// the kind of pixels in the observation
+    Mode mode;
+    /// the first row of the screen in the crop
+    int top;
+    /// the first column of the screen in the crop
+    int left;
+    /// the number of rows of the screen in each output row
+    int factor_y;
+    /// the number of columns of the screen in each output column
+    int factor_x;
+    /// the height of the observation in pixels
+    int height;
+    /// the width of the observation in pixels
+    int width;
+    /// the luma of each color in the palette, scaled by 1000
+    int luma[64];
+    /// the observation as a row-major height x width (x 3 for RGB) tensor
+    std::vector<NES_Byte> buffer;
+
+    /// Update a grayscale observation from a screen.
+    void update_gray(const NES_Byte* screen);
+
+    /// Update an RGB or palette index observation from a screen.
+    void update_subsampled(const NES_Byte* screen);
+
+ public:
+    /// Initialize a new observation of a region of the screen.
+    ///
+    /// @param mode the kind of pixels in the observation
+    /// @param top the first row of the crop (inclusive)
+    /// @param bottom the last row of the crop (exclusive)
+    /// @param left the first column of the crop (inclusive)
+    /// @param right the last column of the crop (exclusive)
+    /// @param factor_y the number of rows in each output row (averaged for
+    ///        GRAY, otherwise the stride between rows)
+    /// @param factor_x the number of columns in each output column (averaged
+    ///        for GRAY, otherwise the stride between columns)
+    ///
+    Observation(
+        Mode mode,
+        int top,
+        int bottom,
+        int left,
+        int right,
+        int factor_y,
+        int factor_x
+    );
+
+    /// Return the height of the observation in pixels.
+    inline int get_height() const { return height; }
+
+    /// Return the width of the observation in pixels.
+    inline int get_width() const { return width; }
+
+    /// Return the number of bytes per pixel of the observation.
+    inline int get_channels() const { return mode == RGB ? 3 : 1; }
+
+    /// Return the number of bytes in the observation.
+    inline int size() const { return height * width * get_channels(); }
+
+    /// Return a pointer to the first address of the observation buffer.
+    inline NES_Byte* get_buffer() { return buffer.data(); }
+
+    /// Return true if another observation observes the same pixels of the
+    /// screen the same way (i.e., only their buffers may differ).
+    ///
+    /// @param other the observation to compare to
+    ///
+    inline bool is_like(const Observation& other) const {
+        return mode == other.mode && top == other.top && left == other.left &&
+            factor_y == other.factor_y && factor_x == other.factor_x &&
+            height == other.height && width == other.width;
+    }
+
+    /// Update the observation from a screen.
+    ///
+    /// @param screen the screen of 6-bit palette indexes to observe
+    ///
+    void update(const NES_Byte* screen);
+
+    /// Pool the observation with an observation of an earlier frame. GRAY
+    /// and RGB observations keep the maximum of each byte, INDEX observations
+    /// keep the index of the brighter color of each pixel (palette indexes
+    /// have no order, so their maximum is meaningless).
+    ///
+    /// @param previous the buffer of the observation of the earlier frame
+    ///
+    void pool(const std::vector<NES_Byte>& previous);
+};
+
+}  // namespace NES
+
+#endif  // OBSERVATION_HPP
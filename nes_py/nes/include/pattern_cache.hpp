@@ -0,0 +1,118 @@
+//  Program:      nes-py
+//  File:         pattern_cache.hpp
+//  Description:  A cache of the decoded pixels of the patterns in CHR memory
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#ifndef PATTERN_CACHE_HPP
+#define PATTERN_CACHE_HPP
+
+#include <cstddef>
+#include <memory>
+#include <vector>
+#include "common.hpp"
+#include "state.hpp"
+
+namespace NES {
+
+/// The decoded pixels of the 8x8 patterns (tiles) in a block of CHR memory.
+/// Each row of a pattern is stored as its 8 2-bit pixels from left to right
+/// followed by the same pixels from right to left (i.e., flipped
+/// horizontally), so the PPU reads a row without combining bitplanes
+class PatternCache {
+ private:
+    /// the decoded rows of the patterns (16 pixels per row, 8 rows per
+    /// pattern)
+    std::vector<NES_Byte> pixels;
+    /// the CHR ROM the patterns are decoded from, if any (kept alive so the
+    /// block cannot be replaced by another at the same address while it is a
+    /// key of the shared caches)
+    std::shared_ptr<const std::vector<NES_Byte>> rom;
+
+    /// Decode a row of a pattern from its bitplanes.
+    ///
+    /// @param address the address of the low bitplane of the row
+    /// @param low the low bitplane of the row
+    /// @param high the high bitplane of the row
+    ///
+    inline void set_row(std::size_t address, NES_Byte low, NES_Byte high) {
+        NES_Byte* row = &pixels[index(address)];
+        for (int x = 0; x < 8; x++) {
+            NES_Byte pixel = ((low >> (7 - x)) & 1) | (((high >> (7 - x)) & 1) << 1);
+            row[x] = pixel;
+            row[15 - x] = pixel;
+        }
+    }
+
+    /// Return the index of the decoded row of a pattern at an address.
+    ///
+    /// @param address the address of a byte of the row in CHR memory
+    /// @return the index of the first pixel of the row in the pixels
+    ///
+    static inline std::size_t index(std::size_t address) {
+        return (((address >> 4) << 3) | (address & 7)) << 4;
+    }
+
+ public:
+    /// Initialize a new, empty pattern cache.
+    PatternCache() { }
+
+    /// Initialize a new pattern cache from a block of CHR memory.
+    ///
+    /// @param chr the block of CHR memory to decode
+    ///
+    explicit PatternCache(const std::vector<NES_Byte>& chr) { decode(chr); }
+
+    /// Decode every pattern in a block of CHR memory, e.g., after loading
+    /// the CHR RAM of a mapper from a state.
+    ///
+    /// @param chr the block of CHR memory to decode
+    ///
+    void decode(const std::vector<NES_Byte>& chr);
+
+    /// Read a block of CHR memory from a binary state and decode only the
+    /// patterns that differ from the current contents (states of a game
+    /// share most of their patterns, so loading a state rarely decodes).
+    ///
+    /// @param chr the block of CHR memory to overwrite
+    /// @param reader the reader to consume the block from
+    ///
+    void load(std::vector<NES_Byte>& chr, StateReader& reader);
+
+    /// Decode the row of the pattern that a write to CHR memory touched.
+    ///
+    /// @param chr the block of CHR memory after the write
+    /// @param address the address of the byte that changed
+    ///
+    inline void update(const std::vector<NES_Byte>& chr, std::size_t address) {
+        address &= ~static_cast<std::size_t>(8);
+        set_row(address, chr[address], chr[address + 8]);
+    }
+
+    /// Return the decoded pixels of a row of a pattern.
+    ///
+    /// @param address the address of a byte of the row in CHR memory
+    /// @return a pointer to the 8 pixels of the row from left to right,
+    ///         followed by the 8 pixels from right to left
+    ///
+    inline const NES_Byte* get_row(std::size_t address) const {
+        return &pixels[index(address)];
+    }
+
+    /// Return the patterns of a block of CHR ROM, decoding them if no other
+    /// cartridge in the process uses the same block (see ROMCache). Patterns
+    /// leave the cache when the last cartridge that refers to them is
+    /// destroyed.
+    ///
+    /// @param chr the shared block of CHR ROM to decode
+    /// @return a pointer to the shared, read-only patterns of the block
+    ///
+    static std::shared_ptr<const PatternCache> get(
+        const std::shared_ptr<const std::vector<NES_Byte>>& chr
+    );
+};
+
+}  // namespace NES
+
+#endif  // PATTERN_CACHE_HPP
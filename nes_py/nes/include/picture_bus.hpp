@@ -12,6 +12,7 @@
 #include <cstdlib>
 #include "common.hpp"
 #include "mapper.hpp"
+#include "state.hpp"
 
 namespace NES {
 
@@ -46,6 +47,17 @@ class PictureBus {
     ///
     void write(NES_Address address, NES_Byte value);
 
+    /// Read the decoded pixels of a row of a pattern from the CHR memory.
+    ///
+    /// @param address the 16-bit address of a byte of the row (below 0x2000)
+    ///
+    /// @return a pointer to the 8 pixels of the row from left to right,
+    ///         followed by the 8 pixels from right to left
+    ///
+    inline const NES_Byte* read_pattern(NES_Address address) {
+        return mapper->readCHRPattern(address);
+    }
+
     /// Set the mapper pointer to a new value.
     ///
     /// @param mapper the new mapper pointer for the bus to use
@@ -66,6 +78,18 @@ class PictureBus {
 
     /// Update the mirroring and name table from the mapper.
     void update_mirroring();
+
+    /// Write the state of the picture bus to a binary emulator state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    void save_state(StateWriter& writer) const;
+
+    /// Read the state of the picture bus from a binary emulator state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    void load_state(StateReader& reader);
 };
 
 }  // namespace NES
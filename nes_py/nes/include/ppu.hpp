@@ -10,6 +10,7 @@
 
 #include "common.hpp"
 #include "picture_bus.hpp"
+#include "state.hpp"
 
 namespace NES {
 
@@ -30,9 +31,11 @@ class PPU {
     /// The callback to fire when entering vertical blanking mode
     std::function<void(void)> vblank_callback;
     /// The OAM memory (sprites)
-    std::vector<NES_Byte> sprite_memory;
+    NES_Byte sprite_memory[64 * 4];
     /// OAM memory (sprites) for the next scanline
-    std::vector<NES_Byte> scanline_sprites;
+    NES_Byte scanline_sprites[8];
+    /// the number of sprites on the next scanline
+    int scanline_sprite_count;
 
     /// The current pipeline state of the PPU
     enum State {
@@ -98,14 +101,111 @@ class PPU {
     /// The value to increment the data address by
     NES_Address data_address_increment;
 
+    /// whether to draw pixels to the screen (timing is kept either way)
+    bool is_rendering_frame;
+
+    /// the background colors (palette addresses) of the dots of the current
+    /// scanline, fetched a tile at a time at the start of the scanline
+    NES_Byte background_line[SCANLINE_VISIBLE_DOTS];
+    /// whether the background line is valid, i.e., nothing the background
+    /// depends on changed since it was fetched. when invalid, the dots fetch
+    /// their background through the bus one at a time
+    bool is_background_line_valid;
+
+    /// The flags of the dots in the sprite line
+    enum SpriteDot {
+        /// the bits of the color (palette address) of the sprite dot
+        SPRITE_COLOR = 0x1f,
+        /// whether the sprite is behind the background
+        SPRITE_BEHIND = 0x20,
+        /// whether the dot belongs to sprite 0
+        SPRITE_ZERO = 0x40,
+    };
+
+    /// the sprite dots of the current scanline (zero where no sprite is
+    /// opaque), drawn a sprite at a time at the first sprite dot of the line
+    NES_Byte sprite_line[SCANLINE_VISIBLE_DOTS];
+    /// whether the sprite line is valid, i.e., nothing the sprites depend on
+    /// changed since they were drawn
+    bool is_sprite_line_valid;
+
     /// The internal screen data structure as a vector representation of a
     /// matrix of height matching the visible scans lines and width matching
-    /// the number of visible scan line dots
-    NES_Pixel screen[VISIBLE_SCANLINES][SCANLINE_VISIBLE_DOTS];
+    /// the number of visible scan line dots. Each pixel is the 6-bit index
+    /// of its color in the system palette
+    NES_Byte screen[VISIBLE_SCANLINES][SCANLINE_VISIBLE_DOTS];
+
+    /// Increment the coarse X scroll in the data address (with wrapping).
+    inline void increment_coarse_x() {
+        // if coarse X == 31
+        if ((data_address & 0x001F) == 31) {
+            // coarse X = 0
+            data_address &= ~0x001F;
+            // switch horizontal nametable
+            data_address ^= 0x0400;
+        }
+        else
+            // increment coarse X
+            data_address += 1;
+    }
+
+    /// Fetch the pattern and palette of a background tile.
+    ///
+    /// @param bus the picture bus to fetch the tile through
+    /// @param address the data address of the tile (scroll and nametable)
+    /// @param pixels the pointer to store the decoded pixels of the tile row in
+    /// @return the 2-bit palette of the tile from the attribute table
+    ///
+    inline NES_Byte fetch_tile(
+        PictureBus& bus,
+        NES_Address address,
+        const NES_Byte*& pixels
+    ) {
+        // the tile in the nametable (the address without fine Y)
+        NES_Byte tile = bus.read(0x2000 | (address & 0x0FFF));
+        // each pattern occupies 16 bytes, the fine Y selects the row
+        NES_Address pattern = (tile * 16) + ((address >> 12) & 0x7);
+        pattern |= background_page << 12;
+        pixels = bus.read_pattern(pattern);
+        // the attribute of the 4x4 tile block and the quadrant of the tile
+        auto attribute = bus.read(0x23C0 | (address & 0x0C00) |
+            ((address >> 4) & 0x38) | ((address >> 2) & 0x07));
+        int shift = ((address >> 4) & 4) | (address & 2);
+        return (attribute >> shift) & 0x3;
+    }
+
+    /// Fetch the background of the scanline a tile at a time.
+    ///
+    /// @param bus the picture bus to fetch the tiles through
+    ///
+    void render_background_line(PictureBus& bus);
+
+    /// Draw the sprites of the scanline into the sprite line.
+    ///
+    /// @param bus the picture bus to fetch the sprite patterns through
+    ///
+    void render_sprite_line(PictureBus& bus);
+
+    /// Return true if sprite 0 may hit the background at a dot of the line.
+    ///
+    /// @param x the horizontal position of the dot on the scanline
+    /// @return true if sprite 0 is on the line, covers the dot, and has not
+    ///         hit the background yet in this frame
+    ///
+    inline bool is_sprite_zero_candidate(int x) {
+        return !is_sprite_zero_hit && is_showing_background && is_showing_sprites &&
+            scanline_sprite_count && scanline_sprites[0] == 0 &&
+            0 <= x - sprite_memory[3] && x - sprite_memory[3] < 8;
+    }
 
  public:
     /// Initialize a new PPU.
-    PPU() : sprite_memory(64 * 4) { }
+    PPU() :
+        sprite_memory(),
+        scanline_sprite_count(0),
+        is_rendering_frame(true),
+        is_background_line_valid(false),
+        is_sprite_line_valid(false) { }
 
     /// Perform a single cycle on the PPU.
     void cycle(PictureBus& bus);
@@ -113,6 +213,30 @@ class PPU {
     /// Reset the PPU.
     void reset();
 
+    /// Return a lower bound on the number of cycles that the PPU can perform
+    /// before it raises the VBlank NMI. The bound assumes the NMI is enabled
+    /// and the shorter pre-render line of odd frames, so the CPU can run
+    /// this far ahead of the PPU whatever it writes to the PPU registers.
+    ///
+    /// @return the number of cycles the PPU can perform without an NMI
+    ///
+    int get_cycles_before_vblank() const;
+
+    /// Set whether to draw pixels to the screen. When not drawing, the PPU
+    /// keeps the timing-relevant behavior (VBlank / NMI, scroll register
+    /// updates, and sprite-zero hits) but skips pattern fetches, palette
+    /// lookups, and writes to the screen.
+    ///
+    /// @param is_rendering whether to draw pixels to the screen
+    ///
+    inline void set_rendering(bool is_rendering) { is_rendering_frame = is_rendering; }
+
+    /// Discard the background and sprites fetched for the current scanline,
+    /// e.g., when the mapper switches CHR banks or mirroring mid-scanline.
+    inline void invalidate_scanline() {
+        is_background_line_valid = is_sprite_line_valid = false;
+    }
+
     /// Set the interrupt callback for the CPU.
     inline void set_interrupt_callback(std::function<void(void)> cb) {
         vblank_callback = cb;
@@ -177,11 +301,27 @@ class PPU {
     /// @param value the byte to write to the given address
     ///
     inline void set_OAM_data(NES_Byte value) {
+        is_sprite_line_valid = false;
         sprite_memory[sprite_data_address++] = value;
     }
 
-    /// Return a pointer to the screen buffer.
-    inline NES_Pixel* get_screen_buffer() { return *screen; }
+    /// Return a pointer to the screen buffer of palette indexes.
+    inline NES_Byte* get_screen_buffer() { return *screen; }
+
+    /// Return a pointer to the screen buffer of palette indexes.
+    inline const NES_Byte* get_screen_buffer() const { return *screen; }
+
+    /// Write the state of the PPU to a binary emulator state.
+    ///
+    /// @param writer the writer to append the state to
+    ///
+    void save_state(StateWriter& writer) const;
+
+    /// Read the state of the PPU from a binary emulator state.
+    ///
+    /// @param reader the reader to consume the state from
+    ///
+    void load_state(StateReader& reader);
 };
 
 }  // namespace NES
@@ -0,0 +1,139 @@
+//  Program:      nes-py
+//  File:         rewind_buffer.hpp
+//  Description:  A bounded history of keyframes and inputs for rewinding
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#ifndef REWIND_BUFFER_HPP
+#define REWIND_BUFFER_HPP
+
+#include <cstddef>
+#include <cstdint>
+#include <deque>
+#include <vector>
+#include "common.hpp"
+
+namespace NES {
+
+/// A bounded history of an emulator as a keyframe (a full state) every few
+/// frames and the controller inputs of every frame. Rewinding restores the
+/// nearest keyframe and re-simulates the inputs up to the target frame
+class RewindBuffer {
+ public:
+    /// A full state of the emulator before a frame
+    struct Keyframe {
+        /// the index of the frame the state precedes
+        uint64_t frame;
+        /// the state of the emulator
+        std::vector<NES_Byte> data;
+    };
+
+    /// The inputs of the 2 controllers in a frame
+    struct Input {
+        /// the button bitmap of the first controller
+        NES_Byte player_1;
+        /// the button bitmap of the second controller
+        NES_Byte player_2;
+    };
+
+ private:
+    /// the number of frames between keyframes (0 when disabled)
+    int interval;
+    /// the maximal number of bytes for the history to occupy
+    std::size_t capacity;
+    /// the number of bytes occupied by the history
+    std::size_t usage;
+    /// the index of the current frame, i.e., the number of recorded frames
+    uint64_t frame;
+    /// the keyframes from the oldest to the newest
+    std::deque<Keyframe> keyframes;
+    /// the inputs of the frames from the oldest keyframe to the current frame
+    std::deque<Input> inputs;
+    /// a buffer of an evicted keyframe to reuse for the next keyframe
+    std::vector<NES_Byte> spare;
+
+    /// Return the number of bytes occupied by a keyframe.
+    static inline std::size_t keyframe_size(const Keyframe& keyframe) {
+        return sizeof(Keyframe) + keyframe.data.capacity();
+    }
+
+    /// Evict the oldest keyframes (and their inputs) until the history fits
+    /// in its capacity, always keeping the newest keyframe.
+    void evict();
+
+ public:
+    /// Initialize a new disabled rewind buffer.
+    RewindBuffer() : interval(0), capacity(0), usage(0), frame(0) { }
+
+    /// Set the interval between keyframes and the capacity of the history,
+    /// clearing the history.
+    ///
+    /// @param interval the number of frames between keyframes (0 disables
+    ///        the rewind buffer)
+    /// @param capacity the maximal number of bytes for the history to occupy
+    ///
+    void configure(int interval, std::size_t capacity);
+
+    /// Return true if the rewind buffer records frames.
+    inline bool is_enabled() const { return interval > 0; }
+
+    /// Return the number of bytes occupied by the history.
+    inline std::size_t get_usage() const { return usage; }
+
+    /// Return the index of the current frame.
+    inline uint64_t get_frame() const { return frame; }
+
+    /// Return the number of frames that can be rewound.
+    inline uint64_t get_frames() const {
+        return keyframes.empty() ? 0 : frame - keyframes.front().frame;
+    }
+
+    /// Clear the history, e.g., when the state of the emulator jumps.
+    void clear();
+
+    /// Return true if the next frame needs a keyframe before it.
+    inline bool needs_keyframe() const {
+        return keyframes.empty() || frame - keyframes.back().frame >= static_cast<uint64_t>(interval);
+    }
+
+    /// Add a keyframe before the next frame.
+    ///
+    /// @param size the number of bytes in the state of the emulator
+    /// @return the buffer to write the state of the emulator to
+    ///
+    std::vector<NES_Byte>& add_keyframe(std::size_t size);
+
+    /// Record the inputs of the next frame, making it the current frame.
+    ///
+    /// @param input the inputs of the controllers in the frame
+    ///
+    void add_input(Input input);
+
+    /// Return the newest keyframe at or before a number of frames ago.
+    ///
+    /// @param frames the number of frames to rewind
+    /// @return the keyframe, or null if the history holds too few frames
+    ///
+    const Keyframe* find(int frames) const;
+
+    /// Return the inputs of a frame in the history.
+    ///
+    /// @param index the index of the frame
+    /// @return the inputs of the controllers in the frame
+    ///
+    inline Input get_input(uint64_t index) const {
+        return inputs[index - keyframes.front().frame];
+    }
+
+    /// Discard the history after a number of frames ago, making the frame
+    /// the current frame.
+    ///
+    /// @param frames the number of frames to discard
+    ///
+    void truncate(int frames);
+};
+
+}  // namespace NES
+
+#endif  // REWIND_BUFFER_HPP
@@ -0,0 +1,41 @@
+//  Program:      nes-py
+//  File:         rom_cache.hpp
+//  Description:  A process-wide cache of read-only ROM data
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#ifndef ROM_CACHE_HPP
+#define ROM_CACHE_HPP
+
+#include <cstddef>
+#include <memory>
+#include <vector>
+#include "common.hpp"
+
+namespace NES {
+
+/// A process-wide cache of read-only ROM data keyed by content hash, so
+/// every cartridge of the same game shares one copy of its PRG / CHR ROM
+class ROMCache {
+ public:
+    /// Return the shared copy of a block of ROM data, creating it if no
+    /// cartridge in the process holds the same bytes. Blocks leave the cache
+    /// when the last cartridge that refers to them is destroyed.
+    ///
+    /// @param data a pointer to the bytes of the ROM data
+    /// @param size the number of bytes of ROM data
+    /// @return a pointer to the shared, read-only copy of the bytes
+    ///
+    static std::shared_ptr<const std::vector<NES_Byte>> get(
+        const NES_Byte* data,
+        std::size_t size
+    );
+
+    /// Return the number of blocks of ROM data in the cache.
+    static std::size_t size();
+};
+
+}  // namespace NES
+
+#endif  // ROM_CACHE_HPP
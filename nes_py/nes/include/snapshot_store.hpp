@@ -0,0 +1,184 @@
+//  Program:      nes-py
+//  File:         snapshot_store.hpp
+//  Description:  This class houses numbered snapshots of an NES emulator
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#ifndef SNAPSHOT_STORE_HPP
+#define SNAPSHOT_STORE_HPP
+
+#include <cstddef>
+#include <list>
+#include <memory>
+#include <unordered_map>
+#include <vector>
+#include "common.hpp"
+#include "ppu.hpp"
+
+namespace NES {
+
+/// The maximal number of bytes in the binary state of the hardware of an
+/// emulator, i.e., RAM, extended RAM, VRAM, CHR RAM, OAM, palette, and a
+/// margin for the registers of the CPU, PPU, mapper, and controllers
+const std::size_t SNAPSHOT_STATE_SIZE = 0x800 + 0x2000 + 0x800 + 0x2000 + 0x100 + 0x20 + 0x200;
+
+/// A copy of the state of the hardware of an emulator as one contiguous
+/// block of plain data, so snapshots copy without heap allocation
+struct Snapshot {
+    /// the binary state of the hardware (without the header of a save state)
+    NES_Byte state[SNAPSHOT_STATE_SIZE];
+    /// the screen of palette indexes (the RGB screen is looked up from it
+    /// on load, which is cheaper than copying three times the bytes on save)
+    NES_Byte screen[VISIBLE_SCANLINES][SCANLINE_VISIBLE_DOTS];
+};
+
+/// A store of numbered snapshots that evicts the least recently used
+/// snapshots to stay within a memory capacity. A snapshot is either a full
+/// copy of the state or a delta that stores only the pages of the hardware
+/// state that differ from a full base snapshot. A delta keeps no screen of
+/// its own, it restores the screen of its base
+class SnapshotStore {
+ private:
+    /// a snapshot and its position in the recency list
+    struct Slot {
+        /// the full snapshot, or the base snapshot of a delta (shared by the
+        /// deltas, so overwriting a base copies it first)
+        std::shared_ptr<Snapshot> snapshot;
+        /// whether the slot holds a delta against the snapshot
+        bool is_delta = false;
+        /// the indexes of the pages of a delta that differ from the base
+        std::vector<uint32_t> pages;
+        /// the contents of the pages of a delta that differ from the base
+        std::vector<NES_Byte> data;
+        /// the position of the slot ID in the recency list
+        std::list<int>::iterator position;
+
+        /// Return the number of bytes occupied by the slot.
+        std::size_t size() const;
+    };
+
+    /// the maximal number of bytes for the snapshots to occupy
+    std::size_t capacity;
+    /// the number of bytes occupied by the snapshots
+    std::size_t usage;
+    /// the slot IDs from the most to the least recently used
+    std::list<int> recency;
+    /// the slots indexed by their IDs
+    std::unordered_map<int, Slot> slots;
+    /// the base snapshots that no full slot holds anymore, but deltas still
+    /// refer to (they count toward the usage until the last delta is gone)
+    std::vector<std::shared_ptr<Snapshot>> orphans;
+    /// a buffer to compute and materialize deltas with (allocated on use)
+    std::unique_ptr<Snapshot> buffer;
+
+    /// Evict the least recently used slots until the store fits in its
+    /// capacity, always keeping the most recently used slot. Evicting a base
+    /// evicts the deltas that refer to it along with it.
+    void evict();
+
+    /// Release the snapshot of a slot. The full snapshot of a slot that
+    /// deltas refer to becomes an orphan and keeps counting toward the usage.
+    ///
+    /// @param slot the slot to release the snapshot of
+    ///
+    void release(Slot& slot);
+
+    /// Free the orphaned bases that no delta refers to anymore.
+    void collect();
+
+    /// Delete a slot and release its snapshot.
+    ///
+    /// @param slot an iterator to the slot to delete
+    /// @return an iterator to the slot after the deleted slot
+    ///
+    std::unordered_map<int, Slot>::iterator erase(std::unordered_map<int, Slot>::iterator slot);
+
+    /// Return a slot to save to, creating it if needed, and make it the most
+    /// recently used slot. The slot no longer counts toward the usage.
+    ///
+    /// @param id the ID of the slot to return
+    /// @return a reference to the slot
+    ///
+    Slot& touch(int id);
+
+    /// Return the number of bytes in the page of the hardware state of a
+    /// snapshot at an offset (the last page of the state may be short).
+    ///
+    /// @param offset the offset of the page in the state
+    /// @return the number of bytes in the page
+    ///
+    static inline std::size_t page_size(std::size_t offset) {
+        return SNAPSHOT_STATE_SIZE - offset < PAGE_SIZE ? SNAPSHOT_STATE_SIZE - offset : PAGE_SIZE;
+    }
+
+ public:
+    /// The number of bytes in a page of a delta snapshot
+    static const std::size_t PAGE_SIZE = 32;
+    /// The number of bytes occupied by a full snapshot (a slot holds no heap
+    /// memory besides the snapshot and the node of its ID in the recency list)
+    static const std::size_t SLOT_SIZE = sizeof(Slot) + sizeof(Snapshot) + sizeof(int) + 2 * sizeof(void*);
+
+    /// Initialize a new store with a capacity of 1 GB.
+    SnapshotStore() : capacity(std::size_t(1) << 30), usage(0) { }
+
+    /// Return the number of snapshots in the store.
+    inline int size() const { return slots.size(); }
+
+    /// Return the number of bytes occupied by the snapshots in the store.
+    inline std::size_t get_usage() const { return usage; }
+
+    /// Set the maximal number of bytes for the snapshots to occupy.
+    ///
+    /// @param bytes the new capacity of the store in bytes
+    ///
+    void set_capacity(std::size_t bytes);
+
+    /// Return the snapshot in a slot to save to, creating it if needed.
+    /// The slot becomes the most recently used slot.
+    ///
+    /// @param id the ID of the slot to save to
+    /// @return a reference to the snapshot to overwrite
+    ///
+    Snapshot& save(int id);
+
+    /// Return the buffer to write a snapshot to before `save_delta`.
+    inline Snapshot& get_buffer() {
+        if (!buffer) buffer.reset(new Snapshot());
+        return *buffer;
+    }
+
+    /// Save the snapshot in the buffer to a slot as a delta against the full
+    /// snapshot in another slot. The delta covers the hardware state only
+    /// (the screen makes up most of a snapshot and changes every frame), so
+    /// it loads with the screen of the base. The slot becomes the most
+    /// recently used slot.
+    ///
+    /// @param id the ID of the slot to save to
+    /// @param base the ID of the slot with the full snapshot to compare to
+    /// @return true if the delta was saved, false if the base slot is empty
+    ///         or holds a delta
+    ///
+    bool save_delta(int id, int base);
+
+    /// Return the snapshot in a slot, making it the most recently used slot.
+    /// Deltas materialize into the buffer, which stays valid until the next
+    /// delta is saved or loaded.
+    ///
+    /// @param id the ID of the slot to load from
+    /// @return a pointer to the snapshot, or null if the slot is empty
+    ///
+    const Snapshot* load(int id);
+
+    /// Delete the snapshot in a slot. A base that deltas refer to stays in
+    /// memory (and counts toward the usage) until its last delta is gone.
+    ///
+    /// @param id the ID of the slot to delete
+    /// @return true if the slot held a snapshot
+    ///
+    bool drop(int id);
+};
+
+}  // namespace NES
+
+#endif  // SNAPSHOT_STORE_HPP
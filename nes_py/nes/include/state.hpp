@@ -0,0 +1,155 @@
+//  Program:      nes-py
+//  File:         state.hpp
+//  Description:  Helpers for writing and reading binary emulator states
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#ifndef STATE_HPP
+#define STATE_HPP
+
+#include <cassert>
+#include <cstring>
+#include <type_traits>
+#include <vector>
+#include "common.hpp"
+
+namespace NES {
+
+/// The magic bytes at the start of a binary emulator state
+const char STATE_MAGIC[4] = {'N', 'E', 'S', 'S'};
+/// The version of the binary emulator state format
+const uint32_t STATE_VERSION = 1;
+/// The number of bytes in the header of a binary emulator state, i.e., the
+/// magic bytes, the version, the mapper number, and the PRG / CHR ROM sizes
+const std::size_t STATE_HEADER_SIZE = sizeof(STATE_MAGIC) + sizeof(STATE_VERSION) + 1 + 2 * sizeof(uint32_t);
+
+/// A writer that appends values to a binary emulator state in a buffer
+class StateWriter {
+ private:
+    /// the buffer to write the state to (null to only count the bytes)
+    NES_Byte* data;
+    /// the number of bytes in the buffer
+    std::size_t size;
+    /// the position of the next byte to write
+    std::size_t position;
+
+ public:
+    /// Initialize a new writer.
+    ///
+    /// @param data the buffer to write the state to, or null to only count
+    ///        the bytes in the state
+    /// @param size the number of bytes in the buffer
+    ///
+    StateWriter(NES_Byte* data, std::size_t size) :
+        data(data), size(size), position(0) { }
+
+    /// Return the number of bytes written (or counted) so far.
+    inline std::size_t written() const { return position; }
+
+    /// Append raw bytes to the state. Callers size the buffer before
+    /// writing, so writing past the end of the buffer is a bug (it asserts,
+    /// and writes nothing when assertions are disabled).
+    ///
+    /// @param bytes a pointer to the bytes to append
+    /// @param count the number of bytes to append
+    ///
+    inline void write(const void* bytes, std::size_t count) {
+        if (data != nullptr) {
+            assert(count <= size - position && "state overflows its buffer");
+            if (count > size - position)
+                return;
+            std::memcpy(data + position, bytes, count);
+        }
+        position += count;
+    }
+
+    /// Append a value of a trivially copyable type to the state.
+    ///
+    /// @param value the value to append
+    ///
+    template<typename T>
+    inline void write(const T& value) {
+        static_assert(std::is_trivially_copyable<T>::value, "T must be trivially copyable");
+        write(&value, sizeof(T));
+    }
+
+    /// Append the contents of a byte vector (of a fixed size) to the state.
+    ///
+    /// @param vector the vector to append the contents of
+    ///
+    inline void write(const std::vector<NES_Byte>& vector) {
+        write(vector.data(), vector.size());
+    }
+};
+
+/// A reader that consumes values from a binary emulator state
+class StateReader {
+ private:
+    /// the state to read from
+    const NES_Byte* data;
+    /// the number of bytes in the state
+    std::size_t size;
+    /// the position of the next byte to read
+    std::size_t position;
+
+ public:
+    /// Initialize a new reader.
+    ///
+    /// @param data the state to read from
+    /// @param size the number of bytes in the state
+    ///
+    StateReader(const NES_Byte* data, std::size_t size) :
+        data(data), size(size), position(0) { }
+
+    /// Return the number of bytes that have not been read.
+    inline std::size_t remaining() const { return size - position; }
+
+    /// Consume raw bytes from the state. Callers validate the size of the
+    /// state before reading, so reading past the end reads nothing.
+    ///
+    /// @param output a pointer to write the consumed bytes to
+    /// @param count the number of bytes to consume
+    ///
+    inline void read(void* output, std::size_t count) {
+        if (count > remaining())
+            return;
+        std::memcpy(output, data + position, count);
+        position += count;
+    }
+
+    /// Consume raw bytes from the state without copying them.
+    ///
+    /// @param count the number of bytes to consume
+    /// @return a pointer to the consumed bytes, or null (consuming nothing)
+    ///         if fewer bytes remain
+    ///
+    inline const NES_Byte* skip(std::size_t count) {
+        if (count > remaining())
+            return nullptr;
+        position += count;
+        return data + position - count;
+    }
+
+    /// Consume a value of a trivially copyable type from the state.
+    ///
+    /// @param value the value to overwrite with the consumed value
+    ///
+    template<typename T>
+    inline void read(T& value) {
+        static_assert(std::is_trivially_copyable<T>::value, "T must be trivially copyable");
+        read(&value, sizeof(T));
+    }
+
+    /// Consume the contents of a byte vector (of a fixed size) from the state.
+    ///
+    /// @param vector the vector to overwrite the contents of
+    ///
+    inline void read(std::vector<NES_Byte>& vector) {
+        read(vector.data(), vector.size());
+    }
+};
+
+}  // namespace NES
+
+#endif  // STATE_HPP
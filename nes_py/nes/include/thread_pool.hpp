@@ -0,0 +1,79 @@
+//  Program:      nes-py
+//  File:         thread_pool.hpp
+//  Description:  A pool of worker threads for running batches of tasks
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#ifndef THREAD_POOL_HPP
+#define THREAD_POOL_HPP
+
+#include <atomic>
+#include <condition_variable>
+#include <functional>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+namespace NES {
+
+/// A fixed set of worker threads that run a task over a range of indexes
+class ThreadPool {
+ private:
+    /// the worker threads
+    std::vector<std::thread> workers;
+    /// the mutex guarding the shared state of the pool
+    std::mutex mutex;
+    /// the condition for workers to wait on for new work
+    std::condition_variable work_ready;
+    /// the condition for the caller to wait on for the work to finish
+    std::condition_variable work_done;
+    /// the task of the current run
+    std::function<void(int)> task;
+    /// the number of indexes to run the task on in the current run
+    int task_count;
+    /// the next index for a worker to claim in the current run
+    std::atomic<int> next_index;
+    /// the number of workers that have not finished the current run
+    int pending_workers;
+    /// a counter of runs used by the workers to detect new work
+    int generation;
+    /// whether the pool is shutting down
+    bool is_stopping;
+
+    /// The main loop of a worker thread.
+    ///
+    /// @param worker the index of the worker in the pool
+    ///
+    void work(int worker);
+
+ public:
+    /// Initialize a new pool of worker threads.
+    ///
+    /// @param size the number of worker threads
+    /// @param cores the CPU cores to pin workers to. worker i is pinned to
+    ///        cores[i % cores.size()]. an empty list leaves workers unpinned
+    ///
+    ThreadPool(int size, const std::vector<int>& cores);
+
+    /// Stop and join the worker threads.
+    ~ThreadPool();
+
+    /// the pool owns its threads and cannot be copied
+    ThreadPool(const ThreadPool&) = delete;
+    ThreadPool& operator=(const ThreadPool&) = delete;
+
+    /// Return the number of worker threads in the pool.
+    inline int size() const { return workers.size(); }
+
+    /// Run a task for each index in a range and wait for all of them.
+    ///
+    /// @param function the task to call with each index
+    /// @param count the number of indexes, i.e., the range [0, count)
+    ///
+    void run(const std::function<void(int)>& function, int count);
+};
+
+}  // namespace NES
+
+#endif  // THREAD_POOL_HPP
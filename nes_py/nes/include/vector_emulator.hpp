@@ -0,0 +1,88 @@
+//  Program:      nes-py
+//  File:         vector_emulator.hpp
+//  Description:  This class houses a batch of NES emulators stepped together
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#ifndef VECTOR_EMULATOR_HPP
+#define VECTOR_EMULATOR_HPP
+
+#include <memory>
+#include <string>
+#include <vector>
+#include "common.hpp"
+#include "emulator.hpp"
+#include "thread_pool.hpp"
+
+namespace NES {
+
+/// A batch of NES emulators that step together with a single call
+class VectorEmulator {
+ private:
+    /// the emulators in the batch
+    std::vector<Emulator*> emulators;
+    /// the screens of the batch as contiguous 24-bit RGB (size x H x W x 3)
+    std::vector<NES_Byte> observations;
+    /// the worker threads that step the emulators (null to step serially)
+    std::unique_ptr<ThreadPool> pool;
+
+ public:
+    /// The number of bytes in the 24-bit RGB screen of one emulator
+    static const int OBSERVATION_SIZE = Emulator::HEIGHT * Emulator::WIDTH * 3;
+
+    /// Initialize a new batch of emulators with a path to a ROM file.
+    ///
+    /// @param rom_path the path to the ROM for the emulators to run
+    /// @param size the number of emulators in the batch
+    ///
+    VectorEmulator(std::string rom_path, int size);
+
+    /// Delete the emulators in the batch.
+    ~VectorEmulator();
+
+    /// the batch owns its emulators and cannot be copied
+    VectorEmulator(const VectorEmulator&) = delete;
+    VectorEmulator& operator=(const VectorEmulator&) = delete;
+
+    /// Return the number of emulators in the batch.
+    inline int size() const { return emulators.size(); }
+
+    /// Return a pointer to an emulator in the batch.
+    ///
+    /// @param index the index of the emulator in the batch
+    /// @return a pointer to the emulator at the given index
+    ///
+    inline Emulator* get_emulator(int index) { return emulators[index]; }
+
+    /// Return a pointer to the first address of the observation buffer.
+    inline NES_Byte* get_observation_buffer() { return observations.data(); }
+
+    /// Set the number of threads that step the emulators.
+    ///
+    /// @param threads the number of worker threads, where 1 or fewer steps
+    ///        the emulators serially on the calling thread
+    /// @param cores the CPU cores to pin the worker threads to (optional)
+    ///
+    void set_threads(int threads, const std::vector<int>& cores);
+
+    /// Copy the screen of an emulator into the observation buffer.
+    ///
+    /// @param index the index of the emulator in the batch
+    ///
+    void observe(int index);
+
+    /// Step every emulator in the batch and update the observation buffer.
+    /// Returns once every emulator has finished stepping.
+    ///
+    /// @param actions the button bitmap for the first controller of each
+    ///        emulator (one byte per emulator)
+    /// @param frames the number of frames to hold the actions for
+    /// @param max_pool whether to max-pool the last two frames
+    ///
+    void step(const NES_Byte* actions, int frames, bool max_pool);
+};
+
+}  // namespace NES
+
+#endif  // VECTOR_EMULATOR_HPP
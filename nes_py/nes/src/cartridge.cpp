@@ -5,33 +5,44 @@
 //  Copyright (c) 2019 Christian Kauten. All rights reserved.
 //
 
+#include <algorithm>
+#include <cstring>
 #include <fstream>
+#include <iterator>
 #include "cartridge.hpp"
+#include "rom_cache.hpp"
 #include "log.hpp"
 
 namespace NES {
 
 void Cartridge::loadFromFile(std::string path) {
-    // create a stream to load the ROM file
+    // read the whole ROM file into memory
     std::ifstream romFile(path, std::ios_base::binary | std::ios_base::in);
-    // create a byte vector for the iNES header
-    std::vector<NES_Byte> header;
-    header.resize(0x10);
-    romFile.read(reinterpret_cast<char*>(&header[0]), 0x10);
+    std::vector<NES_Byte> data(
+        (std::istreambuf_iterator<char>(romFile)),
+        std::istreambuf_iterator<char>()
+    );
+    loadFromBuffer(data.data(), data.size());
+}
+
+void Cartridge::loadFromBuffer(const NES_Byte* data, std::size_t size) {
+    // read the iNES header
+    NES_Byte header[0x10] = {0};
+    std::memcpy(header, data, std::min<std::size_t>(0x10, size));
     // read internal data
     name_table_mirroring = header[6] & 0xB;
     mapper_number = ((header[6] >> 4) & 0xf) | (header[7] & 0xf0);
     has_extended_ram = header[6] & 0x2;
-    // read PRG-ROM 16KB banks
-    NES_Byte banks = header[4];
-    prg_rom.resize(0x4000 * banks);
-    romFile.read(reinterpret_cast<char*>(&prg_rom[0]), 0x4000 * banks);
-    // read CHR-ROM 8KB banks
-    NES_Byte vbanks = header[5];
-    if (!vbanks)
-        return;
-    chr_rom.resize(0x2000 * vbanks);
-    romFile.read(reinterpret_cast<char*>(&chr_rom[0]), 0x2000 * vbanks);
+    // limit the PRG-ROM 16KB banks and CHR-ROM 8KB banks to the bytes in
+    // the buffer in case the ROM is truncated
+    const std::size_t prg_start = std::min<std::size_t>(0x10, size);
+    const std::size_t prg_size = std::min<std::size_t>(0x4000 * header[4], size - prg_start);
+    const std::size_t chr_start = prg_start + prg_size;
+    const std::size_t chr_size = std::min<std::size_t>(0x2000 * header[5], size - chr_start);
+    // share the ROM data with every other cartridge of the same game
+    prg_rom = ROMCache::get(data + prg_start, prg_size);
+    chr_rom = ROMCache::get(data + chr_start, chr_size);
+    chr_patterns = PatternCache::get(chr_rom);
 }
 
 }  // namespace NES
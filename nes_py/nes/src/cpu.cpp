@@ -10,7 +10,8 @@
 
 namespace NES {
 
-bool CPU::implied(MainBus &bus, NES_Byte opcode) {
+template <NES_Byte opcode>
+bool CPU::implied(MainBus &bus) {
     switch (static_cast<OperationImplied>(opcode)) {
         case BRK: {
             interrupt(bus, BRK_INTERRUPT);
@@ -154,7 +155,8 @@ bool CPU::implied(MainBus &bus, NES_Byte opcode) {
     return true;
 }
 
-bool CPU::branch(MainBus &bus, NES_Byte opcode) {
+template <NES_Byte opcode>
+bool CPU::branch(MainBus &bus) {
     if ((opcode & BRANCH_INSTRUCTION_MASK) != BRANCH_INSTRUCTION_MASK_RESULT)
         return false;
 
@@ -197,7 +199,8 @@ bool CPU::branch(MainBus &bus, NES_Byte opcode) {
     return true;
 }
 
-bool CPU::type0(MainBus &bus, NES_Byte opcode) {
+template <NES_Byte opcode>
+bool CPU::type0(MainBus &bus) {
     if ((opcode & INSTRUCTION_MODE_MASK) != 0x0)
         return false;
 
@@ -264,7 +267,8 @@ bool CPU::type0(MainBus &bus, NES_Byte opcode) {
     return true;
 }
 
-bool CPU::type1(MainBus &bus, NES_Byte opcode) {
+template <NES_Byte opcode>
+bool CPU::type1(MainBus &bus) {
     if ((opcode & INSTRUCTION_MODE_MASK) != 0x1)
         return false;
     // Location of the operand, could be in RAM
@@ -383,7 +387,8 @@ bool CPU::type1(MainBus &bus, NES_Byte opcode) {
     return true;
 }
 
-bool CPU::type2(MainBus &bus, NES_Byte opcode) {
+template <NES_Byte opcode>
+bool CPU::type2(MainBus &bus) {
     if ((opcode & INSTRUCTION_MODE_MASK) != 2)
         return false;
 
@@ -497,6 +502,24 @@ bool CPU::type2(MainBus &bus, NES_Byte opcode) {
     return true;
 }
 
+template <NES_Byte opcode>
+void CPU::execute(MainBus &bus) {
+    // the opcode is a constant, so the decoders that do not match it fold
+    // away and only the addressing mode and operation of the opcode remain.
+    // the implied decoder must come first and branch must precede type0
+    if (implied<opcode>(bus) || branch<opcode>(bus) || type1<opcode>(bus) || type2<opcode>(bus) || type0<opcode>(bus))
+        skip_cycles += OPERATION_CYCLES[opcode];
+    else
+        std::cout << "failed to execute opcode: " << std::hex << +opcode << std::endl;
+}
+
+template <std::size_t... opcodes>
+std::array<CPU::Instruction, sizeof...(opcodes)> CPU::instructions(std::index_sequence<opcodes...>) {
+    return {{ &CPU::execute<opcodes>... }};
+}
+
+const std::array<CPU::Instruction, 256> CPU::INSTRUCTIONS = CPU::instructions(std::make_index_sequence<256>());
+
 void CPU::reset(NES_Address start_address) {
     skip_cycles = 0;
     cycles = 0;
@@ -549,15 +572,31 @@ void CPU::cycle(MainBus &bus) {
         return;
     // reset the number of skip cycles to 0
     skip_cycles = 0;
-    // read the opcode from the bus and lookup the number of cycles
+    // read the opcode from the bus and execute it through the table
     NES_Byte op = bus.read(register_PC++);
-    // Using short-circuit evaluation, call the other function only if the
-    // first failed. ExecuteImplied must be called first and ExecuteBranch
-    // must be before ExecuteType0
-    if (implied(bus, op) || branch(bus, op) || type1(bus, op) || type2(bus, op) || type0(bus, op))
-        skip_cycles += OPERATION_CYCLES[op];
-    else
-        std::cout << "failed to execute opcode: " << std::hex << +op << std::endl;
+    (this->*INSTRUCTIONS[op])(bus);
+}
+
+void CPU::save_state(StateWriter& writer) const {
+    writer.write(register_PC);
+    writer.write(register_SP);
+    writer.write(register_A);
+    writer.write(register_X);
+    writer.write(register_Y);
+    writer.write(flags);
+    writer.write(skip_cycles);
+    writer.write(cycles);
+}
+
+void CPU::load_state(StateReader& reader) {
+    reader.read(register_PC);
+    reader.read(register_SP);
+    reader.read(register_A);
+    reader.read(register_X);
+    reader.read(register_Y);
+    reader.read(flags);
+    reader.read(skip_cycles);
+    reader.read(cycles);
 }
 
 }  // namespace NES
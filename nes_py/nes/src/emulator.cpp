@@ -5,49 +5,347 @@
 //  Copyright (c) 2019 Christian Kauten. All rights reserved.
 //
 
+#include <algorithm>
+#include <cassert>
+#include <cstring>
 #include "emulator.hpp"
 #include "mapper_factory.hpp"
+#include "palette.hpp"
 #include "log.hpp"
 
 namespace NES {
 
-Emulator::Emulator(std::string rom_path) {
-    // set the read callbacks
-    bus.set_read_callback(PPUSTATUS, [&](void) { return ppu.get_status();          });
-    bus.set_read_callback(PPUDATA,   [&](void) { return ppu.get_data(picture_bus); });
-    bus.set_read_callback(JOY1,      [&](void) { return controllers[0].read();     });
-    bus.set_read_callback(JOY2,      [&](void) { return controllers[1].read();     });
-    bus.set_read_callback(OAMDATA,   [&](void) { return ppu.get_OAM_data();        });
-    // set the write callbacks
-    bus.set_write_callback(PPUCTRL,  [&](NES_Byte b) { ppu.control(b);                                             });
-    bus.set_write_callback(PPUMASK,  [&](NES_Byte b) { ppu.set_mask(b);                                            });
-    bus.set_write_callback(OAMADDR,  [&](NES_Byte b) { ppu.set_OAM_address(b);                                     });
-    bus.set_write_callback(PPUADDR,  [&](NES_Byte b) { ppu.set_data_address(b);                                    });
-    bus.set_write_callback(PPUSCROL, [&](NES_Byte b) { ppu.set_scroll(b);                                          });
-    bus.set_write_callback(PPUDATA,  [&](NES_Byte b) { ppu.set_data(picture_bus, b);                               });
-    bus.set_write_callback(OAMDMA,   [&](NES_Byte b) { cpu.skip_DMA_cycles(); ppu.do_DMA(bus.get_page_pointer(b)); });
-    bus.set_write_callback(JOY1,     [&](NES_Byte b) { controllers[0].strobe(b); controllers[1].strobe(b);         });
-    bus.set_write_callback(OAMDATA,  [&](NES_Byte b) { ppu.set_OAM_data(b);                                        });
-    // set the interrupt callback for the PPU
-    ppu.set_interrupt_callback([&]() { cpu.interrupt(bus, CPU::NMI_INTERRUPT); });
+Emulator::Emulator(std::string rom_path) :
+    reset_states(std::make_shared<std::vector<std::shared_ptr<const CachedSnapshot>>>()),
+    rgb_output(**rgb_screen) {
     // load the ROM from disk, expect that the Python code has validated it
     cartridge.loadFromFile(rom_path);
+    connect();
+    update_screens();
+}
+
+Emulator::Emulator(const NES_Byte* rom, std::size_t size) :
+    reset_states(std::make_shared<std::vector<std::shared_ptr<const CachedSnapshot>>>()),
+    rgb_output(**rgb_screen) {
+    // load the ROM from memory, expect that the Python code has validated it
+    cartridge.loadFromBuffer(rom, size);
+    connect();
+    update_screens();
+}
+
+Emulator::Emulator(const Emulator& other) :
+    cartridge(other.cartridge),
+    reset_states(other.reset_states),
+    rgb_output(**rgb_screen) {
+    connect();
+    if (other.observation)
+        observation.reset(new Observation(*other.observation));
+    // copy the hardware and the screens through a snapshot
+    std::unique_ptr<CachedSnapshot> snapshot(new CachedSnapshot());
+    other.save(*snapshot);
+    load(*snapshot);
+    if (other.backup_state)
+        backup_state.reset(new CachedSnapshot(*other.backup_state));
+}
+
+void Emulator::connect() {
+    // give the main bus the devices behind its IO registers
+    bus.set_devices(&cpu, &ppu, &picture_bus, controllers);
+    // set the interrupt callback for the PPU
+    ppu.set_interrupt_callback([&]() { cpu.interrupt(bus, CPU::NMI_INTERRUPT); });
     // create the mapper based on the mapper ID in the iNES header of the ROM
-    auto mapper = MapperFactory(&cartridge, [&](){ picture_bus.update_mirroring(); });
+    mapper.reset(MapperFactory(&cartridge, [&](){ picture_bus.update_mirroring(); }));
     // give the IO buses a pointer to the mapper
-    bus.set_mapper(mapper);
-    picture_bus.set_mapper(mapper);
-}
-
-void Emulator::step() {
-    // render a single frame on the emulator
-    for (int i = 0; i < CYCLES_PER_FRAME; i++) {
-        // 3 PPU steps per CPU step
-        ppu.cycle(picture_bus);
-        ppu.cycle(picture_bus);
-        ppu.cycle(picture_bus);
-        cpu.cycle(bus);
+    bus.set_mapper(mapper.get());
+    picture_bus.set_mapper(mapper.get());
+    // make sure the state of the hardware fits in a snapshot
+    StateWriter counter(nullptr, 0);
+    save_hardware(counter);
+    assert(counter.written() <= SNAPSHOT_STATE_SIZE && "hardware state overflows a snapshot");
+}
+
+void Emulator::run_frame(bool render) {
+    if (rewind_buffer.is_enabled())
+        record_frame();
+    if (movie.is_recording())
+        record_movie_frame();
+    emulate_frame(render);
+}
+
+void Emulator::emulate_frame(bool render) {
+    ppu.set_rendering(render);
+    int cycle = 0;
+    while (cycle < CYCLES_PER_FRAME) {
+        // the CPU can run ahead of the PPU until the PPU may raise the NMI
+        const int ahead = std::min(CYCLES_PER_FRAME, cycle + ppu.get_cycles_before_vblank() / 3);
+        if (ahead <= cycle) {
+            // close to the NMI, run 3 PPU cycles per CPU cycle in lockstep
+            ppu.cycle(picture_bus);
+            ppu.cycle(picture_bus);
+            ppu.cycle(picture_bus);
+            cpu.cycle(bus);
+            ++cycle;
+            continue;
+        }
+        while (cycle < ahead) {
+            // skip the cycles between instructions in a single step
+            const int idle = std::min(cpu.get_idle_cycles(), ahead - cycle);
+            if (idle > 0) {
+                cpu.skip_idle_cycles(idle);
+                bus.add_ppu_lag(3 * idle);
+                cycle += idle;
+                continue;
+            }
+            // the 3 PPU cycles of this CPU cycle precede the instruction,
+            // which syncs the PPU only if it touches the PPU
+            bus.add_ppu_lag(3);
+            cpu.cycle(bus);
+            ++cycle;
+        }
+        bus.sync_ppu();
+    }
+}
+
+void Emulator::record_frame() {
+    if (rewind_buffer.needs_keyframe()) {
+        // count the bytes of the hardware state and append the screen
+        StateWriter counter(nullptr, 0);
+        save_hardware(counter);
+        auto& keyframe = rewind_buffer.add_keyframe(counter.written() + WIDTH * HEIGHT);
+        StateWriter writer(keyframe.data(), counter.written());
+        save_hardware(writer);
+        std::memcpy(keyframe.data() + counter.written(), ppu.get_screen_buffer(), WIDTH * HEIGHT);
+    }
+    rewind_buffer.add_input({
+        *controllers[0].get_joypad_buffer(),
+        *controllers[1].get_joypad_buffer()
+    });
+}
+
+void Emulator::record_movie_frame() {
+    if (movie.needs_keyframe() && movie.get_frames() > 0)
+        save_state(movie.add_keyframe());
+    movie.add_input(*controllers[0].get_joypad_buffer(), *controllers[1].get_joypad_buffer());
+}
+
+void Emulator::replay(
+    const NES_Byte* inputs,
+    int frames,
+    int every,
+    const NES_Byte* source,
+    std::size_t size,
+    NES_Byte* observations
+) {
+    const NES_Byte held[2] = {*get_controller(0), *get_controller(1)};
+    every = every > 0 ? every : 1;
+    for (int frame = 0; frame < frames; frame++) {
+        *get_controller(0) = inputs[2 * frame];
+        *get_controller(1) = inputs[2 * frame + 1];
+        // draw only the frames of the observations and the last frame
+        const bool is_observed = observations != nullptr && (frame + 1) % every == 0;
+        const bool render = is_observed || frame + 1 == frames;
+        run_frame(render);
+        if (render)
+            update_screens();
+        if (is_observed) {
+            std::memcpy(observations, source, size);
+            observations += size;
+        }
+    }
+    *get_controller(0) = held[0];
+    *get_controller(1) = held[1];
+}
+
+bool Emulator::rewind(int frames) {
+    auto keyframe = rewind_buffer.find(frames);
+    if (keyframe == nullptr)
+        return false;
+    // restore the keyframe (the hardware state followed by the screen)
+    const std::size_t hardware_size = keyframe->data.size() - WIDTH * HEIGHT;
+    StateReader reader(keyframe->data.data(), hardware_size);
+    load_hardware(reader);
+    std::memcpy(get_screen_buffer(), keyframe->data.data() + hardware_size, WIDTH * HEIGHT);
+    // re-simulate the recorded inputs up to the target frame, drawing only
+    // the last frame
+    const NES_Byte held[2] = {*get_controller(0), *get_controller(1)};
+    const uint64_t target = rewind_buffer.get_frame() - frames;
+    for (uint64_t frame = keyframe->frame; frame < target; frame++) {
+        const auto input = rewind_buffer.get_input(frame);
+        *get_controller(0) = input.player_1;
+        *get_controller(1) = input.player_2;
+        emulate_frame(frame + 1 == target);
+    }
+    *get_controller(0) = held[0];
+    *get_controller(1) = held[1];
+    // discard the history after the target frame, which the movie can no
+    // longer follow
+    rewind_buffer.truncate(frames);
+    movie.stop();
+    update_screens();
+    return true;
+}
+
+void Emulator::update_rgb_screen() {
+    auto screen = get_screen_buffer();
+    auto output = get_rgb_screen_buffer();
+    // look up each palette index and write its R, G, B bytes
+    for (int pixel = 0; pixel < WIDTH * HEIGHT; pixel++) {
+        const NES_Pixel color = PALETTE[screen[pixel]];
+        *output++ = color >> 16;
+        *output++ = color >> 8;
+        *output++ = color;
+    }
+}
+
+void Emulator::set_observation(
+    Observation::Mode mode,
+    int top,
+    int bottom,
+    int left,
+    int right,
+    int factor_y,
+    int factor_x
+) {
+    observation.reset(new Observation(mode, top, bottom, left, right, factor_y, factor_x));
+    observation->update(get_screen_buffer());
+}
+
+void Emulator::save_header(StateWriter& writer) const {
+    writer.write(STATE_MAGIC);
+    writer.write(STATE_VERSION);
+    writer.write(cartridge.getMapper());
+    writer.write(static_cast<uint32_t>(cartridge.getROM().size()));
+    writer.write(static_cast<uint32_t>(cartridge.getVROM().size()));
+}
+
+void Emulator::save_hardware(StateWriter& writer) const {
+    cpu.save_state(writer);
+    ppu.save_state(writer);
+    bus.save_state(writer);
+    picture_bus.save_state(writer);
+    mapper->save_state(writer);
+    controllers[0].save_state(writer);
+    controllers[1].save_state(writer);
+}
+
+void Emulator::load_hardware(StateReader& reader) {
+    cpu.load_state(reader);
+    ppu.load_state(reader);
+    bus.load_state(reader);
+    picture_bus.load_state(reader);
+    mapper->load_state(reader);
+    controllers[0].load_state(reader);
+    controllers[1].load_state(reader);
+}
+
+void Emulator::save(Snapshot& snapshot) const {
+    StateWriter writer(snapshot.state, sizeof(snapshot.state));
+    save_hardware(writer);
+    std::memcpy(snapshot.screen, ppu.get_screen_buffer(), sizeof(snapshot.screen));
+}
+
+void Emulator::load(const Snapshot& snapshot) {
+    load_without_drawing(snapshot);
+    update_screens();
+}
+
+void Emulator::load_without_drawing(const Snapshot& snapshot) {
+    StateReader reader(snapshot.state, sizeof(snapshot.state));
+    load_hardware(reader);
+    std::memcpy(get_screen_buffer(), snapshot.screen, sizeof(snapshot.screen));
+    // the history (and the movie) does not lead to the loaded state
+    rewind_buffer.clear();
+    movie.stop();
+}
+
+void Emulator::save(CachedSnapshot& cached) const {
+    save(cached.snapshot);
+    std::memcpy(cached.rgb_screen, rgb_output, sizeof(cached.rgb_screen));
+    if (!observation)
+        cached.observation.reset();
+    else if (cached.observation && cached.observation->is_like(*observation))
+        *cached.observation = *observation;
+    else
+        cached.observation.reset(new Observation(*observation));
+}
+
+void Emulator::load(const CachedSnapshot& cached) {
+    load_without_drawing(cached.snapshot);
+    std::memcpy(rgb_output, cached.rgb_screen, sizeof(cached.rgb_screen));
+    if (!observation)
+        return;
+    // the observation may have changed since the save (see set_observation)
+    if (cached.observation && cached.observation->is_like(*observation))
+        *observation = *cached.observation;
+    else
+        observation->update(get_screen_buffer());
+}
+
+void Emulator::save_state(std::vector<NES_Byte>& state) const {
+    state.resize(state_size());
+    StateWriter writer(state.data(), state.size());
+    save_header(writer);
+    save_hardware(writer);
+}
+
+bool Emulator::load_state(const NES_Byte* data, std::size_t size) {
+    // the layout of the state after the header depends only on the version
+    // and the ROM, so a matching header and size make the state valid
+    NES_Byte header[STATE_HEADER_SIZE];
+    StateWriter writer(header, sizeof(header));
+    save_header(writer);
+    if (size != state_size() || std::memcmp(data, header, sizeof(header)) != 0)
+        return false;
+    StateReader reader(data + sizeof(header), size - sizeof(header));
+    load_hardware(reader);
+    rewind_buffer.clear();
+    movie.stop();
+    update_screens();
+    return true;
+}
+
+std::size_t Emulator::state_size() const {
+    // count the bytes of the state without writing them
+    StateWriter writer(nullptr, 0);
+    save_header(writer);
+    save_hardware(writer);
+    return writer.written();
+}
+
+void Emulator::step(bool render) {
+    run_frame(render);
+    if (render)
+        update_screens();
+}
+
+void Emulator::step(int frames, bool max_pool) {
+    // pooling only makes sense when there are at least two frames
+    max_pool = max_pool && frames > 1;
+    // the first frame that reaches the screen (earlier frames are skipped)
+    const int first_drawn_frame = frames - (max_pool ? 2 : 1);
+    for (int frame = 0; frame < frames; frame++) {
+        // keep a copy of the second to last frame for max-pooling
+        if (max_pool && frame == frames - 1) {
+            update_screens();
+            auto screen = get_rgb_screen_buffer();
+            pool_buffer.assign(screen, screen + WIDTH * HEIGHT * 3);
+            if (observation) {
+                auto buffer = observation->get_buffer();
+                pool_observation.assign(buffer, buffer + observation->size());
+            }
+        }
+        run_frame(frame >= first_drawn_frame);
     }
+    update_screens();
+    if (!max_pool)
+        return;
+    // take the maximum of each color channel of the last two frames
+    auto screen = get_rgb_screen_buffer();
+    for (int i = 0; i < WIDTH * HEIGHT * 3; i++)
+        screen[i] = std::max(screen[i], pool_buffer[i]);
+    if (!observation)
+        return;
+    observation->pool(pool_observation);
 }
 
 }  // namespace NES
@@ -5,9 +5,14 @@
 //  Copyright (c) 2019 Christian Kauten. All rights reserved.
 //
 
+#include <algorithm>
 #include <string>
+#include <vector>
 #include "common.hpp"
 #include "emulator.hpp"
+#include "palette.hpp"
+#include "rom_cache.hpp"
+#include "vector_emulator.hpp"
 
 // Windows-base systems
 #if defined(_WIN32) || defined(WIN32) || defined(__CYGWIN__) || defined(__MINGW32__) || defined(__BORLANDC__)
@@ -42,16 +47,69 @@ extern "C" {
         return new NES::Emulator(rom_path);
     }
 
+    /// Initialize a new emulator from an iNES ROM image in memory and return
+    /// a pointer to it
+    EXP NES::Emulator* InitializeFromBuffer(const NES::NES_Byte* rom, std::size_t size) {
+        return new NES::Emulator(rom, size);
+    }
+
+    /// Return the number of blocks of ROM data shared by the emulators
+    EXP std::size_t ROMCacheSize() {
+        return NES::ROMCache::size();
+    }
+
+    /// Create an independent copy of an emulator that shares its ROM data
+    EXP NES::Emulator* Clone(NES::Emulator* emu) {
+        return new NES::Emulator(*emu);
+    }
+
     /// Return a pointer to a controller on the machine
     EXP NES::NES_Byte* Controller(NES::Emulator* emu, int port) {
         return emu->get_controller(port);
     }
 
-    /// Return the pointer to the screen buffer
-    EXP NES::NES_Pixel* Screen(NES::Emulator* emu) {
+    /// Return the pointer to the screen buffer of palette indexes
+    EXP NES::NES_Byte* Screen(NES::Emulator* emu) {
         return emu->get_screen_buffer();
     }
 
+    /// Return the pointer to the 64 xRGB colors of the system palette
+    EXP const NES::NES_Pixel* Palette() {
+        return NES::PALETTE;
+    }
+
+    /// Return the pointer to the packed 24-bit RGB screen buffer
+    EXP NES::NES_Byte* ScreenRGB(NES::Emulator* emu) {
+        return emu->get_rgb_screen_buffer();
+    }
+
+    /// Draw the packed 24-bit RGB screen into a buffer owned by the caller
+    EXP void SetScreenRGB(NES::Emulator* emu, NES::NES_Byte* buffer) {
+        emu->set_rgb_screen_buffer(buffer);
+    }
+
+    /// Compute an observation of a region of the screen after frames
+    EXP void SetObservation(
+        NES::Emulator* emu,
+        int mode,
+        int top,
+        int bottom,
+        int left,
+        int right,
+        int factor_y,
+        int factor_x
+    ) {
+        emu->set_observation(
+            static_cast<NES::Observation::Mode>(mode),
+            top, bottom, left, right, factor_y, factor_x
+        );
+    }
+
+    /// Return the pointer to the observation buffer
+    EXP NES::NES_Byte* ObservationBuffer(NES::Emulator* emu) {
+        return emu->get_observation_buffer();
+    }
+
     /// Return the pointer to the memory buffer
     EXP NES::NES_Byte* Memory(NES::Emulator* emu) {
         return emu->get_memory_buffer();
@@ -62,9 +120,16 @@ extern "C" {
         emu->reset();
     }
 
-    /// Perform a discrete step in the emulator (i.e., 1 frame)
-    EXP void Step(NES::Emulator* emu) {
-        emu->step();
+    /// Perform a discrete step in the emulator (i.e., 1 frame), optionally
+    /// without drawing the frame
+    EXP void Step(NES::Emulator* emu, bool render) {
+        emu->step(render);
+    }
+
+    /// Perform a number of steps holding an action on the first controller
+    EXP void StepN(NES::Emulator* emu, NES::NES_Byte action, int frames, bool max_pool) {
+        *emu->get_controller(0) = action;
+        emu->step(frames, max_pool);
     }
 
     /// Create a deep copy (i.e., a clone) of the given emulator
@@ -77,10 +142,207 @@ extern "C" {
         emu->restore();
     }
 
+    /// Return the number of bytes of memory occupied by a numbered slot
+    EXP std::size_t SlotSize() {
+        return NES::SnapshotStore::SLOT_SIZE;
+    }
+
+    /// Save the state of the emulator to a numbered slot
+    EXP void SaveSlot(NES::Emulator* emu, int id) {
+        emu->save_slot(id);
+    }
+
+    /// Save the state of the emulator to a numbered slot as a delta against
+    /// the full state in another slot
+    EXP bool SaveDeltaSlot(NES::Emulator* emu, int id, int base) {
+        return emu->save_delta_slot(id, base);
+    }
+
+    /// Load the state of the emulator from a numbered slot
+    EXP bool LoadSlot(NES::Emulator* emu, int id) {
+        return emu->load_slot(id);
+    }
+
+    /// Delete the state in a numbered slot of the emulator
+    EXP bool DropSlot(NES::Emulator* emu, int id) {
+        return emu->drop_slot(id);
+    }
+
+    /// Set the maximal number of bytes for the numbered slots to occupy
+    EXP void SetSlotCapacity(NES::Emulator* emu, std::size_t bytes) {
+        emu->set_slot_capacity(bytes);
+    }
+
+    /// Add the state of the emulator to its pool of states to reset to
+    EXP void AddResetState(NES::Emulator* emu) {
+        emu->add_reset_state();
+    }
+
+    /// Return the number of states in the pool of states to reset to
+    EXP int ResetStateCount(NES::Emulator* emu) {
+        return emu->get_reset_state_count();
+    }
+
+    /// Remove the states in the pool of states to reset to
+    EXP void ClearResetStates(NES::Emulator* emu) {
+        emu->clear_reset_states();
+    }
+
+    /// Load a state from the pool of states to reset to
+    EXP bool LoadResetState(NES::Emulator* emu, int index) {
+        return emu->load_reset_state(index);
+    }
+
+    /// Record keyframes and inputs of the emulator to rewind with
+    EXP void SetRewind(NES::Emulator* emu, int interval, std::size_t capacity) {
+        emu->set_rewind(interval, capacity);
+    }
+
+    /// Return the number of frames that the emulator can rewind
+    EXP int RewindFrames(NES::Emulator* emu) {
+        return emu->get_rewind_frames();
+    }
+
+    /// Return the number of bytes occupied by the rewind history of the emulator
+    EXP std::size_t RewindUsage(NES::Emulator* emu) {
+        return emu->get_rewind_usage();
+    }
+
+    /// Rewind the emulator by a number of frames
+    EXP bool Rewind(NES::Emulator* emu, int frames) {
+        return emu->rewind(frames);
+    }
+
+    /// Start recording a movie with a keyframe every few frames
+    EXP void StartMovie(NES::Emulator* emu, int interval) {
+        emu->start_movie(interval);
+    }
+
+    /// Stop recording the movie
+    EXP void StopMovie(NES::Emulator* emu) {
+        emu->stop_movie();
+    }
+
+    /// Return the number of frames in the recorded movie
+    EXP int MovieFrames(NES::Emulator* emu) {
+        return emu->get_movie().get_frames();
+    }
+
+    /// Return a pointer to the inputs of the movie (2 bytes per frame)
+    EXP const NES::NES_Byte* MovieInputs(NES::Emulator* emu) {
+        return emu->get_movie().get_inputs();
+    }
+
+    /// Return the number of keyframes in the recorded movie
+    EXP int MovieKeyframeCount(NES::Emulator* emu) {
+        return emu->get_movie().get_keyframe_count();
+    }
+
+    /// Return the index of the frame a keyframe of the movie precedes
+    EXP int MovieKeyframeFrame(NES::Emulator* emu, int index) {
+        return emu->get_movie().get_keyframe_frame(index);
+    }
+
+    /// Return a pointer to the binary state of a keyframe of the movie
+    EXP const NES::NES_Byte* MovieKeyframe(NES::Emulator* emu, int index) {
+        return emu->get_movie().get_keyframe(index).data();
+    }
+
+    /// Play frames with recorded inputs, copying an observation from a buffer
+    /// of the emulator after every few frames
+    EXP void Replay(
+        NES::Emulator* emu,
+        const NES::NES_Byte* inputs,
+        int frames,
+        int every,
+        const NES::NES_Byte* source,
+        std::size_t size,
+        NES::NES_Byte* observations
+    ) {
+        emu->replay(inputs, frames, every, source, size, observations);
+    }
+
+    /// Return the number of bytes occupied by the numbered slots of the emulator
+    EXP std::size_t SlotUsage(NES::Emulator* emu) {
+        return emu->get_slot_usage();
+    }
+
+    /// Return the number of bytes in a binary state of the emulator
+    EXP std::size_t StateSize(NES::Emulator* emu) {
+        return emu->state_size();
+    }
+
+    /// Serialize the state of the emulator into a buffer of StateSize bytes
+    EXP void GetState(NES::Emulator* emu, NES::NES_Byte* buffer) {
+        std::vector<NES::NES_Byte> state;
+        emu->save_state(state);
+        std::copy(state.begin(), state.end(), buffer);
+    }
+
+    /// Deserialize the state of the emulator from a buffer
+    EXP bool SetState(NES::Emulator* emu, const NES::NES_Byte* buffer, std::size_t size) {
+        return emu->load_state(buffer, size);
+    }
+
     /// Close the emulator, i.e., purge it from memory
     EXP void Close(NES::Emulator* emu) {
         delete emu;
     }
+
+    /// Initialize a new batch of emulators and return a pointer to it
+    EXP NES::VectorEmulator* InitializeBatch(wchar_t* path, int size) {
+        // convert the c string to a c++ std string data structure
+        std::wstring ws_rom_path(path);
+        std::string rom_path(ws_rom_path.begin(), ws_rom_path.end());
+        // create a new batch of emulators with the given ROM path
+        return new NES::VectorEmulator(rom_path, size);
+    }
+
+    /// Return a pointer to an emulator in a batch
+    EXP NES::Emulator* BatchEmulator(NES::VectorEmulator* batch, int index) {
+        return batch->get_emulator(index);
+    }
+
+    /// Return the pointer to the 24-bit RGB screens of a batch
+    EXP NES::NES_Byte* ScreenBatch(NES::VectorEmulator* batch) {
+        return batch->get_observation_buffer();
+    }
+
+    /// Set the number of worker threads (pinned to the given cores) of a batch
+    EXP void SetBatchThreads(
+        NES::VectorEmulator* batch,
+        int threads,
+        int* cores,
+        int num_cores
+    ) {
+        batch->set_threads(threads, std::vector<int>(cores, cores + num_cores));
+    }
+
+    /// Copy the screen of an emulator in a batch into the batch screens
+    EXP void ObserveBatch(NES::VectorEmulator* batch, int index) {
+        batch->observe(index);
+    }
+
+    /// Step every emulator in a batch with an action per emulator and return
+    /// false (without stepping) if the number of actions is not the size of
+    /// the batch
+    EXP bool StepBatch(
+        NES::VectorEmulator* batch,
+        NES::NES_Byte* actions,
+        int size,
+        int frames,
+        bool max_pool
+    ) {
+        if (size != batch->size())
+            return false;
+        batch->step(actions, frames, max_pool);
+        return true;
+    }
+
+    /// Close a batch of emulators, i.e., purge them from memory
+    EXP void CloseBatch(NES::VectorEmulator* batch) {
+        delete batch;
+    }
 }
 
 // un-define the macro
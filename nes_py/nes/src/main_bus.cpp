@@ -6,7 +6,10 @@
 //
 
 #include "main_bus.hpp"
+#include "controller.hpp"
+#include "cpu.hpp"
 #include "log.hpp"
+#include "ppu.hpp"
 
 namespace NES {
 
@@ -15,19 +18,15 @@ NES_Byte MainBus::read(NES_Address address) {
         return ram[address & 0x7ff];
     } else if (address < 0x4020) {
         if (address < 0x4000) {  // PPU registers, mirrored
-            auto reg = static_cast<IORegisters>(address & 0x2007);
-            if (read_callbacks.count(reg))
-                return read_callbacks.at(reg)();
-            else
-                LOG(InfoVerbose) << "No read callback registered for I/O register at: " << std::hex << +address << std::endl;
+            sync_ppu();
+            return read_ppu_register(address);
+        } else if (address == JOY1) {
+            return controllers[0].read();
+        } else if (address == JOY2) {
+            return controllers[1].read();
         } else if (address < 0x4018 && address >= 0x4014) {  // only *some* IO registers
-            auto reg = static_cast<IORegisters>(address);
-            if (read_callbacks.count(reg))
-                return read_callbacks.at(reg)();
-            else
-                LOG(InfoVerbose) << "No read callback registered for I/O register at: " << std::hex << +address << std::endl;
-        }
-        else {
+            LOG(InfoVerbose) << "No read handler for I/O register at: " << std::hex << +address << std::endl;
+        } else {
             LOG(InfoVerbose) << "Read access attempt at: " << std::hex << +address << std::endl;
         }
     } else if (address < 0x6000) {
@@ -46,17 +45,17 @@ void MainBus::write(NES_Address address, NES_Byte value) {
         ram[address & 0x7ff] = value;
     } else if (address < 0x4020) {
         if (address < 0x4000) {  // PPU registers, mirrored
-            auto reg = static_cast<IORegisters>(address & 0x2007);
-            if (write_callbacks.count(reg))
-                return write_callbacks.at(reg)(value);
-            else
-                LOG(InfoVerbose) << "No write callback registered for I/O register at: " << std::hex << +address << std::endl;
+            sync_ppu();
+            write_ppu_register(address, value);
+        } else if (address == OAMDMA) {
+            sync_ppu();
+            cpu->skip_DMA_cycles();
+            ppu->do_DMA(get_page_pointer(value));
+        } else if (address == JOY1) {
+            controllers[0].strobe(value);
+            controllers[1].strobe(value);
         } else if (address < 0x4017 && address >= 0x4014) {  // only some registers
-            auto reg = static_cast<IORegisters>(address);
-            if (write_callbacks.count(reg))
-                return write_callbacks.at(reg)(value);
-            else
-                LOG(InfoVerbose) << "No write callback registered for I/O register at: " << std::hex << +address << std::endl;
+            LOG(InfoVerbose) << "No write handler for I/O register at: " << std::hex << +address << std::endl;
         } else {
             LOG(InfoVerbose) << "Write access attmept at: " << std::hex << +address << std::endl;
         }
@@ -66,7 +65,42 @@ void MainBus::write(NES_Address address, NES_Byte value) {
         if (mapper->hasExtendedRAM())
             extended_ram[address - 0x6000] = value;
     } else {
+        // the mapper may switch the CHR banks or mirroring that the PPU reads
+        sync_ppu();
         mapper->writePRG(address, value);
+        ppu->invalidate_scanline();
+    }
+}
+
+void MainBus::sync_ppu() {
+    for (; ppu_lag > 0; --ppu_lag)
+        ppu->cycle(*picture_bus);
+}
+
+NES_Byte MainBus::read_ppu_register(NES_Address address) {
+    // the 8 registers mirror every 8 bytes, so the low 3 bits index them
+    switch (address & 0x7) {
+        case PPUSTATUS & 0x7: return ppu->get_status();
+        case OAMDATA & 0x7:   return ppu->get_OAM_data();
+        case PPUDATA & 0x7:   return ppu->get_data(*picture_bus);
+        default:
+            LOG(InfoVerbose) << "No read handler for I/O register at: " << std::hex << +address << std::endl;
+            return 0;
+    }
+}
+
+void MainBus::write_ppu_register(NES_Address address, NES_Byte value) {
+    // the 8 registers mirror every 8 bytes, so the low 3 bits index them
+    switch (address & 0x7) {
+        case PPUCTRL & 0x7:  ppu->control(value);                   break;
+        case PPUMASK & 0x7:  ppu->set_mask(value);                  break;
+        case OAMADDR & 0x7:  ppu->set_OAM_address(value);           break;
+        case OAMDATA & 0x7:  ppu->set_OAM_data(value);              break;
+        case PPUSCROL & 0x7: ppu->set_scroll(value);                break;
+        case PPUADDR & 0x7:  ppu->set_data_address(value);          break;
+        case PPUDATA & 0x7:  ppu->set_data(*picture_bus, value);    break;
+        default:
+            LOG(InfoVerbose) << "No write handler for I/O register at: " << std::hex << +address << std::endl;
     }
 }
 
@@ -91,4 +125,14 @@ void MainBus::set_mapper(Mapper* mapper) {
         extended_ram.resize(0x2000);
 }
 
+void MainBus::save_state(StateWriter& writer) const {
+    writer.write(ram);
+    writer.write(extended_ram);
+}
+
+void MainBus::load_state(StateReader& reader) {
+    reader.read(ram);
+    reader.read(extended_ram);
+}
+
 }  // namespace NES
@@ -18,4 +18,12 @@ void MapperCNROM::writeCHR(NES_Address address, NES_Byte value) {
         std::endl;
 }
 
+void MapperCNROM::save_state(StateWriter& writer) const {
+    writer.write(select_chr);
+}
+
+void MapperCNROM::load_state(StateReader& reader) {
+    reader.read(select_chr);
+}
+
 }  // namespace NES
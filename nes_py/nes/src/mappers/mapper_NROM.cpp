@@ -16,6 +16,7 @@ MapperNROM::MapperNROM(Cartridge* cart) :
     has_character_ram(cart->getVROM().size() == 0) {
     if (has_character_ram) {
         character_ram.resize(0x2000);
+        character_patterns.decode(character_ram);
         LOG(Info) << "Uses character RAM" << std::endl;
     }
 }
@@ -30,14 +31,24 @@ void MapperNROM::writePRG(NES_Address address, NES_Byte value) {
 }
 
 void MapperNROM::writeCHR(NES_Address address, NES_Byte value) {
-    if (has_character_ram)
+    if (has_character_ram) {
         character_ram[address] = value;
-    else
+        character_patterns.update(character_ram, address);
+    } else {
         LOG(Info) <<
             "Read-only CHR memory write attempt at " <<
             std::hex <<
             address <<
             std::endl;
+    }
+}
+
+void MapperNROM::save_state(StateWriter& writer) const {
+    writer.write(character_ram);
+}
+
+void MapperNROM::load_state(StateReader& reader) {
+    character_patterns.load(character_ram, reader);
 }
 
 }  // namespace NES
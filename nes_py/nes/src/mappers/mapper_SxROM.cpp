@@ -28,6 +28,7 @@ MapperSxROM::MapperSxROM(Cartridge* cart, std::function<void(void)> mirroring_cb
     if (cart->getVROM().size() == 0) {
         has_character_ram = true;
         character_ram.resize(0x2000);
+        character_patterns.decode(character_ram);
         LOG(Info) << "Uses character RAM" << std::endl;
     } else {
         LOG(Info) << "Using CHR-ROM" << std::endl;
@@ -112,10 +113,44 @@ void MapperSxROM::calculatePRGPointers() {
 }
 
 void MapperSxROM::writeCHR(NES_Address address, NES_Byte value) {
-    if (has_character_ram)
+    if (has_character_ram) {
         character_ram[address] = value;
-    else
+        character_patterns.update(character_ram, address);
+    } else {
         LOG(Info) << "Read-only CHR memory write attempt at " << std::hex << address << std::endl;
+    }
+}
+
+void MapperSxROM::save_state(StateWriter& writer) const {
+    writer.write(mirroring);
+    writer.write(mode_chr);
+    writer.write(mode_prg);
+    writer.write(temp_register);
+    writer.write(write_counter);
+    writer.write(register_prg);
+    writer.write(register_chr0);
+    writer.write(register_chr1);
+    writer.write(first_bank_prg);
+    writer.write(second_bank_prg);
+    writer.write(first_bank_chr);
+    writer.write(second_bank_chr);
+    writer.write(character_ram);
+}
+
+void MapperSxROM::load_state(StateReader& reader) {
+    reader.read(mirroring);
+    reader.read(mode_chr);
+    reader.read(mode_prg);
+    reader.read(temp_register);
+    reader.read(write_counter);
+    reader.read(register_prg);
+    reader.read(register_chr0);
+    reader.read(register_chr1);
+    reader.read(first_bank_prg);
+    reader.read(second_bank_prg);
+    reader.read(first_bank_chr);
+    reader.read(second_bank_chr);
+    character_patterns.load(character_ram, reader);
 }
 
 }  // namespace NES
@@ -17,6 +17,7 @@ MapperUxROM::MapperUxROM(Cartridge* cart) :
     select_prg(0) {
     if (has_character_ram) {
         character_ram.resize(0x2000);
+        character_patterns.decode(character_ram);
         LOG(Info) << "Uses character RAM" << std::endl;
     }
 }
@@ -35,15 +36,34 @@ NES_Byte MapperUxROM::readCHR(NES_Address address) {
         return cartridge->getVROM()[address];
 }
 
-void MapperUxROM::writeCHR(NES_Address address, NES_Byte value) {
+const NES_Byte* MapperUxROM::readCHRPattern(NES_Address address) {
     if (has_character_ram)
-        character_ram[address] = value;
+        return character_patterns.get_row(address);
     else
+        return cartridge->getVROMPatterns().get_row(address);
+}
+
+void MapperUxROM::writeCHR(NES_Address address, NES_Byte value) {
+    if (has_character_ram) {
+        character_ram[address] = value;
+        character_patterns.update(character_ram, address);
+    } else {
         LOG(Info) <<
             "Read-only CHR memory write attempt at " <<
             std::hex <<
             address <<
             std::endl;
+    }
+}
+
+void MapperUxROM::save_state(StateWriter& writer) const {
+    writer.write(select_prg);
+    writer.write(character_ram);
+}
+
+void MapperUxROM::load_state(StateReader& reader) {
+    reader.read(select_prg);
+    character_patterns.load(character_ram, reader);
 }
 
 }  // namespace NES
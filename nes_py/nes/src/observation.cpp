@@ -0,0 +1,101 @@
+//  Program:      nes-py
+//  File:         observation.cpp
+//  Description:  This class houses the logic and data for small observations
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#include <algorithm>
+#include "observation.hpp"
+#include "palette.hpp"
+#include "ppu.hpp"
+
+namespace NES {
+
+Observation::Observation(
+    Mode mode,
+    int top,
+    int bottom,
+    int left,
+    int right,
+    int factor_y,
+    int factor_x
+) :
+    mode(mode),
+    top(top),
+    left(left),
+    factor_y(factor_y),
+    factor_x(factor_x),
+    // averaging drops partial blocks, striding keeps them (like slicing)
+    height((bottom - top + (mode == GRAY ? 0 : factor_y - 1)) / factor_y),
+    width((right - left + (mode == GRAY ? 0 : factor_x - 1)) / factor_x),
+    buffer(size(), 0) {
+    // convert each palette color to luma (ITU-R BT.601)
+    for (int index = 0; index < 64; index++) {
+        const NES_Pixel color = PALETTE[index];
+        luma[index] = 299 * ((color >> 16) & 0xff) +
+                      587 * ((color >> 8) & 0xff) +
+                      114 * (color & 0xff);
+    }
+}
+
+void Observation::update(const NES_Byte* screen) {
+    if (mode == GRAY)
+        update_gray(screen);
+    else
+        update_subsampled(screen);
+}
+
+void Observation::update_gray(const NES_Byte* screen) {
+    // the scale of the sum of luma over a block of pixels
+    const int scale = 1000 * factor_y * factor_x;
+    auto output = buffer.data();
+    for (int y = 0; y < height; y++) {
+        auto block_row = screen + (top + y * factor_y) * SCANLINE_VISIBLE_DOTS + left;
+        for (int x = 0; x < width; x++) {
+            // sum the luma over the block of pixels for this output pixel
+            int total = 0;
+            auto block = block_row + x * factor_x;
+            for (int dy = 0; dy < factor_y; dy++) {
+                for (int dx = 0; dx < factor_x; dx++)
+                    total += luma[block[dx]];
+                block += SCANLINE_VISIBLE_DOTS;
+            }
+            // write the mean rounded to the nearest integer
+            *output++ = (total + scale / 2) / scale;
+        }
+    }
+}
+
+void Observation::update_subsampled(const NES_Byte* screen) {
+    auto output = buffer.data();
+    for (int y = 0; y < height; y++) {
+        auto row = screen + (top + y * factor_y) * SCANLINE_VISIBLE_DOTS + left;
+        for (int x = 0; x < width; x++) {
+            const NES_Byte index = row[x * factor_x];
+            if (mode == INDEX) {
+                *output++ = index;
+                continue;
+            }
+            // look up the palette index and write its R, G, B bytes
+            const NES_Pixel color = PALETTE[index];
+            *output++ = color >> 16;
+            *output++ = color >> 8;
+            *output++ = color;
+        }
+    }
+}
+
+void Observation::pool(const std::vector<NES_Byte>& previous) {
+    if (mode != INDEX) {
+        for (std::size_t i = 0; i < buffer.size(); i++)
+            buffer[i] = std::max(buffer[i], previous[i]);
+        return;
+    }
+    // keep the earlier index only when its color is strictly brighter
+    for (std::size_t i = 0; i < buffer.size(); i++)
+        if (luma[previous[i]] > luma[buffer[i]])
+            buffer[i] = previous[i];
+}
+
+}  // namespace NES
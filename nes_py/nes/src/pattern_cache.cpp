@@ -0,0 +1,73 @@
+//  Program:      nes-py
+//  File:         pattern_cache.cpp
+//  Description:  A cache of the decoded pixels of the patterns in CHR memory
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#include <algorithm>
+#include <cstring>
+#include <mutex>
+#include <unordered_map>
+#include "pattern_cache.hpp"
+
+namespace NES {
+
+/// the decoded patterns of the blocks of CHR ROM indexed by the block (the
+/// ROM cache shares one block between all cartridges of the same game)
+static std::unordered_map<const std::vector<NES_Byte>*, std::weak_ptr<const PatternCache>> caches;
+/// the mutex guarding the caches (emulators may be created on any thread)
+static std::mutex caches_mutex;
+
+void PatternCache::decode(const std::vector<NES_Byte>& chr) {
+    // round up to a whole pattern in case the CHR is truncated
+    pixels.resize(index((chr.size() + 15) & ~static_cast<std::size_t>(15)));
+    for (std::size_t address = 0; address < chr.size(); address++) {
+        // skip the high bitplanes, they decode with the low bitplanes
+        if (address & 8)
+            continue;
+        NES_Byte high = address + 8 < chr.size() ? chr[address + 8] : 0;
+        set_row(address, chr[address], high);
+    }
+}
+
+void PatternCache::load(std::vector<NES_Byte>& chr, StateReader& reader) {
+    // like reading the whole block, read nothing from a truncated state
+    auto incoming = reader.skip(chr.size());
+    if (incoming == nullptr || std::memcmp(chr.data(), incoming, chr.size()) == 0)
+        return;
+    for (std::size_t address = 0; address < chr.size(); address += 16) {
+        const std::size_t count = std::min<std::size_t>(16, chr.size() - address);
+        if (std::memcmp(&chr[address], incoming + address, count) == 0)
+            continue;
+        std::memcpy(&chr[address], incoming + address, count);
+        // decode the rows of the pattern from its low and high bitplanes
+        for (std::size_t row = address; row < address + std::min<std::size_t>(count, 8); row++)
+            set_row(row, chr[row], row + 8 < chr.size() ? chr[row + 8] : 0);
+    }
+}
+
+std::shared_ptr<const PatternCache> PatternCache::get(
+    const std::shared_ptr<const std::vector<NES_Byte>>& chr
+) {
+    std::lock_guard<std::mutex> lock(caches_mutex);
+    auto entry = caches.find(chr.get());
+    if (entry != caches.end()) {
+        auto cache = entry->second.lock();
+        if (cache)
+            return cache;
+    }
+    // drop the patterns that no cartridge refers to anymore
+    for (auto other = caches.begin(); other != caches.end();) {
+        if (other->second.expired())
+            other = caches.erase(other);
+        else
+            ++other;
+    }
+    auto cache = std::make_shared<PatternCache>(*chr);
+    cache->rom = chr;
+    caches[chr.get()] = cache;
+    return cache;
+}
+
+}  // namespace NES
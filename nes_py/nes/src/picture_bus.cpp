@@ -85,4 +85,16 @@ void PictureBus::update_mirroring() {
     }
 }
 
+void PictureBus::save_state(StateWriter& writer) const {
+    writer.write(ram);
+    writer.write(name_tables);
+    writer.write(palette);
+}
+
+void PictureBus::load_state(StateReader& reader) {
+    reader.read(ram);
+    reader.read(name_tables);
+    reader.read(palette);
+}
+
 }  // namespace NES
@@ -5,9 +5,9 @@
 //  Copyright (c) 2019 Christian Kauten. All rights reserved.
 //
 
+#include <algorithm>
 #include <cstring>
 #include "ppu.hpp"
-#include "palette.hpp"
 #include "log.hpp"
 
 namespace NES {
@@ -16,13 +16,17 @@ void PPU::reset() {
     is_long_sprites = false;
     is_interrupting = false;
     is_vblank = false;
+    is_sprite_zero_hit = false;
     is_showing_background = true;
+    is_hiding_edge_sprites = false;
+    is_hiding_edge_background = false;
     is_showing_sprites = true;
     is_even_frame = true;
     is_first_write = true;
     background_page = LOW;
     sprite_page = LOW;
     data_address = 0;
+    data_buffer = 0;
     cycles = 0;
     scanline = 0;
     sprite_data_address = 0;
@@ -30,8 +34,112 @@ void PPU::reset() {
     temp_address = 0;
     data_address_increment = 1;
     pipeline_state = PRE_RENDER;
-    scanline_sprites.reserve(8);
-    scanline_sprites.resize(0);
+    is_background_line_valid = false;
+    is_sprite_line_valid = false;
+    scanline_sprite_count = 0;
+}
+
+int PPU::get_cycles_before_vblank() const {
+    // count 340 cycles per line (instead of 341) and at most the remainder of
+    // the current line, so the bound never exceeds the actual number
+    const int LINE = SCANLINE_END_CYCLE - 1;
+    const int rest_of_line = std::max(0, LINE - cycles);
+    switch (pipeline_state) {
+        case PRE_RENDER:
+            return rest_of_line + (VISIBLE_SCANLINES + 1) * LINE;
+        case RENDER:
+            return rest_of_line + (VISIBLE_SCANLINES - 1 - scanline) * LINE + LINE;
+        case POST_RENDER:
+            return rest_of_line;
+        case VERTICAL_BLANK:
+            if (scanline == VISIBLE_SCANLINES + 1 && cycles <= 1)
+                return 0;
+            return rest_of_line + (FRAME_END_SCANLINE - 1 - scanline) * LINE +
+                LINE - 1 + (VISIBLE_SCANLINES + 1) * LINE;
+    }
+    return 0;
+}
+
+void PPU::render_background_line(PictureBus& bus) {
+    // follow the coarse X increments of the dots on a copy of the address
+    NES_Address address = data_address;
+    int x = 0;
+    while (x < SCANLINE_VISIBLE_DOTS) {
+        const NES_Byte* pixels;
+        NES_Byte palette = fetch_tile(bus, address, pixels) << 2;
+        // emit the pixels of the tile from the fine X of the dot onward
+        int x_fine = (fine_x_scroll + x) % 8;
+        for (; x_fine < 8 && x < SCANLINE_VISIBLE_DOTS; ++x_fine, ++x)
+            background_line[x] = palette | pixels[x_fine];
+        // increment / wrap coarse X after the last pixel of the tile
+        if (x_fine == 8) {
+            if ((address & 0x001F) == 31) {
+                address &= ~0x001F;
+                address ^= 0x0400;
+            } else {
+                address += 1;
+            }
+        }
+    }
+}
+
+void PPU::render_sprite_line(PictureBus& bus) {
+    std::memset(sprite_line, 0, sizeof(sprite_line));
+    const int y = scanline;
+    const int length = (is_long_sprites) ? 16 : 8;
+    for (int index = 0; index < scanline_sprite_count; ++index) {
+        NES_Byte i = scanline_sprites[index];
+        NES_Byte spr_y     = sprite_memory[i * 4 + 0] + 1,
+                 tile      = sprite_memory[i * 4 + 1],
+                 attribute = sprite_memory[i * 4 + 2],
+                 spr_x     = sprite_memory[i * 4 + 3];
+
+        int y_offset = (y - spr_y) % length;
+        if ((attribute & 0x80) != 0) //IF flipping vertically
+            y_offset ^= (length - 1);
+
+        NES_Address address = 0;
+        if (!is_long_sprites) {
+            address = tile * 16 + y_offset;
+            if (sprite_page == HIGH) address += 0x1000;
+        }
+        // 8 x 16 sprites
+        else {
+            //bit-3 is one if it is the bottom tile of the sprite, multiply by two to get the next pattern
+            y_offset = (y_offset & 7) | ((y_offset & 8) << 1);
+            address = (tile >> 1) * 32 + y_offset;
+            address |= (tile & 1) << 12; //Bank 0x1000 if bit-0 is high
+        }
+
+        NES_Byte row[16];
+        const NES_Byte* pixels = row;
+        if (y_offset >= 0) {
+            pixels = bus.read_pattern(address);
+        } else {
+            // the sprites of the first line are evaluated on the last line
+            // of the previous frame, so their rows may straddle two patterns
+            NES_Byte low = bus.read(address), high = bus.read(address + 8);
+            for (int x_fine = 0; x_fine < 8; ++x_fine) {
+                row[x_fine] = row[15 - x_fine] =
+                    ((low >> (7 ^ x_fine)) & 1) | (((high >> (7 ^ x_fine)) & 1) << 1);
+            }
+        }
+        //the flipped pixels follow the row
+        if ((attribute & 0x40) != 0) //If flipping horizontally
+            pixels += 8;
+
+        NES_Byte flags = 0x10 | ((attribute & 0x3) << 2); //Select sprite palette, bits 2-3
+        if (attribute & 0x20)
+            flags |= SPRITE_BEHIND;
+        if (i == 0)
+            flags |= SPRITE_ZERO;
+        // the earlier sprites have priority, so only fill transparent dots
+        for (int x_offset = 0; x_offset < 8 && spr_x + x_offset < SCANLINE_VISIBLE_DOTS; ++x_offset) {
+            NES_Byte& dot = sprite_line[spr_x + x_offset];
+            if (!dot && pixels[x_offset])
+                dot = flags | pixels[x_offset];
+        }
+    }
 }
 
 void PPU::cycle(PictureBus& bus) {
@@ -60,6 +168,12 @@ void PPU::cycle(PictureBus& bus) {
         }
         case RENDER: {
             if (cycles > 0 && cycles <= SCANLINE_VISIBLE_DOTS) {
+                // when not drawing, keep the scroll and sprite-zero timing only
+                if (!is_rendering_frame && !is_sprite_zero_candidate(cycles - 1)) {
+                    if (is_showing_background && (fine_x_scroll + cycles - 1) % 8 == 7)
+                        increment_coarse_x();
+                    break;
+                }
                 NES_Byte bgColor = 0, sprColor = 0;
                 bool bgOpaque = false, sprOpaque = true;
                 bool spriteForeground = false;
@@ -69,113 +183,53 @@ void PPU::cycle(PictureBus& bus) {
 
                 if (is_showing_background) {
                     auto x_fine = (fine_x_scroll + x) % 8;
+                    // fetch the background of the whole line at its start
+                    if (x == 0 && is_rendering_frame) {
+                        render_background_line(bus);
+                        is_background_line_valid = true;
+                    }
                     if (!is_hiding_edge_background || x >= 8) {
-                        // fetch tile
-                        // mask off fine y
-                        auto address = 0x2000 | (data_address & 0x0FFF);
-                        //auto address = 0x2000 + x / 8 + (y / 8) * (SCANLINE_VISIBLE_DOTS / 8);
-                        NES_Byte tile = bus.read(address);
-
-                        //fetch pattern
-                        //Each pattern occupies 16 bytes, so multiply by 16
-                        //Add fine y
-                        address = (tile * 16) + ((data_address >> 12/*y % 8*/) & 0x7);
-                        //set whether the pattern is in the high or low page
-                        address |= background_page << 12;
-                        //Get the corresponding bit determined by (8 - x_fine) from the right
-                        //bit 0 of palette entry
-                        bgColor = (bus.read(address) >> (7 ^ x_fine)) & 1;
-                        //bit 1
-                        bgColor |= ((bus.read(address + 8) >> (7 ^ x_fine)) & 1) << 1;
-
+                        if (is_background_line_valid) {
+                            bgColor = background_line[x];
+                        } else {
+                            // a register changed mid-line, fetch this dot
+                            const NES_Byte* pixels;
+                            NES_Byte palette = fetch_tile(bus, data_address, pixels);
+                            // get the pixel from the left
+                            bgColor = pixels[x_fine] | (palette << 2);
+                        }
                         //flag used to calculate final pixel with the sprite pixel
-                        bgOpaque = bgColor;
-
-                        //fetch attribute and calculate higher two bits of palette
-                        address = 0x23C0 | (data_address & 0x0C00) | ((data_address >> 4) & 0x38)
-                                    | ((data_address >> 2) & 0x07);
-                        auto attribute = bus.read(address);
-                        int shift = ((data_address >> 4) & 4) | (data_address & 2);
-                        //Extract and set the upper two bits for the color
-                        bgColor |= ((attribute >> shift) & 0x3) << 2;
+                        bgOpaque = bgColor & 0x3;
                     }
                     //Increment/wrap coarse X
-                    if (x_fine == 7) {
-                        // if coarse X == 31
-                        if ((data_address & 0x001F) == 31) {
-                            // coarse X = 0
-                            data_address &= ~0x001F;
-                            // switch horizontal nametable
-                            data_address ^= 0x0400;
-                        }
-                        else
-                            // increment coarse X
-                            data_address += 1;
-                    }
+                    if (x_fine == 7)
+                        increment_coarse_x();
                 }
 
-                if (is_showing_sprites && (!is_hiding_edge_sprites || x >= 8)) {
-                    for (auto i : scanline_sprites) {
-                        NES_Byte spr_x =     sprite_memory[i * 4 + 3];
-
-                        if (0 > x - spr_x || x - spr_x >= 8)
-                            continue;
-
-                        NES_Byte spr_y     = sprite_memory[i * 4 + 0] + 1,
-                             tile      = sprite_memory[i * 4 + 1],
-                             attribute = sprite_memory[i * 4 + 2];
-
-                        int length = (is_long_sprites) ? 16 : 8;
-
-                        int x_shift = (x - spr_x) % 8, y_offset = (y - spr_y) % length;
-
-                        if ((attribute & 0x40) == 0) //If NOT flipping horizontally
-                            x_shift ^= 7;
-                        if ((attribute & 0x80) != 0) //IF flipping vertically
-                            y_offset ^= (length - 1);
-
-                        NES_Address address = 0;
-
-                        if (!is_long_sprites) {
-                            address = tile * 16 + y_offset;
-                            if (sprite_page == HIGH) address += 0x1000;
-                        }
-                        // 8 x 16 sprites
-                        else {
-                            //bit-3 is one if it is the bottom tile of the sprite, multiply by two to get the next pattern
-                            y_offset = (y_offset & 7) | ((y_offset & 8) << 1);
-                            address = (tile >> 1) * 32 + y_offset;
-                            address |= (tile & 1) << 12; //Bank 0x1000 if bit-0 is high
-                        }
-
-                        sprColor |= (bus.read(address) >> (x_shift)) & 1; //bit 0 of palette entry
-                        sprColor |= ((bus.read(address + 8) >> (x_shift)) & 1) << 1; //bit 1
-
-                        if (!(sprOpaque = sprColor)) {
-                            sprColor = 0;
-                            continue;
-                        }
-
-                        sprColor |= 0x10; //Select sprite palette
-                        sprColor |= (attribute & 0x3) << 2; //bits 2-3
-
-                        spriteForeground = !(attribute & 0x20);
-
-                        //Sprite-0 hit detection
-                        if (!is_sprite_zero_hit && is_showing_background && i == 0 && sprOpaque && bgOpaque)
-                            is_sprite_zero_hit = true;
-
-                        break; //Exit the loop now since we've found the highest priority sprite
+                if (scanline_sprite_count && is_showing_sprites && (!is_hiding_edge_sprites || x >= 8)) {
+                    // draw the sprites of the whole line at its first sprite dot
+                    if (!is_sprite_line_valid) {
+                        render_sprite_line(bus);
+                        is_sprite_line_valid = true;
                     }
+                    NES_Byte sprite = sprite_line[x];
+                    sprOpaque = sprite;
+                    sprColor = sprite & SPRITE_COLOR;
+                    spriteForeground = !(sprite & SPRITE_BEHIND);
+                    //Sprite-0 hit detection
+                    if (!is_sprite_zero_hit && is_showing_background && (sprite & SPRITE_ZERO) && bgOpaque)
+                        is_sprite_zero_hit = true;
                 }
+                if (!is_rendering_frame)
+                    break;
                 // get the address of the color in the palette
                 NES_Byte paletteAddr = bgColor;
                 if ( (!bgOpaque && sprOpaque) || (bgOpaque && sprOpaque && spriteForeground) )
                     paletteAddr = sprColor;
                 else if (!bgOpaque && !sprOpaque)
                     paletteAddr = 0;
-                // lookup the pixel in the palette and write it to the screen
-                screen[y][x] = PALETTE[bus.read_palette(paletteAddr)];
+                // write the 6-bit index of the color in the system palette
+                screen[y][x] = bus.read_palette(paletteAddr) & 0x3f;
             }
             else if (cycles == SCANLINE_VISIBLE_DOTS + 1 && is_showing_background) {
                 //Shamelessly copied from nesdev wiki
@@ -213,25 +267,26 @@ void PPU::cycle(PictureBus& bus) {
 //                     sprite_data_address = 0;
 
             if (cycles >= SCANLINE_END_CYCLE) {
+                is_background_line_valid = false;
                 //Find and index sprites that are on the next Scanline
                 //This isn't where/when this indexing, actually copying in 2C02 is done
                 //but (I think) it shouldn't hurt any games if this is done here
 
-                scanline_sprites.resize(0);
+                scanline_sprite_count = 0;
 
                 int range = 8;
                 if (is_long_sprites)
                     range = 16;
 
-                NES_Byte j = 0;
-                for (NES_Byte i = sprite_data_address / 4; i < 64; ++i) {
+                for (int i = sprite_data_address / 4; i < 64; ++i) {
                     auto diff = (scanline - sprite_memory[i * 4]);
                     if (0 <= diff && diff < range) {
-                        scanline_sprites.push_back(i);
-                        if (++j >= 8)
+                        scanline_sprites[scanline_sprite_count] = i;
+                        if (++scanline_sprite_count >= 8)
                             break;
                     }
                 }
+                is_sprite_line_valid = false;
 
                 ++scanline;
                 cycles = 0;
@@ -277,20 +332,23 @@ void PPU::cycle(PictureBus& bus) {
 }
 
 void PPU::do_DMA(const NES_Byte* page_ptr) {
+    is_sprite_line_valid = false;
     std::memcpy(
-        sprite_memory.data() + sprite_data_address,
+        sprite_memory + sprite_data_address,
         page_ptr,
         256 - sprite_data_address
     );
     if (sprite_data_address)
         std::memcpy(
-            sprite_memory.data(),
+            sprite_memory,
             page_ptr + (256 - sprite_data_address),
             sprite_data_address
         );
 }
 
 void PPU::control(NES_Byte ctrl) {
+    is_background_line_valid = false;
+    is_sprite_line_valid = false;
     is_interrupting = ctrl & 0x80;
     is_long_sprites = ctrl & 0x20;
     background_page = static_cast<CharacterPage>(!!(ctrl & 0x10));
@@ -309,6 +367,7 @@ void PPU::control(NES_Byte ctrl) {
 }
 
 void PPU::set_mask(NES_Byte mask) {
+    is_background_line_valid = false;
     is_hiding_edge_background = !(mask & 0x2);
     is_hiding_edge_sprites = !(mask & 0x4);
     is_showing_background = mask & 0x8;
@@ -324,6 +383,7 @@ NES_Byte PPU::get_status() {
 }
 
 void PPU::set_data_address(NES_Byte address) {
+    is_background_line_valid = false;
     // data_address = ((data_address << 8) & 0xff00) | address;
     if (is_first_write) {
         // Unset the upper byte
@@ -340,6 +400,7 @@ void PPU::set_data_address(NES_Byte address) {
 }
 
 NES_Byte PPU::get_data(PictureBus& bus) {
+    is_background_line_valid = false;
     auto data = bus.read(data_address);
     data_address += data_address_increment;
     // Reads are delayed by one byte/read when address is in this range
@@ -350,11 +411,14 @@ NES_Byte PPU::get_data(PictureBus& bus) {
 }
 
 void PPU::set_data(PictureBus& bus, NES_Byte data) {
+    is_background_line_valid = false;
+    is_sprite_line_valid = false;
     bus.write(data_address, data);
     data_address += data_address_increment;
 }
 
 void PPU::set_scroll(NES_Byte scroll) {
+    is_background_line_valid = false;
     if (is_first_write) {
         temp_address &= ~0x1f;
         temp_address |= (scroll >> 3) & 0x1f;
@@ -367,4 +431,65 @@ void PPU::set_scroll(NES_Byte scroll) {
     }
 }
 
+void PPU::save_state(StateWriter& writer) const {
+    writer.write(pipeline_state);
+    writer.write(cycles);
+    writer.write(scanline);
+    writer.write(is_even_frame);
+    writer.write(is_vblank);
+    writer.write(is_sprite_zero_hit);
+    writer.write(data_address);
+    writer.write(temp_address);
+    writer.write(fine_x_scroll);
+    writer.write(is_first_write);
+    writer.write(data_buffer);
+    writer.write(sprite_data_address);
+    writer.write(is_showing_sprites);
+    writer.write(is_showing_background);
+    writer.write(is_hiding_edge_sprites);
+    writer.write(is_hiding_edge_background);
+    writer.write(is_long_sprites);
+    writer.write(is_interrupting);
+    writer.write(background_page);
+    writer.write(sprite_page);
+    writer.write(data_address_increment);
+    writer.write(sprite_memory);
+    // write the sprites of the next scanline as a count and 8 fixed slots
+    NES_Byte sprites[8] = {0};
+    std::copy(scanline_sprites, scanline_sprites + scanline_sprite_count, sprites);
+    writer.write(static_cast<NES_Byte>(scanline_sprite_count));
+    writer.write(sprites);
+}
+
+void PPU::load_state(StateReader& reader) {
+    reader.read(pipeline_state);
+    reader.read(cycles);
+    reader.read(scanline);
+    reader.read(is_even_frame);
+    reader.read(is_vblank);
+    reader.read(is_sprite_zero_hit);
+    reader.read(data_address);
+    reader.read(temp_address);
+    reader.read(fine_x_scroll);
+    reader.read(is_first_write);
+    reader.read(data_buffer);
+    reader.read(sprite_data_address);
+    reader.read(is_showing_sprites);
+    reader.read(is_showing_background);
+    reader.read(is_hiding_edge_sprites);
+    reader.read(is_hiding_edge_background);
+    reader.read(is_long_sprites);
+    reader.read(is_interrupting);
+    reader.read(background_page);
+    reader.read(sprite_page);
+    reader.read(data_address_increment);
+    reader.read(sprite_memory);
+    NES_Byte count = 0;
+    reader.read(count);
+    reader.read(scanline_sprites);
+    scanline_sprite_count = std::min<int>(count, 8);
+    is_background_line_valid = false;
+    is_sprite_line_valid = false;
+}
+
 }  // namespace NES
@@ -0,0 +1,78 @@
+//  Program:      nes-py
+//  File:         rewind_buffer.cpp
+//  Description:  A bounded history of keyframes and inputs for rewinding
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#include "rewind_buffer.hpp"
+
+namespace NES {
+
+void RewindBuffer::evict() {
+    while (keyframes.size() > 1 && usage > capacity) {
+        // drop the oldest keyframe and the inputs up to the next keyframe
+        const uint64_t count = keyframes[1].frame - keyframes[0].frame;
+        inputs.erase(inputs.begin(), inputs.begin() + count);
+        usage -= count * sizeof(Input) + keyframe_size(keyframes.front());
+        spare.swap(keyframes.front().data);
+        keyframes.pop_front();
+    }
+}
+
+void RewindBuffer::configure(int interval, std::size_t capacity) {
+    this->interval = interval > 0 ? interval : 0;
+    this->capacity = capacity;
+    clear();
+    std::deque<Keyframe>().swap(keyframes);
+    std::deque<Input>().swap(inputs);
+    std::vector<NES_Byte>().swap(spare);
+}
+
+void RewindBuffer::clear() {
+    keyframes.clear();
+    inputs.clear();
+    usage = 0;
+    frame = 0;
+}
+
+std::vector<NES_Byte>& RewindBuffer::add_keyframe(std::size_t size) {
+    keyframes.push_back({frame, std::vector<NES_Byte>()});
+    auto& keyframe = keyframes.back();
+    // reuse the memory of an evicted keyframe
+    keyframe.data.swap(spare);
+    keyframe.data.resize(size);
+    usage += keyframe_size(keyframe);
+    return keyframe.data;
+}
+
+void RewindBuffer::add_input(Input input) {
+    inputs.push_back(input);
+    usage += sizeof(Input);
+    frame++;
+    evict();
+}
+
+const RewindBuffer::Keyframe* RewindBuffer::find(int frames) const {
+    if (frames < 0 || static_cast<uint64_t>(frames) > get_frames())
+        return nullptr;
+    const uint64_t target = frame - frames;
+    // search from the newest keyframe as rewinds are usually short
+    for (auto keyframe = keyframes.rbegin(); keyframe != keyframes.rend(); ++keyframe)
+        if (keyframe->frame <= target)
+            return &*keyframe;
+    return nullptr;
+}
+
+void RewindBuffer::truncate(int frames) {
+    const uint64_t target = frame - frames;
+    while (!keyframes.empty() && keyframes.back().frame > target) {
+        usage -= keyframe_size(keyframes.back());
+        keyframes.pop_back();
+    }
+    inputs.resize(inputs.size() - frames);
+    usage -= frames * sizeof(Input);
+    frame = target;
+}
+
+}  // namespace NES
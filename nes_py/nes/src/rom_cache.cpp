@@ -0,0 +1,73 @@
+//  Program:      nes-py
+//  File:         rom_cache.cpp
+//  Description:  A process-wide cache of read-only ROM data
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#include <cstring>
+#include <mutex>
+#include <unordered_map>
+#include "rom_cache.hpp"
+
+namespace NES {
+
+/// the blocks of ROM data indexed by their content hash (a hash may map to
+/// several blocks in the unlikely event of a collision)
+static std::unordered_multimap<uint64_t, std::weak_ptr<const std::vector<NES_Byte>>> blocks;
+/// the mutex guarding the blocks (emulators may be created on any thread)
+static std::mutex blocks_mutex;
+
+/// Return a 64-bit FNV-1a style hash of a block of bytes (mixing a word of
+/// 8 bytes at a time for speed).
+///
+/// @param data a pointer to the bytes to hash
+/// @param size the number of bytes to hash
+/// @return the hash of the bytes
+///
+static uint64_t hash(const NES_Byte* data, std::size_t size) {
+    uint64_t value = 0xcbf29ce484222325 ^ size;
+    std::size_t index = 0;
+    for (; index + sizeof(uint64_t) <= size; index += sizeof(uint64_t)) {
+        uint64_t word;
+        std::memcpy(&word, data + index, sizeof(word));
+        value = (value ^ word) * 0x100000001b3;
+    }
+    for (; index < size; index++)
+        value = (value ^ data[index]) * 0x100000001b3;
+    return value;
+}
+
+std::shared_ptr<const std::vector<NES_Byte>> ROMCache::get(
+    const NES_Byte* data,
+    std::size_t size
+) {
+    const uint64_t key = hash(data, size);
+    std::lock_guard<std::mutex> lock(blocks_mutex);
+    auto range = blocks.equal_range(key);
+    for (auto entry = range.first; entry != range.second;) {
+        auto block = entry->second.lock();
+        if (!block) {
+            // drop blocks that no cartridge refers to anymore
+            entry = blocks.erase(entry);
+            continue;
+        }
+        // compare the bytes in case of a hash collision
+        if (block->size() == size && std::memcmp(block->data(), data, size) == 0)
+            return block;
+        ++entry;
+    }
+    auto block = std::make_shared<const std::vector<NES_Byte>>(data, data + size);
+    blocks.emplace(key, block);
+    return block;
+}
+
+std::size_t ROMCache::size() {
+    std::lock_guard<std::mutex> lock(blocks_mutex);
+    std::size_t count = 0;
+    for (const auto& entry : blocks)
+        count += !entry.second.expired();
+    return count;
+}
+
+}  // namespace NES
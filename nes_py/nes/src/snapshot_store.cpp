@@ -0,0 +1,164 @@
+//  Program:      nes-py
+//  File:         snapshot_store.cpp
+//  Description:  This class houses numbered snapshots of an NES emulator
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#include <cstring>
+#include "snapshot_store.hpp"
+
+namespace NES {
+
+std::size_t SnapshotStore::Slot::size() const {
+    if (!is_delta)
+        return SLOT_SIZE;
+    return sizeof(Slot) + sizeof(int) + 2 * sizeof(void*) +
+        pages.capacity() * sizeof(uint32_t) + data.capacity();
+}
+
+void SnapshotStore::evict() {
+    while (slots.size() > 1 && usage > capacity) {
+        auto slot = slots.find(recency.back());
+        if (!slot->second.is_delta && slot->second.snapshot.use_count() > 1) {
+            // evict the deltas of the base with it, since the base stays in
+            // memory while any of them does (but keep the most recent slot)
+            const Snapshot* base = slot->second.snapshot.get();
+            for (auto delta = slots.begin(); delta != slots.end();) {
+                if (delta->second.is_delta && delta->second.snapshot.get() == base && delta->first != recency.front())
+                    delta = erase(delta);
+                else
+                    ++delta;
+            }
+        }
+        erase(slot);
+        collect();
+    }
+}
+
+void SnapshotStore::release(Slot& slot) {
+    if (!slot.is_delta && slot.snapshot.use_count() > 1) {
+        orphans.push_back(slot.snapshot);
+        usage += sizeof(Snapshot);
+    }
+    slot.snapshot.reset();
+}
+
+void SnapshotStore::collect() {
+    for (auto orphan = orphans.begin(); orphan != orphans.end();) {
+        if (orphan->use_count() > 1) {
+            ++orphan;
+            continue;
+        }
+        usage -= sizeof(Snapshot);
+        orphan = orphans.erase(orphan);
+    }
+}
+
+std::unordered_map<int, SnapshotStore::Slot>::iterator SnapshotStore::erase(
+    std::unordered_map<int, Slot>::iterator slot
+) {
+    usage -= slot->second.size();
+    release(slot->second);
+    recency.erase(slot->second.position);
+    return slots.erase(slot);
+}
+
+void SnapshotStore::set_capacity(std::size_t bytes) {
+    capacity = bytes;
+    evict();
+}
+
+SnapshotStore::Slot& SnapshotStore::touch(int id) {
+    auto slot = slots.find(id);
+    if (slot == slots.end()) {
+        // add the new slot as the most recently used
+        recency.push_front(id);
+        auto& new_slot = slots[id];
+        new_slot.position = recency.begin();
+        return new_slot;
+    }
+    // move the slot to the front of the recency list
+    recency.splice(recency.begin(), recency, slot->second.position);
+    usage -= slot->second.size();
+    return slot->second;
+}
+
+Snapshot& SnapshotStore::save(int id) {
+    auto& slot = touch(id);
+    // copy on write: never overwrite a snapshot that deltas refer to
+    if (slot.is_delta || slot.snapshot.use_count() != 1) {
+        release(slot);
+        slot.snapshot = std::make_shared<Snapshot>();
+    }
+    slot.is_delta = false;
+    std::vector<uint32_t>().swap(slot.pages);
+    std::vector<NES_Byte>().swap(slot.data);
+    usage += slot.size();
+    collect();
+    evict();
+    return *slot.snapshot;
+}
+
+bool SnapshotStore::save_delta(int id, int base) {
+    auto base_slot = slots.find(base);
+    if (base_slot == slots.end() || base_slot->second.is_delta)
+        return false;
+    // hold the base in case the delta replaces the base slot itself
+    auto base_snapshot = base_slot->second.snapshot;
+    auto& slot = touch(id);
+    release(slot);
+    slot.snapshot = base_snapshot;
+    slot.is_delta = true;
+    slot.pages.clear();
+    slot.data.clear();
+    // store the pages of the hardware state that differ from the base
+    const NES_Byte* current = get_buffer().state;
+    const NES_Byte* reference = base_snapshot->state;
+    for (std::size_t offset = 0; offset < SNAPSHOT_STATE_SIZE; offset += PAGE_SIZE) {
+        const std::size_t count = page_size(offset);
+        if (std::memcmp(current + offset, reference + offset, count) == 0)
+            continue;
+        slot.pages.push_back(offset / PAGE_SIZE);
+        slot.data.insert(slot.data.end(), current + offset, current + offset + count);
+    }
+    slot.pages.shrink_to_fit();
+    slot.data.shrink_to_fit();
+    usage += slot.size();
+    collect();
+    evict();
+    return true;
+}
+
+const Snapshot* SnapshotStore::load(int id) {
+    auto slot = slots.find(id);
+    if (slot == slots.end())
+        return nullptr;
+    // move the slot to the front of the recency list
+    recency.splice(recency.begin(), recency, slot->second.position);
+    if (!slot->second.is_delta)
+        return slot->second.snapshot.get();
+    // materialize the delta by patching a copy of the base (and its screen)
+    auto& snapshot = get_buffer();
+    snapshot = *slot->second.snapshot;
+    NES_Byte* output = snapshot.state;
+    auto input = slot->second.data.data();
+    for (auto page : slot->second.pages) {
+        const std::size_t offset = page * PAGE_SIZE;
+        const std::size_t count = page_size(offset);
+        std::memcpy(output + offset, input, count);
+        input += count;
+    }
+    return &snapshot;
+}
+
+bool SnapshotStore::drop(int id) {
+    auto slot = slots.find(id);
+    if (slot == slots.end())
+        return false;
+    erase(slot);
+    collect();
+    return true;
+}
+
+}  // namespace NES
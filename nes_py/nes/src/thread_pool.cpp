@@ -0,0 +1,93 @@
+//  Program:      nes-py
+//  File:         thread_pool.cpp
+//  Description:  A pool of worker threads for running batches of tasks
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#include "thread_pool.hpp"
+#include "log.hpp"
+#if defined(__linux__)
+    #include <pthread.h>
+    #include <sched.h>
+#endif
+
+namespace NES {
+
+/// Pin a thread to a single CPU core (only supported on Linux).
+///
+/// @param thread the thread to pin
+/// @param core the index of the core to pin the thread to
+///
+static void pin_thread(std::thread& thread, int core) {
+#if defined(__linux__)
+    cpu_set_t cpu_set;
+    CPU_ZERO(&cpu_set);
+    CPU_SET(core, &cpu_set);
+    if (pthread_setaffinity_np(thread.native_handle(), sizeof(cpu_set_t), &cpu_set)) {
+        LOG(Error) << "Failed to pin worker thread to core " << core << std::endl;
+    }
+#else
+    LOG(Info) << "Thread pinning is not supported on this platform" << std::endl;
+#endif
+}
+
+ThreadPool::ThreadPool(int size, const std::vector<int>& cores) :
+    task_count(0),
+    next_index(0),
+    pending_workers(0),
+    generation(0),
+    is_stopping(false) {
+    workers.reserve(size);
+    for (int worker = 0; worker < size; worker++) {
+        workers.emplace_back(&ThreadPool::work, this, worker);
+        if (!cores.empty())
+            pin_thread(workers.back(), cores[worker % cores.size()]);
+    }
+}
+
+ThreadPool::~ThreadPool() {
+    {
+        std::lock_guard<std::mutex> lock(mutex);
+        is_stopping = true;
+    }
+    work_ready.notify_all();
+    for (auto& worker : workers)
+        worker.join();
+}
+
+void ThreadPool::work(int worker) {
+    int last_generation = 0;
+    while (true) {
+        // wait for a new run (or the shutdown of the pool)
+        {
+            std::unique_lock<std::mutex> lock(mutex);
+            work_ready.wait(lock, [&] {
+                return is_stopping || generation != last_generation;
+            });
+            if (is_stopping)
+                return;
+            last_generation = generation;
+        }
+        // claim indexes until the range is exhausted
+        for (int index = next_index++; index < task_count; index = next_index++)
+            task(index);
+        // notify the caller when the last worker finishes
+        std::lock_guard<std::mutex> lock(mutex);
+        if (--pending_workers == 0)
+            work_done.notify_one();
+    }
+}
+
+void ThreadPool::run(const std::function<void(int)>& function, int count) {
+    std::unique_lock<std::mutex> lock(mutex);
+    task = function;
+    task_count = count;
+    next_index = 0;
+    pending_workers = workers.size();
+    ++generation;
+    work_ready.notify_all();
+    work_done.wait(lock, [this] { return pending_workers == 0; });
+}
+
+}  // namespace NES
@@ -0,0 +1,55 @@
+//  Program:      nes-py
+//  File:         vector_emulator.cpp
+//  Description:  This class houses a batch of NES emulators stepped together
+//
+//  Copyright (c) 2019 Christian Kauten. All rights reserved.
+//
+
+#include <cstring>
+#include "vector_emulator.hpp"
+
+namespace NES {
+
+VectorEmulator::VectorEmulator(std::string rom_path, int size) :
+    observations(static_cast<std::size_t>(size) * OBSERVATION_SIZE, 0) {
+    emulators.reserve(size);
+    // load the ROM once and share it with clones of the first emulator
+    emulators.push_back(new Emulator(rom_path));
+    for (int index = 1; index < size; index++)
+        emulators.push_back(new Emulator(*emulators.front()));
+}
+
+VectorEmulator::~VectorEmulator() {
+    for (auto emulator : emulators)
+        delete emulator;
+}
+
+void VectorEmulator::set_threads(int threads, const std::vector<int>& cores) {
+    if (threads > 1)
+        pool.reset(new ThreadPool(threads, cores));
+    else
+        pool.reset();
+}
+
+void VectorEmulator::observe(int index) {
+    auto screen = emulators[index]->get_rgb_screen_buffer();
+    auto output = observations.data() + static_cast<std::size_t>(index) * OBSERVATION_SIZE;
+    std::memcpy(output, screen, OBSERVATION_SIZE);
+}
+
+void VectorEmulator::step(const NES_Byte* actions, int frames, bool max_pool) {
+    // the emulators share no mutable state, so they can step in parallel
+    auto step_index = [&](int index) {
+        *emulators[index]->get_controller(0) = actions[index];
+        emulators[index]->step(frames, max_pool);
+        observe(index);
+    };
+    if (pool) {
+        pool->run(step_index, size());
+    } else {
+        for (int index = 0; index < size(); index++)
+            step_index(index);
+    }
+}
+
+}  // namespace NES
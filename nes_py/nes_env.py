@@ -1,6 +1,9 @@
 """A CTypes interface to the C++ NES environment."""
+import copy
 import ctypes
+import functools
 import glob
+import hashlib
 import itertools
 import os
 import sys
@@ -9,7 +12,9 @@ from gym.spaces import Box
 from gym.spaces import Discrete
 import numpy as np
 from ._rom import ROM
+from . import _boot_cache
 from ._image_viewer import ImageViewer
+from .movie import Movie
 
 # ---------------------------
 # DEBUG CONTROLS (new)
@@ -46,12 +51,36 @@ _LIB.Height.restype = ctypes.c_uint
 # setup the argument and return types for Initialize
 _LIB.Initialize.argtypes = [ctypes.c_wchar_p]
 _LIB.Initialize.restype = ctypes.c_void_p
+# setup the argument and return types for InitializeFromBuffer
+_LIB.InitializeFromBuffer.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+_LIB.InitializeFromBuffer.restype = ctypes.c_void_p
+# setup the argument and return types for ROMCacheSize
+_LIB.ROMCacheSize.argtypes = None
+_LIB.ROMCacheSize.restype = ctypes.c_size_t
+# setup the argument and return types for Clone
+_LIB.Clone.argtypes = [ctypes.c_void_p]
+_LIB.Clone.restype = ctypes.c_void_p
 # setup the argument and return types for Controller
 _LIB.Controller.argtypes = [ctypes.c_void_p, ctypes.c_uint]
 _LIB.Controller.restype = ctypes.c_void_p
 # setup the argument and return types for Screen
 _LIB.Screen.argtypes = [ctypes.c_void_p]
 _LIB.Screen.restype = ctypes.c_void_p
+# setup the argument and return types for Palette
+_LIB.Palette.argtypes = None
+_LIB.Palette.restype = ctypes.c_void_p
+# setup the argument and return types for ScreenRGB
+_LIB.ScreenRGB.argtypes = [ctypes.c_void_p]
+_LIB.ScreenRGB.restype = ctypes.c_void_p
+# setup the argument and return types for SetScreenRGB
+_LIB.SetScreenRGB.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+_LIB.SetScreenRGB.restype = None
+# setup the argument and return types for SetObservation
+_LIB.SetObservation.argtypes = [ctypes.c_void_p] + 7 * [ctypes.c_int]
+_LIB.SetObservation.restype = None
+# setup the argument and return types for ObservationBuffer
+_LIB.ObservationBuffer.argtypes = [ctypes.c_void_p]
+_LIB.ObservationBuffer.restype = ctypes.c_void_p
 # setup the argument and return types for GetMemoryBuffer
 _LIB.Memory.argtypes = [ctypes.c_void_p]
 _LIB.Memory.restype = ctypes.c_void_p
@@ -59,17 +88,138 @@ _LIB.Memory.restype = ctypes.c_void_p
 _LIB.Reset.argtypes = [ctypes.c_void_p]
 _LIB.Reset.restype = None
 # setup the argument and return types for Step
-_LIB.Step.argtypes = [ctypes.c_void_p]
+_LIB.Step.argtypes = [ctypes.c_void_p, ctypes.c_bool]
 _LIB.Step.restype = None
+# setup the argument and return types for StepN
+_LIB.StepN.argtypes = [ctypes.c_void_p, ctypes.c_ubyte, ctypes.c_int, ctypes.c_bool]
+_LIB.StepN.restype = None
 # setup the argument and return types for Backup
 _LIB.Backup.argtypes = [ctypes.c_void_p]
 _LIB.Backup.restype = None
 # setup the argument and return types for Restore
 _LIB.Restore.argtypes = [ctypes.c_void_p]
 _LIB.Restore.restype = None
+# setup the argument and return types for SlotSize
+_LIB.SlotSize.argtypes = None
+_LIB.SlotSize.restype = ctypes.c_size_t
+# setup the argument and return types for SaveSlot
+_LIB.SaveSlot.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.SaveSlot.restype = None
+# setup the argument and return types for SaveDeltaSlot
+_LIB.SaveDeltaSlot.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int]
+_LIB.SaveDeltaSlot.restype = ctypes.c_bool
+# setup the argument and return types for LoadSlot
+_LIB.LoadSlot.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.LoadSlot.restype = ctypes.c_bool
+# setup the argument and return types for DropSlot
+_LIB.DropSlot.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.DropSlot.restype = ctypes.c_bool
+# setup the argument and return types for SetSlotCapacity
+_LIB.SetSlotCapacity.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+_LIB.SetSlotCapacity.restype = None
+# setup the argument and return types for AddResetState
+_LIB.AddResetState.argtypes = [ctypes.c_void_p]
+_LIB.AddResetState.restype = None
+# setup the argument and return types for ResetStateCount
+_LIB.ResetStateCount.argtypes = [ctypes.c_void_p]
+_LIB.ResetStateCount.restype = ctypes.c_int
+# setup the argument and return types for ClearResetStates
+_LIB.ClearResetStates.argtypes = [ctypes.c_void_p]
+_LIB.ClearResetStates.restype = None
+# setup the argument and return types for LoadResetState
+_LIB.LoadResetState.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.LoadResetState.restype = ctypes.c_bool
+# setup the argument and return types for SetRewind
+_LIB.SetRewind.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_size_t]
+_LIB.SetRewind.restype = None
+# setup the argument and return types for RewindFrames
+_LIB.RewindFrames.argtypes = [ctypes.c_void_p]
+_LIB.RewindFrames.restype = ctypes.c_int
+# setup the argument and return types for RewindUsage
+_LIB.RewindUsage.argtypes = [ctypes.c_void_p]
+_LIB.RewindUsage.restype = ctypes.c_size_t
+# setup the argument and return types for Rewind
+_LIB.Rewind.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.Rewind.restype = ctypes.c_bool
+# setup the argument and return types for StartMovie
+_LIB.StartMovie.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.StartMovie.restype = None
+# setup the argument and return types for StopMovie
+_LIB.StopMovie.argtypes = [ctypes.c_void_p]
+_LIB.StopMovie.restype = None
+# setup the argument and return types for MovieFrames
+_LIB.MovieFrames.argtypes = [ctypes.c_void_p]
+_LIB.MovieFrames.restype = ctypes.c_int
+# setup the argument and return types for MovieInputs
+_LIB.MovieInputs.argtypes = [ctypes.c_void_p]
+_LIB.MovieInputs.restype = ctypes.c_void_p
+# setup the argument and return types for MovieKeyframeCount
+_LIB.MovieKeyframeCount.argtypes = [ctypes.c_void_p]
+_LIB.MovieKeyframeCount.restype = ctypes.c_int
+# setup the argument and return types for MovieKeyframeFrame
+_LIB.MovieKeyframeFrame.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.MovieKeyframeFrame.restype = ctypes.c_int
+# setup the argument and return types for MovieKeyframe
+_LIB.MovieKeyframe.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.MovieKeyframe.restype = ctypes.c_void_p
+# setup the argument and return types for Replay
+_LIB.Replay.argtypes = [
+    ctypes.c_void_p,
+    ctypes.c_void_p,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_void_p,
+    ctypes.c_size_t,
+    ctypes.c_void_p,
+]
+_LIB.Replay.restype = None
+# setup the argument and return types for SlotUsage
+_LIB.SlotUsage.argtypes = [ctypes.c_void_p]
+_LIB.SlotUsage.restype = ctypes.c_size_t
+# setup the argument and return types for StateSize
+_LIB.StateSize.argtypes = [ctypes.c_void_p]
+_LIB.StateSize.restype = ctypes.c_size_t
+# setup the argument and return types for GetState
+_LIB.GetState.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+_LIB.GetState.restype = None
+# setup the argument and return types for SetState
+_LIB.SetState.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_size_t]
+_LIB.SetState.restype = ctypes.c_bool
 # setup the argument and return types for Close
 _LIB.Close.argtypes = [ctypes.c_void_p]
 _LIB.Close.restype = None
+# setup the argument and return types for InitializeBatch
+_LIB.InitializeBatch.argtypes = [ctypes.c_wchar_p, ctypes.c_int]
+_LIB.InitializeBatch.restype = ctypes.c_void_p
+# setup the argument and return types for BatchEmulator
+_LIB.BatchEmulator.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.BatchEmulator.restype = ctypes.c_void_p
+# setup the argument and return types for ScreenBatch
+_LIB.ScreenBatch.argtypes = [ctypes.c_void_p]
+_LIB.ScreenBatch.restype = ctypes.c_void_p
+# setup the argument and return types for SetBatchThreads
+_LIB.SetBatchThreads.argtypes = [
+    ctypes.c_void_p,
+    ctypes.c_int,
+    ctypes.POINTER(ctypes.c_int),
+    ctypes.c_int,
+]
+_LIB.SetBatchThreads.restype = None
+# setup the argument and return types for ObserveBatch
+_LIB.ObserveBatch.argtypes = [ctypes.c_void_p, ctypes.c_int]
+_LIB.ObserveBatch.restype = None
+# setup the argument and return types for StepBatch
+_LIB.StepBatch.argtypes = [
+    ctypes.c_void_p,
+    ctypes.c_void_p,
+    ctypes.c_int,
+    ctypes.c_int,
+    ctypes.c_bool,
+]
+_LIB.StepBatch.restype = ctypes.c_bool
+# setup the argument and return types for CloseBatch
+_LIB.CloseBatch.argtypes = [ctypes.c_void_p]
+_LIB.CloseBatch.restype = None
 
 # height in pixels of the NES screen
 SCREEN_HEIGHT = _LIB.Height()
@@ -77,10 +227,30 @@ SCREEN_HEIGHT = _LIB.Height()
 SCREEN_WIDTH = _LIB.Width()
 # shape of the screen as 24-bit RGB (standard for NumPy)
 SCREEN_SHAPE_24_BIT = SCREEN_HEIGHT, SCREEN_WIDTH, 3
-# shape of the screen as 32-bit RGB (C++ memory arrangement)
+# shape of the screen as 32-bit RGB (C++ PPU memory arrangement)
 SCREEN_SHAPE_32_BIT = SCREEN_HEIGHT, SCREEN_WIDTH, 4
-# create a type for the screen tensor matrix from C++
-SCREEN_TENSOR = ctypes.c_byte * int(np.prod(SCREEN_SHAPE_32_BIT))
+# shape of the screen as 8-bit indexes into the system palette
+SCREEN_SHAPE_8_BIT = SCREEN_HEIGHT, SCREEN_WIDTH
+# create a type for the packed 24-bit RGB screen tensor from C++
+SCREEN_TENSOR = ctypes.c_byte * int(np.prod(SCREEN_SHAPE_24_BIT))
+
+# create a type for the palette index screen matrix from C++
+INDEX_SCREEN_TENSOR = ctypes.c_byte * int(np.prod(SCREEN_SHAPE_8_BIT))
+
+# the 64 colors of the NES system palette as 24-bit RGB (index x channel)
+_PALETTE_VECTOR = ctypes.c_uint32 * 64
+PALETTE = np.frombuffer(
+    ctypes.cast(_LIB.Palette(), ctypes.POINTER(_PALETTE_VECTOR)).contents,
+    dtype=np.uint32
+)
+PALETTE = np.stack([PALETTE >> 16, PALETTE >> 8, PALETTE], axis=-1).astype(np.uint8)
+PALETTE.setflags(write=False)
+
+# the native codes of the kinds of observations (Observation::Mode in C++)
+_OBSERVATION_MODES = {'gray': 0, 'rgb': 1, 'index': 2}
+
+# the number of bytes of memory occupied by a full snapshot
+SNAPSHOT_SIZE = _LIB.SlotSize()
 
 # create a type for the RAM vector from C++
 RAM_VECTOR = ctypes.c_byte * 0x800
@@ -91,10 +261,117 @@ CONTROLLER_VECTOR = ctypes.c_byte * 1
 # Early debug about shapes (printed at import)
 _dbg(
     f"SCREEN_WIDTHxHEIGHT: {SCREEN_WIDTH}x{SCREEN_HEIGHT} | "
-    f"32-bit shape {SCREEN_SHAPE_32_BIT} -> 24-bit {SCREEN_SHAPE_24_BIT} | "
+    f"24-bit shape {SCREEN_SHAPE_24_BIT} | "
     f"endianness={sys.byteorder}"
 )
 
+def expand_palette(frames):
+    """
+    Convert frames of palette indexes to 24-bit RGB frames.
+
+    Args:
+        frames (numpy.ndarray): palette indexes of any shape, e.g., a single
+            (240, 256) frame or a (N, 240, 256) batch of frames
+
+    Returns:
+        (numpy.ndarray) the RGB frames with a trailing axis of 3 channels
+
+    """
+    return PALETTE[frames]
+
+
+def _observation_region(roi, factors):
+    """
+    Return the validated region and downsampling factors of an observation.
+
+    Args:
+        roi (tuple): the (top, bottom, left, right) bounds of the region of
+            the screen to observe, or None to observe the full screen
+        factors (int or tuple): the factor to downsample the region by, or
+            a (rows, columns) tuple of factors
+
+    Returns:
+        (tuple) the (top, bottom, left, right, factor_y, factor_x) values
+
+    """
+    if roi is None:
+        roi = (0, SCREEN_HEIGHT, 0, SCREEN_WIDTH)
+    if len(roi) != 4:
+        raise ValueError('roi must be a (top, bottom, left, right) tuple')
+    top, bottom, left, right = map(int, roi)
+    if not 0 <= top < bottom <= SCREEN_HEIGHT:
+        raise ValueError('roi rows must satisfy 0 <= top < bottom <= {}'.format(SCREEN_HEIGHT))
+    if not 0 <= left < right <= SCREEN_WIDTH:
+        raise ValueError('roi columns must satisfy 0 <= left < right <= {}'.format(SCREEN_WIDTH))
+    if isinstance(factors, int):
+        factors = (factors, factors)
+    factor_y, factor_x = map(int, factors)
+    if not 1 <= factor_y <= bottom - top or not 1 <= factor_x <= right - left:
+        raise ValueError('downsample and stride must be between 1 and the roi size')
+    return top, bottom, left, right, factor_y, factor_x
+
+
+@functools.lru_cache(maxsize=None)
+def _core_version():
+    """Return an identifier of the native core, i.e., the hash of the library."""
+    with open(glob.glob(_LIB_PATH)[0], 'rb') as library:
+        return hashlib.sha256(library.read()).digest()
+
+
+# the validated ROMs by absolute path with the modification time and size of
+# the file that they were read from
+_ROMS = {}
+
+
+def _validate_rom(rom_path):
+    """
+    Raise an error if the emulator does not support a ROM.
+
+    The validated ROM is cached, so later calls with the same path return
+    the same ROM (with read-only data) until the file changes.
+
+    Args:
+        rom_path (str): the path to the ROM to validate
+
+    Returns:
+        (ROM) the validated ROM
+
+    """
+    stamp = None
+    if isinstance(rom_path, str) and os.path.isfile(rom_path):
+        status = os.stat(rom_path)
+        stamp = status.st_mtime_ns, status.st_size
+        key = os.path.abspath(rom_path)
+        cached = _ROMS.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    # create a ROM file from the ROM path
+    rom = ROM(rom_path)
+    # check that there is PRG ROM
+    if rom.prg_rom_size == 0:
+        raise ValueError('ROM has no PRG-ROM banks.')
+    # ensure that there is no trainer
+    if rom.has_trainer:
+        raise ValueError('ROM has trainer. trainer is not supported.')
+    # try to read the PRG ROM and raise a value error if it fails
+    _ = rom.prg_rom
+    # try to read the CHR ROM and raise a value error if it fails
+    _ = rom.chr_rom
+    # check the TV system
+    if rom.is_pal:
+        raise ValueError('ROM is PAL. PAL is not supported.')
+    # check that the mapper is implemented
+    elif rom.mapper not in {0, 1, 2, 3}:
+        msg = ('ROM has an unsupported mapper number {}. please see '
+               'https://github.com/Kautenja/nes-py/issues/28 for more information.')
+        raise ValueError(msg.format(rom.mapper))
+    # environments share the data of the cached ROM
+    rom.raw_data.flags.writeable = False
+    if stamp is not None:
+        _ROMS[key] = stamp, rom
+    return rom
+
+
 class NESEnv(gym.Env):
     """An NES environment based on the LaiNES emulator."""
 
@@ -118,50 +395,93 @@ class NESEnv(gym.Env):
     # action space is a bitmap of button press values for the 8 NES buttons
     action_space = Discrete(256)
 
-    def __init__(self, rom_path):
+    def __init__(self, rom_path,
+        observation_mode='rgb',
+        roi=None,
+        downsample=1,
+        stride=1,
+        boot_script=None,
+        boot_cache_dir=None,
+    ):
         """
         Create a new NES environment.
 
         Args:
             rom_path (str): the path to the ROM for the environment
+            observation_mode (str): the kind of observation to return, either
+                'rgb' for 24-bit RGB screens, 'index' for screens of 6-bit
+                indexes into the system palette (see `expand_palette`), or
+                'gray' for natively computed grayscale observations
+            roi (tuple): the (top, bottom, left, right) region of the screen
+                to observe, or None for the full screen. the observation
+                is computed natively and covers only the region
+            downsample (int or tuple): the (rows, columns) factor to area
+                average the 'gray' observation by, e.g., roi=(0, 168, 2, 254)
+                and downsample=(2, 3) observes 84 x 84 pixels
+            stride (int or tuple): the (rows, columns) step between observed
+                pixels of the 'rgb' and 'index' observations, i.e., the
+                observation is screen[top:bottom:stride, left:right:stride]
+            boot_script (iterable or bool): the button bitmap to hold for each
+                frame from power-on to gameplay, True for a default script
+                that presses START, or None to start at power-on. the state
+                that the script reaches (plus an idle frame to draw the
+                screen) becomes the backup state that `reset` restores. the
+                state is cached on disk per ROM, script, and native core, so
+                later environments restore it without running the script
+            boot_cache_dir (str): the directory of the boot state cache, or
+                None for $NESPY_BOOT_CACHE or ~/.cache/nes-py/boot
         """
         _dbg("Initializing NESEnv with ROM:", rom_path)
-        # create a ROM file from the ROM path
-        rom = ROM(rom_path)
-        # check that there is PRG ROM
-        if rom.prg_rom_size == 0:
-            raise ValueError('ROM has no PRG-ROM banks.')
-        # ensure that there is no trainer
-        if rom.has_trainer:
-            raise ValueError('ROM has trainer. trainer is not supported.')
-        # try to read the PRG ROM and raise a value error if it fails
-        _ = rom.prg_rom
-        # try to read the CHR ROM and raise a value error if it fails
-        _ = rom.chr_rom
-        # check the TV system
-        if rom.is_pal:
-            raise ValueError('ROM is PAL. PAL is not supported.')
-        # check that the mapper is implemented
-        elif rom.mapper not in {0, 1, 2, 3}:
-            msg = ('ROM has an unsupported mapper number {}. please see '
-                   'https://github.com/Kautenja/nes-py/issues/28 for more information.')
-            raise ValueError(msg.format(rom.mapper))
+        # make sure the emulator can run the ROM
+        rom = _validate_rom(rom_path)
+        if observation_mode not in {'rgb', 'index', 'gray'}:
+            raise ValueError('invalid observation_mode: {}'.format(repr(observation_mode)))
+        if observation_mode == 'gray' and stride != 1:
+            raise ValueError("stride requires observation_mode 'rgb' or 'index'")
+        if observation_mode != 'gray' and downsample != 1:
+            raise ValueError("downsample requires observation_mode 'gray'")
+        factors = downsample if observation_mode == 'gray' else stride
+        region = _observation_region(roi, factors)
         # create a dedicated random number generator for the environment
         self.np_random = np.random.RandomState()
         # store the ROM path
         self._rom_path = rom_path
-        # initialize the C++ object for running the environment
-        self._env = _LIB.Initialize(self._rom_path)
+        # initialize the C++ object for running the environment from the
+        # validated ROM data (the emulators of a process share ROM data)
+        self._env = _LIB.InitializeFromBuffer(rom.raw_data.ctypes.data, rom.raw_data.size)
         # setup a placeholder for a 'human' render mode viewer
         self.viewer = None
         # setup a placeholder for a pointer to a backup state
         self._has_backup = False
         # setup a done flag
         self.done = True
+        # setup the handle for the next snapshot
+        self._next_snapshot = 0
+        # setup the keyframe interval of the movie being recorded
+        self._movie_interval = 0
         # setup the controllers, screen, and RAM buffers
         self.controllers = [self._controller_buffer(port) for port in range(2)]
         self.screen = self._screen_buffer()
+        self.index_screen = self._index_screen_buffer()
         self.ram = self._ram_buffer()
+        # setup the observation buffer and space of the observation mode
+        self.observation_mode = observation_mode
+        if observation_mode != 'rgb' or roi is not None or stride != 1:
+            # compute the observation of the region natively (index screens
+            # are always copied so max pooling never touches the index screen)
+            self.observation = self._observation_buffer(observation_mode, *region)
+        else:
+            self.observation = self.screen
+        if self.observation is not self.screen:
+            self.observation_space = Box(
+                low=0,
+                high=PALETTE.shape[0] - 1 if observation_mode == 'index' else 255,
+                shape=self.observation.shape,
+                dtype=np.uint8
+            )
+        # run the boot script or restore the state it reaches from the cache
+        if boot_script is not None and boot_script is not False:
+            self._boot(rom, boot_script, boot_cache_dir)
 
         # Debug: buffer addresses + shapes
         self._dbg_step_count = 0
@@ -173,28 +493,121 @@ class NESEnv(gym.Env):
              {"shape": self.ram.shape, "dtype": str(self.ram.dtype),
               "ptr": hex(self.ram.ctypes.data)})
 
+    def _boot(self, rom, boot_script, boot_cache_dir):
+        """
+        Boot the emulator to the state that a boot script reaches.
+
+        Args:
+            rom (ROM): the ROM of the environment
+            boot_script (iterable or bool): the actions of the boot script,
+                or True for the default boot script
+            boot_cache_dir (str): the directory of the cache, or None for the
+                default directory
+
+        Returns:
+            None
+
+        """
+        if boot_script is True:
+            boot_script = _boot_cache.DEFAULT_BOOT_SCRIPT
+        script = _boot_cache.script_bytes(boot_script)
+        directory = boot_cache_dir or _boot_cache.cache_dir()
+        path = _boot_cache.boot_state_path(directory, rom.raw_data, script, _core_version())
+        state = _boot_cache.read_state(path)
+        try:
+            # a state of another format or core raises and is recorded again
+            if state is None:
+                raise ValueError('boot state is not cached')
+            self.set_state(state)
+        except ValueError:
+            _dbg("_boot(): recording boot state to", path)
+            _LIB.Reset(self._env)
+            for action in script:
+                self._frame_advance(action, render=False)
+            state = self.get_state()
+            _boot_cache.write_state(path, state)
+            # load the state so both paths reach the same state
+            self.set_state(state)
+        # draw the screen of the boot state and make it the reset state
+        self._frame_advance(0)
+        self._backup()
+
     def _screen_buffer(self):
         """Setup the screen buffer from the C++ code."""
-        # get the address of the screen
-        address = _LIB.Screen(self._env)
+        # get the address of the packed RGB screen
+        address = _LIB.ScreenRGB(self._env)
         # create a buffer from the contents of the address location
         buffer_ = ctypes.cast(address, ctypes.POINTER(SCREEN_TENSOR)).contents
         # create a NumPy array from the buffer
         screen = np.frombuffer(buffer_, dtype='uint8')
-        # reshape the screen from a column vector to a tensor
-        screen = screen.reshape(SCREEN_SHAPE_32_BIT)
-        # flip the bytes if the machine is little-endian (which it likely is)
-        if sys.byteorder == 'little':
-            # invert the little-endian BGRx channels to big-endian xRGB
-            screen = screen[:, :, ::-1]
-        # remove the 0th axis (padding from storing colors in 32 bit)
-        out = screen[:, :, 1:]
+        # reshape the screen from a column vector to a C-contiguous tensor
+        out = screen.reshape(SCREEN_SHAPE_24_BIT)
         _dbg("_screen_buffer(): built observation view",
-             {"raw32_shape": SCREEN_SHAPE_32_BIT,
-              "final24_shape": out.shape,
-              "dtype": str(out.dtype)})
+             {"shape": out.shape,
+              "dtype": str(out.dtype),
+              "contiguous": out.flags['C_CONTIGUOUS']})
         return out
 
+    def _set_screen_buffer(self, screen):
+        """
+        Draw the RGB screen into a buffer instead of the native screen.
+
+        Args:
+            screen (numpy.ndarray): a C-contiguous, writable uint8 array of
+                the shape of the RGB screen (e.g., a view of shared memory)
+                that outlives the environment
+
+        Returns:
+            None
+
+        """
+        if self._env is None:
+            raise ValueError('env has already been closed.')
+        if screen.shape != SCREEN_SHAPE_24_BIT or screen.dtype != np.uint8:
+            raise ValueError('screen must be a uint8 array of shape {}'.format(SCREEN_SHAPE_24_BIT))
+        if not screen.flags['C_CONTIGUOUS'] or not screen.flags['WRITEABLE']:
+            raise ValueError('screen must be C-contiguous and writable')
+        _LIB.SetScreenRGB(self._env, screen.ctypes.data)
+        if self.observation is self.screen:
+            self.observation = screen
+        self.screen = screen
+
+    def _index_screen_buffer(self):
+        """Setup the palette index screen buffer from the C++ code."""
+        # get the address of the index screen
+        address = _LIB.Screen(self._env)
+        # create a buffer from the contents of the address location
+        buffer_ = ctypes.cast(address, ctypes.POINTER(INDEX_SCREEN_TENSOR)).contents
+        # create a NumPy array from the buffer and shape it as the screen
+        screen = np.frombuffer(buffer_, dtype='uint8')
+        return screen.reshape(SCREEN_SHAPE_8_BIT)
+
+    def _observation_buffer(self, mode, top, bottom, left, right, factor_y, factor_x):
+        """Setup the native observation and its buffer from the C++ code."""
+        # configure the observation that the emulator computes after frames
+        _LIB.SetObservation(self._env, _OBSERVATION_MODES[mode],
+            top, bottom, left, right, factor_y, factor_x
+        )
+        if mode == 'gray':
+            # area averaging drops partial blocks of pixels
+            shape = (bottom - top) // factor_y, (right - left) // factor_x
+        else:
+            # striding keeps partial blocks of pixels (like slicing)
+            shape = len(range(top, bottom, factor_y)), len(range(left, right, factor_x))
+        if mode == 'rgb':
+            shape = (*shape, 3)
+        return self._native_observation_buffer(shape)
+
+    def _native_observation_buffer(self, shape):
+        """Setup the buffer of the native observation from the C++ code."""
+        # get the address of the observation
+        address = _LIB.ObservationBuffer(self._env)
+        # create a buffer from the contents of the address location
+        buffer_ = ctypes.cast(address, ctypes.POINTER(ctypes.c_byte * int(np.prod(shape)))).contents
+        # create a NumPy array from the buffer and shape it as the observation
+        observation = np.frombuffer(buffer_, dtype='uint8')
+        return observation.reshape(shape)
+
     def _ram_buffer(self):
         """Setup the RAM buffer from the C++ code."""
         # get the address of the RAM
@@ -216,12 +629,24 @@ class NESEnv(gym.Env):
         # create a NumPy buffer from the binary data and return it
         return np.frombuffer(buffer_, dtype='uint8')
 
-    def _frame_advance(self, action):
-        """Advance a frame in the emulator with an action."""
+    def _frame_advance(self, action, render=True):
+        """
+        Advance a frame in the emulator with an action.
+
+        Args:
+            action (int): the button bitmap to hold on the first controller
+            render (bool): whether to draw the frame. skipping the drawing is
+                faster (e.g., to fast-forward through start screens) and keeps
+                the timing of the game, but leaves the last drawn screen
+
+        Returns:
+            None
+
+        """
         # set the action on the controller
         self.controllers[0][:] = action
         # perform a step on the emulator
-        _LIB.Step(self._env)
+        _LIB.Step(self._env, render)
 
     def _backup(self):
         """Backup the NES state in the emulator."""
@@ -234,6 +659,322 @@ class NESEnv(gym.Env):
         _LIB.Restore(self._env)
         _dbg("_restore(): state restored")
 
+    def snapshot(self, base=None):
+        """
+        Save the state of the emulator to a new snapshot.
+
+        Snapshots live in the emulator until they are dropped or evicted to
+        keep the snapshots within their memory capacity (least recently
+        saved or restored first, see `set_snapshot_capacity`).
+
+        Args:
+            base (int): the handle of a full snapshot to save a delta against.
+                A delta stores only the 32-byte pages of the hardware state
+                that differ from the base, so branches of a common state
+                take about 1 kB. A delta keeps no screen: restoring it
+                restores the screen of the base, and the next drawn frame
+                shows the state of the delta. The base stays in
+                memory (and counts toward `snapshot_memory`) while deltas
+                refer to it, even if it is dropped, and evicting the base
+                evicts its deltas. None saves a full snapshot
+
+        Returns:
+            (int) a handle to restore the snapshot with
+
+        """
+        handle = self._next_snapshot
+        if base is None:
+            _LIB.SaveSlot(self._env, handle)
+        elif not _LIB.SaveDeltaSlot(self._env, handle, base):
+            msg = 'snapshot {} is not a full snapshot'.format(base)
+            raise ValueError(msg)
+        self._next_snapshot += 1
+        return handle
+
+    def restore(self, handle):
+        """
+        Restore the state of the emulator from a snapshot.
+
+        Args:
+            handle (int): the handle of the snapshot from `snapshot`
+
+        Returns:
+            None
+
+        """
+        if not _LIB.LoadSlot(self._env, handle):
+            msg = 'snapshot {} was dropped or evicted'.format(handle)
+            raise ValueError(msg)
+        # the episode continues from the snapshot
+        self.done = False
+
+    def drop_snapshot(self, handle):
+        """
+        Delete a snapshot to free its memory.
+
+        Args:
+            handle (int): the handle of the snapshot from `snapshot`
+
+        Returns:
+            (bool) True if the snapshot existed, False otherwise
+
+        """
+        return _LIB.DropSlot(self._env, handle)
+
+    def set_snapshot_capacity(self, num_bytes):
+        """
+        Set the maximal memory of the snapshots of the emulator.
+
+        Each full snapshot occupies `SNAPSHOT_SIZE` bytes and each delta
+        occupies the bytes of its pages (see `snapshot_memory`). The default
+        capacity is 1 GB. The most recently used snapshot is always kept.
+
+        Args:
+            num_bytes (int): the maximal number of bytes for the snapshots
+
+        Returns:
+            None
+
+        """
+        _LIB.SetSlotCapacity(self._env, num_bytes)
+
+    def snapshot_memory(self):
+        """
+        Return the memory occupied by the snapshots of the emulator.
+
+        Returns:
+            (int) the number of bytes occupied by the snapshots
+
+        """
+        return _LIB.SlotUsage(self._env)
+
+    def add_reset_state(self):
+        """
+        Add the state of the emulator to the pool of states to reset to.
+
+        While the pool has states, `reset` restores a state sampled uniformly
+        from the pool with `np_random` (instead of the backup state or a
+        power cycle), e.g., states captured past the title screen or at
+        several points of a level for diverse episode starts. Clones share
+        the pool, i.e., states added to (or cleared from) the pool of an
+        environment are added to (or cleared from) the pools of its clones.
+
+        Returns:
+            None
+
+        """
+        _LIB.AddResetState(self._env)
+
+    @property
+    def num_reset_states(self):
+        """Return the number of states in the pool of states to reset to."""
+        return _LIB.ResetStateCount(self._env)
+
+    def clear_reset_states(self):
+        """
+        Remove the states in the pool of states to reset to.
+
+        Returns:
+            None
+
+        """
+        _LIB.ClearResetStates(self._env)
+
+    def set_rewind(self, keyframe_interval=60, capacity=64 * 2**20):
+        """
+        Record the history of the emulator to rewind with.
+
+        The emulator records a keyframe (a full state, ~5-20 kB plus the
+        screen) every `keyframe_interval` frames and the controller inputs of
+        every frame, dropping the oldest keyframes to stay within `capacity`.
+        The history clears when the state jumps (e.g., `reset`, `restore`, or
+        `set_state`).
+
+        Args:
+            keyframe_interval (int): the number of frames between keyframes,
+                trading memory for the frames to re-simulate per rewind. 0
+                stops recording
+            capacity (int): the maximal number of bytes for the history
+
+        Returns:
+            None
+
+        """
+        _LIB.SetRewind(self._env, keyframe_interval, capacity)
+
+    @property
+    def rewind_frames(self):
+        """Return the number of frames that the environment can rewind."""
+        return _LIB.RewindFrames(self._env)
+
+    @property
+    def rewind_memory(self):
+        """Return the number of bytes occupied by the rewind history."""
+        return _LIB.RewindUsage(self._env)
+
+    def rewind(self, frames):
+        """
+        Rewind the emulator by a number of frames.
+
+        The emulator restores the nearest keyframe and re-simulates the
+        recorded inputs natively, drawing only the last frame. The history
+        after the target frame is discarded.
+
+        Args:
+            frames (int): the number of frames to rewind
+
+        Returns:
+            (numpy.ndarray) the observation at the target frame
+
+        """
+        if not _LIB.Rewind(self._env, frames):
+            msg = 'cannot rewind {} frames, the history holds {} frames'
+            raise ValueError(msg.format(frames, self.rewind_frames))
+        # the episode continues from the target frame
+        self.done = False
+        return self.observation
+
+    def start_movie(self, keyframe_interval=600):
+        """
+        Start recording a movie of the controller inputs of every frame.
+
+        The movie starts from the current state and records the button
+        bitmaps of both controllers for each emulated frame (2 bytes per
+        frame) and a keyframe (a binary state) every `keyframe_interval`
+        frames to seek with. Resetting, restoring, or setting a state, or
+        rewinding stops the recording, as the movie cannot reproduce them.
+
+        Args:
+            keyframe_interval (int): the number of frames between keyframes,
+                trading the size of the movie for the frames to re-simulate
+                per seek
+
+        Returns:
+            None
+
+        """
+        _LIB.StartMovie(self._env, keyframe_interval)
+        self._movie_interval = keyframe_interval
+
+    def stop_movie(self):
+        """
+        Stop recording the movie and return it.
+
+        Returns:
+            (Movie) the movie recorded since `start_movie`
+
+        """
+        _LIB.StopMovie(self._env)
+        frames = _LIB.MovieFrames(self._env)
+        inputs = ctypes.string_at(_LIB.MovieInputs(self._env), 2 * frames)
+        size = _LIB.StateSize(self._env)
+        keyframes = []
+        for index in range(_LIB.MovieKeyframeCount(self._env)):
+            frame = _LIB.MovieKeyframeFrame(self._env, index)
+            state = ctypes.string_at(_LIB.MovieKeyframe(self._env, index), size)
+            keyframes.append((frame, state))
+        inputs = np.frombuffer(inputs, dtype=np.uint8).reshape(-1, 2)
+        return Movie(inputs, keyframes, self._movie_interval)
+
+    def seek(self, movie, frame):
+        """
+        Set the emulator to the state after a number of frames of a movie.
+
+        The emulator loads the last keyframe before the frame and replays
+        the inputs after it natively, drawing only the last frame.
+
+        Args:
+            movie (Movie): the movie to seek in
+            frame (int): the number of frames of the movie to play. At frame
+                0 the screen holds the last drawn frame, as the movie starts
+                from a binary state without the screen
+
+        Returns:
+            (numpy.ndarray) the observation after the frame
+
+        """
+        if not 0 <= frame <= len(movie):
+            msg = 'frame {} is not in the movie of {} frames'
+            raise ValueError(msg.format(frame, len(movie)))
+        keyframe, state = movie.keyframe(frame)
+        self.set_state(state)
+        inputs = np.ascontiguousarray(movie.inputs[keyframe:frame])
+        _LIB.Replay(self._env, inputs.ctypes.data, len(inputs), 1, None, 0, None)
+        return self.observation
+
+    def replay(self, movie, start=0, stop=None, every=1):
+        """
+        Regenerate the observations of a range of frames of a movie.
+
+        The emulator seeks to the start frame and replays the movie natively
+        (without a Python call per frame), drawing only the frames with an
+        observation. The emulator is left at the stop frame.
+
+        Args:
+            movie (Movie): the movie to replay
+            start (int): the number of frames of the movie to seek past first
+            stop (int): the number of frames of the movie to play up to. None
+                plays the whole movie
+            every (int): the number of frames between observations
+
+        Returns:
+            (numpy.ndarray) the observation after every `every` frames from
+            the start frame, stacked along a new first axis
+
+        """
+        stop = len(movie) if stop is None else stop
+        if not 0 <= start <= stop <= len(movie):
+            msg = 'frames [{}, {}) are not in the movie of {} frames'
+            raise ValueError(msg.format(start, stop, len(movie)))
+        if every < 1:
+            raise ValueError('every must be a positive number of frames')
+        self.seek(movie, start)
+        inputs = np.ascontiguousarray(movie.inputs[start:stop])
+        shape = ((stop - start) // every, *self.observation.shape)
+        observations = np.empty(shape, dtype=np.uint8)
+        _LIB.Replay(self._env, inputs.ctypes.data, len(inputs), every,
+            self.observation.ctypes.data, self.observation.nbytes,
+            observations.ctypes.data
+        )
+        return observations
+
+    def get_state(self):
+        """
+        Serialize the state of the emulator to bytes.
+
+        The state is a compact, versioned binary format with the CPU, RAM,
+        PPU, OAM, nametables, palette, mapper banks, and controllers. It can
+        be written to a file and loaded into any environment of the same ROM.
+
+        Returns:
+            (bytes) the binary state of the emulator
+
+        """
+        state = ctypes.create_string_buffer(_LIB.StateSize(self._env))
+        _LIB.GetState(self._env, state)
+        return state.raw
+
+    def set_state(self, state):
+        """
+        Deserialize the state of the emulator from bytes.
+
+        The screen is not part of the state, so it holds the last drawn frame
+        until the next step.
+
+        Args:
+            state (bytes): a binary state from `get_state`
+
+        Returns:
+            None
+
+        """
+        state = bytes(state)
+        if not _LIB.SetState(self._env, state, len(state)):
+            msg = 'state is not a valid state of this version for this ROM'
+            raise ValueError(msg)
+        # the episode continues from the state
+        self.done = False
+
     def _will_reset(self):
         """Handle any RAM hacking after a reset occurs."""
         pass
@@ -254,7 +995,11 @@ class NESEnv(gym.Env):
         # call the before reset callback
         self._will_reset()
         # reset the emulator
-        if self._has_backup:
+        num_reset_states = _LIB.ResetStateCount(self._env)
+        if num_reset_states:
+            # sample a state from the pool of states to reset to
+            _LIB.LoadResetState(self._env, self.np_random.randint(num_reset_states))
+        elif self._has_backup:
             self._restore()
         else:
             _LIB.Reset(self._env)
@@ -262,8 +1007,8 @@ class NESEnv(gym.Env):
         self._did_reset()
         # set the done flag to false
         self.done = False
-        # return the screen from the emulator
-        state = self.screen
+        # return the observation from the emulator
+        state = self.observation
         if _DEBUG:
             # small stats about the observation buffer at reset
             _dbg("reset(): obs",
@@ -279,16 +1024,40 @@ class NESEnv(gym.Env):
         """Handle any RAM hacking after a reset occurs."""
         pass
 
-    def step(self, action):
+    def step(self, action, frameskip=1, max_pool=False):
         """
-        Run one frame of the NES and return the relevant observation data.
+        Run frames of the NES and return the relevant observation data.
+
+        Args:
+            action (int): the button bitmap to hold on the first controller
+            frameskip (int): the number of frames to hold the action for. all
+                frames run in a single native call and the reward, done, and
+                info callbacks fire once after the last frame
+            max_pool (bool): whether to return the pixel-wise maximum of the
+                last two frames instead of the last frame. 'index'
+                observations keep the index of the brighter of the two
+                colors of each pixel, and `index_screen` keeps the last frame
+
+        Returns:
+            a tuple of:
+            - (numpy.ndarray) the state as a result of the action
+            - (float) the reward achieved by taking the action
+            - (bool) a flag denoting whether the episode has ended
+            - (dict) a dictionary of extra information
+
         """
         if self.done:
             raise ValueError('cannot step in a done environment! call `reset`')
-        # set the action on the controller
-        self.controllers[0][:] = action
-        # pass the action to the emulator as an unsigned byte
-        _LIB.Step(self._env)
+        if frameskip < 1:
+            raise ValueError('frameskip must be a positive integer')
+        if frameskip == 1 and not max_pool:
+            # set the action on the controller
+            self.controllers[0][:] = action
+            # pass the action to the emulator as an unsigned byte
+            _LIB.Step(self._env, True)
+        else:
+            # hold the action for all the frames in one native call
+            _LIB.StepN(self._env, int(action), int(frameskip), bool(max_pool))
         # get the reward for this step
         reward = float(self._get_reward())
         # get the done flag for this step
@@ -303,7 +1072,7 @@ class NESEnv(gym.Env):
         elif reward > self.reward_range[1]:
             reward = self.reward_range[1]
 
-        state = self.screen
+        state = self.observation
         # Debug the first few steps to understand observations
         self._dbg_step_count += 1
         if _DEBUG and self._dbg_step_count <= _DEBUG_STEPS:
@@ -329,6 +1098,40 @@ class NESEnv(gym.Env):
         """Handle any RAM hacking after a step occurs."""
         pass
 
+    def clone(self):
+        """
+        Return an independent copy of the environment at the identical state.
+
+        The copy shares the read-only ROM data with this environment (no file
+        is read) and copies only the mutable state of the emulator, including
+        the backup state that `reset` restores. Snapshots are not copied.
+        Python attributes (e.g., of subclasses) are deep copied.
+
+        Returns:
+            (NESEnv) a new environment of the same class
+
+        """
+        if self._env is None:
+            raise ValueError('env has already been closed.')
+        # the attributes that refer to the native emulator of this environment
+        native = {'_env', 'viewer', 'controllers', 'screen', 'index_screen', 'ram', 'observation'}
+        attributes = {k: v for k, v in self.__dict__.items() if k not in native}
+        env = self.__class__.__new__(self.__class__)
+        env.__dict__.update(copy.deepcopy(attributes))
+        # copy the emulator and setup the buffers of the copy
+        env._env = _LIB.Clone(self._env)
+        env.viewer = None
+        env._next_snapshot = 0
+        env.controllers = [env._controller_buffer(port) for port in range(2)]
+        env.screen = env._screen_buffer()
+        env.index_screen = env._index_screen_buffer()
+        env.ram = env._ram_buffer()
+        if self.observation is self.screen:
+            env.observation = env.screen
+        else:
+            env.observation = env._native_observation_buffer(self.observation.shape)
+        return env
+
     def close(self):
         """Close the environment."""
         if self._env is None:
@@ -391,4 +1194,4 @@ from .wrappers.pixel_reward import PixelShiftReward
 
 
 # explicitly define the outward facing API of this package
-__all__ = [NESEnv.__name__, "VisionOnlyNES", "PixelShiftReward"]
\ No newline at end of file
+__all__ = [NESEnv.__name__, expand_palette.__name__, "VisionOnlyNES", "PixelShiftReward"]
\ No newline at end of file
@@ -0,0 +1,301 @@
+"""A batch of NES environments that each run in a dedicated subprocess."""
+import multiprocessing
+from multiprocessing import shared_memory
+import traceback
+from gym.spaces import Box
+from gym.spaces import MultiDiscrete
+import numpy as np
+from .nes_env import _validate_rom
+from .nes_env import NESEnv
+from .nes_env import SCREEN_SHAPE_24_BIT
+
+
+class _RemoteTraceback(Exception):
+    """The traceback of an exception raised in a worker process."""
+
+    def __init__(self, traceback_):
+        """
+        Create a new remote traceback.
+
+        Args:
+            traceback_ (str): the formatted traceback from the worker
+
+        """
+        super().__init__(traceback_)
+        self.traceback = traceback_
+
+    def __str__(self):
+        """Return the formatted traceback from the worker."""
+        return self.traceback
+
+
+def _worker(pipe, parent_pipe, env_class, rom_path, shm_name, shape, index):
+    """
+    Run an environment in a subprocess and serve commands from a pipe.
+
+    Each reply is a tuple of a success flag and either the result of the
+    command or the exception it raised with its formatted traceback. The
+    worker stops after the first exception.
+
+    Args:
+        pipe (Connection): the worker end of the pipe to the parent
+        parent_pipe (Connection): the parent end of the pipe (closed here)
+        env_class (type): the NESEnv subclass to run
+        rom_path (str): the path to the ROM for the environment
+        shm_name (str): the name of the shared memory block of the screens
+        shape (tuple): the shape of the batch of screens
+        index (int): the index of the environment in the batch
+
+    Returns:
+        None
+
+    """
+    parent_pipe.close()
+    env = None
+    # attach to the shared screens and get the view of this environment
+    shm = shared_memory.SharedMemory(name=shm_name)
+    screen = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)[index]
+    try:
+        env = env_class(rom_path)
+        # draw the frames of the environment straight into the shared screens
+        env._set_screen_buffer(screen)
+        pipe.send((True, None))
+        while True:
+            command, data = pipe.recv()
+            if command == 'step':
+                _, reward, done, _ = env.step(data)
+                # reset immediately so the parent never sees a done env
+                if done:
+                    env.reset()
+                pipe.send((True, (reward, done)))
+            elif command == 'reset':
+                env.reset(seed=data)
+                pipe.send((True, None))
+            elif command == 'close':
+                break
+            else:
+                raise ValueError('invalid command: {}'.format(repr(command)))
+    except KeyboardInterrupt:
+        pass
+    except Exception as error:
+        # report the error to the parent, which raises it
+        try:
+            pipe.send((False, (error, traceback.format_exc())))
+        except Exception:
+            # the error cannot be pickled, report its traceback only
+            pipe.send((False, (RuntimeError(repr(error)), traceback.format_exc())))
+    finally:
+        # stop drawing into the shared memory and release the views of it
+        # before closing the shared memory
+        if env is not None:
+            env.close()
+        del env, screen
+        shm.close()
+        pipe.close()
+
+
+class SubprocVectorNESEnv(object):
+    """A batch of NES environments that each run in a dedicated subprocess."""
+
+    # relevant meta-data about the environment
+    metadata = {
+        'render.modes': ['rgb_array'],
+        'video.frames_per_second': NESEnv.metadata['video.frames_per_second']
+    }
+
+    # the legal range for rewards for this environment
+    reward_range = NESEnv.reward_range
+
+    def __init__(self, rom_path, num_envs, env_class=NESEnv, context=None):
+        """
+        Create a new batch of NES environments in subprocesses.
+
+        Workers write their screens into a shared memory block, so only the
+        actions, rewards, and done flags pass through the pipes. info
+        dictionaries do not cross the process boundary.
+
+        Args:
+            rom_path (str): the path to the ROM for the environments
+            num_envs (int): the number of environments in the batch
+            env_class (type): the NESEnv subclass to run in each subprocess
+            context (str): the multiprocessing start method to use, where
+                None uses the default start method of the platform
+
+        """
+        # make sure the emulator can run the ROM
+        _validate_rom(rom_path)
+        if num_envs < 1:
+            raise ValueError('num_envs must be a positive integer')
+        self.num_envs = num_envs
+        # setup the spaces for a single environment and for the batch
+        self.single_observation_space = env_class.observation_space
+        self.single_action_space = env_class.action_space
+        self.observation_space = Box(
+            low=0,
+            high=255,
+            shape=(num_envs, *SCREEN_SHAPE_24_BIT),
+            dtype=np.uint8
+        )
+        self.action_space = MultiDiscrete([self.single_action_space.n] * num_envs)
+        # setup the shared memory block of the screens
+        shape = self.observation_space.shape
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        self.screens = np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf)
+        self.screens[:] = 0
+        # start a worker process for each environment
+        context = multiprocessing.get_context(context)
+        self._pipes = []
+        self._processes = []
+        for index in range(num_envs):
+            parent_pipe, worker_pipe = context.Pipe()
+            args = (worker_pipe, parent_pipe, env_class, rom_path, self._shm.name, shape, index)
+            process = context.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            worker_pipe.close()
+            self._pipes.append(parent_pipe)
+            self._processes.append(process)
+        # setup the done flags
+        self.dones = np.ones(num_envs, dtype=bool)
+        # wait for the environments to start
+        try:
+            self._receive()
+        except Exception:
+            self.close()
+            raise
+
+    def _send(self, index, command, data):
+        """
+        Send a command to a worker.
+
+        Args:
+            index (int): the index of the worker
+            command (str): the command to send
+            data (object): the data of the command
+
+        Returns:
+            None
+
+        Raises:
+            RuntimeError if the worker has exited
+
+        """
+        try:
+            self._pipes[index].send((command, data))
+        except OSError:
+            exitcode = self._processes[index].exitcode
+            raise RuntimeError('worker {} exited with code {}'.format(index, exitcode))
+
+    def _receive(self):
+        """
+        Return the replies of every worker to the last command.
+
+        Returns:
+            (list) the result of the command from each worker
+
+        Raises:
+            the first exception that a worker raised, or RuntimeError if a
+            worker exited without replying
+
+        """
+        results = []
+        errors = []
+        for index, (pipe, process) in enumerate(zip(self._pipes, self._processes)):
+            try:
+                # wait for the reply as long as the worker is alive
+                while not pipe.poll(1) and process.is_alive():
+                    pass
+                ok, result = pipe.recv()
+            except (EOFError, OSError):
+                error = 'worker {} exited with code {}'.format(index, process.exitcode)
+                errors.append(RuntimeError(error))
+                continue
+            if ok:
+                results.append(result)
+            else:
+                error, traceback_ = result
+                error.__cause__ = _RemoteTraceback(traceback_)
+                errors.append(error)
+        # read every reply before raising so the pipes stay in sync
+        if errors:
+            raise errors[0]
+        return results
+
+    def reset(self, seed=None):
+        """
+        Reset every environment in the batch and return the observations.
+
+        Args:
+            seed (int): an optional seed, where environment i uses seed + i
+
+        Returns:
+            (numpy.ndarray) the screens of the batch
+
+        """
+        if self._pipes is None:
+            raise ValueError('env has already been closed.')
+        for index in range(self.num_envs):
+            self._send(index, 'reset', None if seed is None else seed + index)
+        self._receive()
+        self.dones[:] = False
+        return self.screens
+
+    def step(self, actions):
+        """
+        Run a step of every environment in the batch.
+
+        Environments that finish an episode reset immediately, so the
+        returned screens of those environments are initial observations.
+
+        Args:
+            actions (numpy.ndarray): the button bitmap for each environment
+
+        Returns:
+            a tuple of:
+            - (numpy.ndarray) the screens of the batch
+            - (numpy.ndarray) the reward of each environment
+            - (numpy.ndarray) the done flag of each environment
+            - (list) an empty dictionary per environment
+
+        """
+        if self.dones.any():
+            raise ValueError('cannot step in a done environment! call `reset`')
+        # send all the actions first so the workers step concurrently
+        for index, action in enumerate(actions):
+            self._send(index, 'step', int(action))
+        rewards, dones = zip(*self._receive())
+        rewards = np.array(rewards, dtype=np.float64)
+        dones = np.array(dones, dtype=bool)
+        return self.screens, rewards, dones, [{} for _ in range(self.num_envs)]
+
+    def close(self):
+        """Close the environments and release the shared screens."""
+        if self._pipes is None:
+            raise ValueError('env has already been closed.')
+        for pipe in self._pipes:
+            try:
+                pipe.send(('close', None))
+            except OSError:
+                # the worker has already exited
+                pass
+            pipe.close()
+        for process in self._processes:
+            process.join()
+        self._pipes = None
+        self._processes = None
+        self.dones[:] = True
+        # release the view before closing the shared memory
+        self.screens = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def render(self, mode='rgb_array'):
+        """Render the environments as a batch of screens."""
+        if mode == 'rgb_array':
+            return self.screens
+        render_modes = [repr(x) for x in self.metadata['render.modes']]
+        msg = 'valid render modes are: {}'.format(', '.join(render_modes))
+        raise NotImplementedError(msg)
+
+
+# explicitly define the outward facing API of this module
+__all__ = [SubprocVectorNESEnv.__name__]
@@ -0,0 +1,100 @@
+"""Test cases for regressions in the traces of the CPU."""
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import NESEnv
+
+
+# the program that executes an opcode: set up pointers in the zero page
+# ($10) -> $0234 and ($13) -> $02c3, load the registers, set the carry, and
+# execute the opcode with the operand bytes $10 $02 (e.g., zero page $10 or
+# absolute $0210), followed by a few NOPs and a jump to the jump itself
+_PROGRAM = bytes([
+    0xa9, 0x34, 0x85, 0x10,  # LDA #$34  STA $10
+    0xa9, 0x02, 0x85, 0x11,  # LDA #$02  STA $11
+    0xa9, 0xc3, 0x85, 0x13,  # LDA #$c3  STA $13
+    0xa9, 0x02, 0x85, 0x14,  # LDA #$02  STA $14
+    0xa9, 0x5a,              # LDA #$5a
+    0xa2, 0x03,              # LDX #$03
+    0xa0, 0x07,              # LDY #$07
+    0x38,                    # SEC
+])
+
+
+def opcode_rom(opcode):
+    """Return an NROM image that executes an opcode from reset."""
+    prg = bytearray(0x4000)
+    code = _PROGRAM + bytes([opcode, 0x10, 0x02, 0xea, 0xea, 0xea])
+    loop = 0x8000 + len(code)
+    code += bytes([0x4c, loop & 0xff, loop >> 8])
+    prg[:len(code)] = code
+    # interrupts jump to an infinite loop at $9000
+    prg[0x1000:0x1003] = bytes([0x4c, 0x00, 0x90])
+    # the NMI, reset, and IRQ vectors
+    prg[0x3ffa:] = bytes([0x00, 0x90, 0x00, 0x80, 0x00, 0x90])
+    return b'NES\x1a\x01\x01' + bytes(10) + bytes(prg) + bytes(0x2000)
+
+
+# the expected digest of the states after a frame of each opcode program
+OPCODE_DIGEST = '1c8ba0a66b19f0b0e976ba746f9bc752aeba914a'
+
+# the expected digests of the RAM and states of each bundled ROM
+ROM_DIGESTS = {
+    'super-mario-bros-1.nes': '3686c85784a210d9d5475e346ece3e9dea065b63',
+    'excitebike.nes': 'd08bd514efa81e0e6779718d9f320267cc649642',
+    'the-legend-of-zelda.nes': 'c056e661374da9d7c8370733e57d2a9a7332759f',
+    'super-mario-bros-lost-levels.nes': '3e0e02b6005889490a6e2d2713dbc439ec29b185',
+}
+
+
+class ShouldExecuteEveryOpcode(TestCase):
+    def test(self):
+        directory = tempfile.mkdtemp()
+        try:
+            digest = hashlib.sha1()
+            for opcode in range(256):
+                path = os.path.join(directory, '{:02x}.nes'.format(opcode))
+                with open(path, 'wb') as rom_file:
+                    rom_file.write(opcode_rom(opcode))
+                env = NESEnv(path)
+                env.reset()
+                env.step(0)
+                state = hashlib.sha1(env.get_state()).hexdigest()
+                digest.update(state.encode())
+                env.close()
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(OPCODE_DIGEST, digest.hexdigest())
+
+
+class ShouldTraceBundledROMs(TestCase):
+    def _test(self, rom):
+        env = NESEnv(rom_file_abs_path(rom))
+        env.reset()
+        rng = np.random.RandomState(0)
+        digest = hashlib.sha1()
+        for frame in range(600):
+            # press start to leave the title screen, then random buttons
+            action = 8 if frame in (30, 31, 120, 121) else int(rng.randint(256)) & ~0x0c
+            env.step(action if frame > 200 or action == 8 else 0)
+            digest.update(env.ram.tobytes())
+            if frame % 50 == 49:
+                digest.update(env.get_state())
+        env.close()
+        self.assertEqual(ROM_DIGESTS[rom], digest.hexdigest())
+
+    def test_nrom(self):
+        self._test('super-mario-bros-1.nes')
+
+    def test_nrom_excitebike(self):
+        self._test('excitebike.nes')
+
+    def test_sxrom(self):
+        self._test('the-legend-of-zelda.nes')
+
+    def test_lost_levels(self):
+        self._test('super-mario-bros-lost-levels.nes')
@@ -4,6 +4,7 @@ import gym
 import numpy as np
 from .rom_file_abs_path import rom_file_abs_path
 from nes_py.nes_env import NESEnv
+from nes_py.nes_env import expand_palette
 
 
 class ShouldRaiseTypeErrorOnInvalidROMPathType(TestCase):
@@ -126,3 +127,140 @@ class ShouldStepEnvBackupRestore(TestCase):
         env._restore()
         self.assertTrue(np.array_equal(backup, env.screen))
         env.close()
+
+
+class ShouldObserveContiguousRGBScreen(TestCase):
+    def test(self):
+        env = create_smb1_instance()
+        state = env.reset()
+        for _ in range(100):
+            state, _, _, _ = env.step(0)
+        self.assertEqual((240, 256, 3), state.shape)
+        self.assertTrue(state.flags['C_CONTIGUOUS'])
+        # the packed screen matches the palette colors of the index screen
+        self.assertTrue(np.array_equal(expand_palette(env.index_screen), state))
+        env.close()
+
+
+class ShouldObservePaletteIndexScreen(TestCase):
+    def test(self):
+        env = NESEnv(rom_file_abs_path('super-mario-bros-1.nes'), observation_mode='index')
+        self.assertEqual((240, 256), env.observation_space.shape)
+        state = env.reset()
+        frames = []
+        for _ in range(100):
+            state, _, _, _ = env.step(0)
+            frames.append(state.copy())
+        self.assertEqual((240, 256), state.shape)
+        self.assertEqual(np.uint8, state.dtype)
+        self.assertTrue(env.observation_space.contains(state))
+        # expanding a batch of frames matches expanding each frame
+        frames = np.stack(frames)
+        expanded = expand_palette(frames)
+        self.assertEqual((100, 240, 256, 3), expanded.shape)
+        self.assertTrue(np.array_equal(expand_palette(frames[-1]), expanded[-1]))
+        self.assertTrue(np.array_equal(env.screen, expanded[-1]))
+        env.close()
+
+
+class ShouldRaiseValueErrorOnInvalidObservationMode(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        self.assertRaises(ValueError, NESEnv, path, observation_mode='bgr')
+
+
+def gray_reference(index_screen, top, bottom, left, right, factor_y, factor_x):
+    """Return the expected grayscale observation of an index screen."""
+    rgb = expand_palette(index_screen).astype(np.int64)
+    luma = 299 * rgb[..., 0] + 587 * rgb[..., 1] + 114 * rgb[..., 2]
+    height, width = (bottom - top) // factor_y, (right - left) // factor_x
+    luma = luma[top:top + height * factor_y, left:left + width * factor_x]
+    total = luma.reshape(height, factor_y, width, factor_x).sum(axis=(1, 3))
+    scale = 1000 * factor_y * factor_x
+    return ((total + scale // 2) // scale).astype(np.uint8)
+
+
+class ShouldObserveDownsampledGrayscale(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        env = NESEnv(path, observation_mode='gray', roi=(0, 168, 2, 254), downsample=(2, 3))
+        self.assertEqual((84, 84), env.observation_space.shape)
+        state = env.reset()
+        self.assertEqual((84, 84), state.shape)
+        for index in range(100):
+            state, _, _, _ = env.step(8 if index == 40 else 0)
+            expected = gray_reference(env.index_screen, 0, 168, 2, 254, 2, 3)
+            self.assertTrue(np.array_equal(expected, state))
+        # max-pooling applies to the grayscale observation
+        env1 = NESEnv(path, observation_mode='gray', downsample=4)
+        env1.reset()
+        for _ in range(100):
+            env1.step(0)
+        env1.step(0)
+        previous = env1.observation.copy()
+        env1.step(0)
+        expected = np.maximum(previous, env1.observation)
+        env2 = NESEnv(path, observation_mode='gray', downsample=4)
+        env2.reset()
+        for _ in range(100):
+            env2.step(0)
+        state, _, _, _ = env2.step(0, frameskip=2, max_pool=True)
+        self.assertEqual((60, 64), state.shape)
+        self.assertTrue(np.array_equal(expected, state))
+        for env_ in (env, env1, env2):
+            env_.close()
+
+
+class ShouldRestoreObservationWithBackup(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        env = NESEnv(path, observation_mode='gray', roi=(0, 168, 2, 254), downsample=(2, 3))
+        env.reset()
+        for index in range(250):
+            env.step(8 if index == 40 else 0)
+        env._backup()
+        env.add_reset_state()
+        observation = env.observation.copy()
+        screen = env.screen.copy()
+        for _ in range(60):
+            env.step(0b10000010)
+        self.assertFalse(np.array_equal(observation, env.observation))
+        # the backup and reset states restore the screens they were saved with
+        env._restore()
+        self.assertTrue(np.array_equal(observation, env.observation))
+        self.assertTrue(np.array_equal(screen, env.screen))
+        for _ in range(60):
+            env.step(0b10000010)
+        self.assertTrue(np.array_equal(observation, env.reset()))
+        self.assertTrue(np.array_equal(screen, env.screen))
+        env.close()
+
+
+class ShouldRaiseValueErrorOnInvalidRegion(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        self.assertRaises(ValueError, NESEnv, path, downsample=2)
+        self.assertRaises(ValueError, NESEnv, path, observation_mode='gray', stride=2)
+        self.assertRaises(ValueError, NESEnv, path, observation_mode='gray', roi=(100, 50, 0, 256))
+        self.assertRaises(ValueError, NESEnv, path, observation_mode='gray', roi=(0, 241, 0, 256))
+        self.assertRaises(ValueError, NESEnv, path, observation_mode='gray', downsample=0)
+
+
+class ShouldObserveRegionOfInterest(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        rgb = NESEnv(path, roi=(80, 232, 0, 255), stride=(1, 2))
+        index = NESEnv(path, observation_mode='index', roi=(80, 232, 8, 256), stride=3)
+        self.assertEqual((152, 128, 3), rgb.observation_space.shape)
+        self.assertEqual((51, 83), index.observation_space.shape)
+        rgb.reset()
+        index.reset()
+        for step in range(100):
+            action = 8 if step == 40 else 0
+            rgb_state, _, _, _ = rgb.step(action)
+            index_state, _, _, _ = index.step(action)
+            self.assertTrue(rgb_state.flags['C_CONTIGUOUS'])
+            self.assertTrue(np.array_equal(rgb.screen[80:232, 0:255:2], rgb_state))
+            self.assertTrue(np.array_equal(index.index_screen[80:232:3, 8:256:3], index_state))
+        rgb.close()
+        index.close()
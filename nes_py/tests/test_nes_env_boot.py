@@ -0,0 +1,56 @@
+"""Test cases for the boot state cache of the NESEnv class."""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import NESEnv
+
+
+def create_smb1_instance(directory, **kwargs):
+    """Return a new SMB1 instance that boots to gameplay."""
+    kwargs.setdefault('boot_script', True)
+    rom = rom_file_abs_path('super-mario-bros-1.nes')
+    return NESEnv(rom, boot_cache_dir=directory, **kwargs)
+
+
+class ShouldCacheBootState(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test(self):
+        env = create_smb1_instance(self.directory)
+        files = os.listdir(self.directory)
+        self.assertEqual(1, len(files))
+        path = os.path.join(self.directory, files[0])
+        recorded = env.reset().copy(), env.ram.copy()
+        # the boot script reaches gameplay (the operation mode of SMB1)
+        self.assertEqual(1, recorded[1][0x0770])
+        env.close()
+        # a later environment restores the same state from the cache
+        modified = os.path.getmtime(path)
+        env = create_smb1_instance(self.directory)
+        self.assertEqual(modified, os.path.getmtime(path))
+        self.assertTrue(np.array_equal(recorded[0], env.reset()))
+        self.assertTrue(np.array_equal(recorded[1], env.ram))
+        env.close()
+        # an invalid state (e.g., of another core) is recorded again
+        with open(path, 'wb') as state_file:
+            state_file.write(b'invalid')
+        env = create_smb1_instance(self.directory)
+        self.assertTrue(np.array_equal(recorded[1], env.ram))
+        with open(path, 'rb') as state_file:
+            env.set_state(state_file.read())
+        env.close()
+
+    def test_script(self):
+        # other boot scripts have their own state in the cache
+        create_smb1_instance(self.directory).close()
+        env = create_smb1_instance(self.directory, boot_script=[0] * 10)
+        self.assertEqual(2, len(os.listdir(self.directory)))
+        env.close()
+        self.assertRaises(ValueError, create_smb1_instance, self.directory, boot_script=[256])
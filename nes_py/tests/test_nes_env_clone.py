@@ -0,0 +1,52 @@
+"""Test cases for cloning the NESEnv class."""
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import NESEnv
+
+
+def play(env, frames, seed):
+    """Play random actions and return the RAM and observation at the end."""
+    rng = np.random.RandomState(seed)
+    for frame in range(frames):
+        env.step(8 if frame == 30 else int(rng.randint(256)) & ~0x0c)
+    return env.ram.copy(), env.observation.copy()
+
+
+class ShouldCloneAtIdenticalState(TestCase):
+    def _test(self, rom, **kwargs):
+        env = NESEnv(rom_file_abs_path(rom), **kwargs)
+        env.reset()
+        play(env, 200, 0)
+        env._backup()
+        play(env, 10, 0)
+        clone = env.clone()
+        self.assertIsInstance(clone, NESEnv)
+        self.assertTrue(np.array_equal(env.screen, clone.screen))
+        self.assertTrue(np.array_equal(env.observation, clone.observation))
+        self.assertEqual(env.observation_space, clone.observation_space)
+        # the clone continues identically and independently
+        expected = play(env, 120, 1)
+        ram, observation = play(clone, 120, 1)
+        self.assertTrue(np.array_equal(expected[0], ram))
+        self.assertTrue(np.array_equal(expected[1], observation))
+        play(clone, 60, 2)
+        self.assertTrue(np.array_equal(expected[0], env.ram))
+        # the clone keeps the backup state to reset to
+        env.reset()
+        clone.reset()
+        self.assertTrue(np.array_equal(env.ram, clone.ram))
+        self.assertTrue(np.array_equal(env.screen, clone.screen))
+        # closing the original leaves the clone running
+        env.close()
+        clone.step(0)
+        clone.close()
+
+    def test_nrom(self):
+        self._test('super-mario-bros-1.nes')
+
+    def test_sxrom(self):
+        self._test('the-legend-of-zelda.nes')
+
+    def test_native_observation(self):
+        self._test('super-mario-bros-1.nes', observation_mode='gray', downsample=2)
@@ -0,0 +1,110 @@
+"""Test cases for the native multi-frame step of the NESEnv class."""
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import NESEnv
+from nes_py.nes_env import expand_palette
+
+
+def create_smb1_instance():
+    """Return a new SMB1 instance."""
+    return NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))
+
+
+class ShouldMatchRepeatedStepsWithFrameskip(TestCase):
+    def test(self):
+        env1 = create_smb1_instance()
+        env2 = create_smb1_instance()
+        env1.reset()
+        env2.reset()
+        for index in range(60):
+            action = 8 if index % 15 == 0 else 0b10000010
+            env1.step(action, frameskip=4)
+            for _ in range(4):
+                env2.step(action)
+            self.assertTrue(np.array_equal(env1.ram, env2.ram))
+            self.assertTrue(np.array_equal(env1.screen, env2.screen))
+        env1.close()
+        env2.close()
+
+
+class ShouldMaxPoolLastTwoFrames(TestCase):
+    def test(self):
+        env1 = create_smb1_instance()
+        env2 = create_smb1_instance()
+        env1.reset()
+        env2.reset()
+        for index in range(60):
+            action = 8 if index % 15 == 0 else 0b10000010
+            state, _, _, _ = env1.step(action, frameskip=4, max_pool=True)
+            for _ in range(3):
+                env2.step(action)
+            previous = env2.screen.copy()
+            env2.step(action)
+            expected = np.maximum(previous, env2.screen)
+            self.assertTrue(np.array_equal(expected, state))
+        env1.close()
+        env2.close()
+
+
+class ShouldMaxPoolIndexesLikeRGB(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        luma = np.array([299, 587, 114])
+        for roi in [None, (0, 240, 0, 256)]:
+            env1 = NESEnv(path, observation_mode='index', roi=roi)
+            env2 = NESEnv(path, observation_mode='index')
+            env3 = create_smb1_instance()
+            env1.reset()
+            env2.reset()
+            env3.reset()
+            for index in range(60):
+                action = 8 if index % 15 == 0 else 0b10000010
+                state, _, _, _ = env1.step(action, frameskip=4, max_pool=True)
+                rgb_state, _, _, _ = env3.step(action, frameskip=4, max_pool=True)
+                for _ in range(3):
+                    env2.step(action)
+                previous = env2.index_screen.copy()
+                env2.step(action)
+                last = env2.index_screen
+                # the index screen keeps the last frame
+                self.assertTrue(np.array_equal(env1.index_screen, last))
+                # each pixel keeps the index of the brighter frame
+                brighter = expand_palette(previous) @ luma > expand_palette(last) @ luma
+                self.assertTrue(np.array_equal(np.where(brighter, previous, last), state))
+                # which is the RGB pooling wherever it keeps a whole color
+                whole = (rgb_state == expand_palette(previous)).all(axis=-1)
+                whole |= (rgb_state == expand_palette(last)).all(axis=-1)
+                self.assertTrue(np.array_equal(expand_palette(state)[whole], rgb_state[whole]))
+            env1.close()
+            env2.close()
+            env3.close()
+
+
+class ShouldRaiseValueErrorOnInvalidFrameskip(TestCase):
+    def test(self):
+        env = create_smb1_instance()
+        env.reset()
+        self.assertRaises(ValueError, env.step, 0, frameskip=0)
+        env.close()
+
+
+class ShouldKeepTimingWithoutRendering(TestCase):
+    def test(self):
+        for game in ['super-mario-bros-1.nes', 'excitebike.nes']:
+            env1 = NESEnv(rom_file_abs_path(game))
+            env2 = NESEnv(rom_file_abs_path(game))
+            env1.reset()
+            env2.reset()
+            rng = np.random.RandomState(0)
+            for index in range(600):
+                action = 8 if index in (30, 120) else int(rng.randint(256)) & ~0x0c
+                env1._frame_advance(action, render=False)
+                env2._frame_advance(action)
+                self.assertTrue(np.array_equal(env1.ram, env2.ram))
+            # drawing the next frame catches up with the rendered screen
+            env1._frame_advance(0)
+            env2._frame_advance(0)
+            self.assertTrue(np.array_equal(env1.screen, env2.screen))
+            env1.close()
+            env2.close()
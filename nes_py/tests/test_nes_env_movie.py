@@ -0,0 +1,89 @@
+"""Test cases for recording and replaying movies with the NESEnv class."""
+import os
+import tempfile
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.movie import Movie
+from nes_py.nes_env import NESEnv
+
+
+def record(env, frames, seed):
+    """Record a movie of random actions and the observations of its frames."""
+    rng = np.random.RandomState(seed)
+    env.start_movie(keyframe_interval=50)
+    observations, rams = [], []
+    for frame in range(frames):
+        env.controllers[1][:] = rng.randint(256)
+        env.step(8 if frame == 30 else int(rng.randint(256)) & ~0x0c)
+        observations.append(env.observation.copy())
+        rams.append(env.ram.copy())
+    return env.stop_movie(), np.stack(observations), rams
+
+
+class ShouldRecordMovie(TestCase):
+    def test(self):
+        env = NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))
+        env.reset()
+        state = env.get_state()
+        movie, _, _ = record(env, 230, 0)
+        self.assertEqual(230, len(movie))
+        self.assertEqual((230, 2), movie.inputs.shape)
+        self.assertEqual(state, movie.start_state)
+        self.assertEqual([0, 50, 100, 150, 200], [frame for frame, _ in movie.keyframes])
+        # further frames are not recorded
+        env.step(0)
+        self.assertEqual(230, len(env.stop_movie()))
+        env.close()
+
+
+class ShouldRoundTripMovie(TestCase):
+    def test(self):
+        env = NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))
+        env.reset()
+        movie, _, _ = record(env, 120, 0)
+        path = os.path.join(tempfile.mkdtemp(), 'movie.nesm')
+        movie.save(path)
+        loaded = Movie.load(path)
+        self.assertTrue(np.array_equal(movie.inputs, loaded.inputs))
+        self.assertEqual(movie.keyframes, loaded.keyframes)
+        self.assertEqual(movie.keyframe_interval, loaded.keyframe_interval)
+        # the inputs and keyframes compress well
+        self.assertLess(os.path.getsize(path), sum(len(s) for _, s in movie.keyframes))
+        self.assertRaises(ValueError, Movie.from_bytes, b'NESM')
+        self.assertRaises(ValueError, Movie.from_bytes, movie.to_bytes()[:-1])
+        env.close()
+
+
+class ShouldReplayMovie(TestCase):
+    def test(self):
+        env = NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))
+        env.reset()
+        movie, observations, rams = record(env, 230, 0)
+        # a fresh environment regenerates the observations of every frame
+        other = NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))
+        other.reset()
+        self.assertTrue(np.array_equal(observations, other.replay(movie)))
+        self.assertTrue(np.array_equal(rams[-1], other.ram))
+        # and of a range of frames
+        replayed = other.replay(movie, start=75, stop=175, every=10)
+        self.assertTrue(np.array_equal(observations[84:175:10], replayed))
+        self.assertTrue(np.array_equal(rams[174], other.ram))
+        self.assertRaises(ValueError, other.replay, movie, 10, 231)
+        env.close()
+        other.close()
+
+
+class ShouldSeekMovie(TestCase):
+    def test(self):
+        env = NESEnv(rom_file_abs_path('super-mario-bros-1.nes'), observation_mode='index')
+        env.reset()
+        movie, observations, rams = record(env, 230, 0)
+        for frame in (230, 1, 50, 51, 137, 200):
+            observation = env.seek(movie, frame)
+            self.assertTrue(np.array_equal(rams[frame - 1], env.ram))
+            self.assertTrue(np.array_equal(observations[frame - 1], observation))
+        env.seek(movie, 0)
+        self.assertEqual(movie.start_state, env.get_state())
+        self.assertRaises(ValueError, env.seek, movie, 231)
+        env.close()
@@ -0,0 +1,56 @@
+"""Test cases for rewinding the NESEnv class."""
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import NESEnv
+
+
+def random_actions(frames, seed):
+    """Return random actions that start the game."""
+    rng = np.random.RandomState(seed)
+    return [8 if frame == 30 else int(rng.randint(256)) & ~0x0c for frame in range(frames)]
+
+
+class ShouldRewind(TestCase):
+    def test(self):
+        env = NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))
+        env.reset()
+        env.set_rewind(keyframe_interval=16)
+        history = []
+        for action in random_actions(300, 0):
+            history.append((env.ram.copy(), env.screen.copy()))
+            env.step(action)
+        self.assertEqual(300, env.rewind_frames)
+        # rewinding reaches the exact state (and screen) of earlier frames
+        for frames in (1, 16, 17, 100):
+            target = env.rewind_frames - frames
+            observation = env.rewind(frames)
+            self.assertTrue(np.array_equal(history[target][0], env.ram))
+            self.assertTrue(np.array_equal(history[target][1], observation))
+            self.assertEqual(target, env.rewind_frames)
+        self.assertRaises(ValueError, env.rewind, env.rewind_frames + 1)
+        # the history continues from the target frame
+        env.step(0)
+        self.assertEqual(target + 1, env.rewind_frames)
+        # jumping to another state clears the history
+        env.reset()
+        self.assertEqual(0, env.rewind_frames)
+        env.close()
+
+    def test_capacity(self):
+        env = NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))
+        env.reset()
+        env.set_rewind(keyframe_interval=10, capacity=200000)
+        for action in random_actions(500, 0):
+            env.step(action)
+        # the oldest keyframes are evicted to stay within the capacity
+        self.assertLessEqual(env.rewind_memory, 200000)
+        self.assertLess(env.rewind_frames, 500)
+        self.assertGreater(env.rewind_frames, 0)
+        env.rewind(env.rewind_frames)
+        # disabling the buffer clears the history
+        env.set_rewind(keyframe_interval=0)
+        env.step(0)
+        self.assertEqual(0, env.rewind_frames)
+        self.assertEqual(0, env.rewind_memory)
+        env.close()
@@ -0,0 +1,47 @@
+"""Test cases for sharing ROM data between NESEnv instances."""
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import _LIB
+from nes_py.nes_env import _validate_rom
+from nes_py.nes_env import NESEnv
+
+
+class ShouldShareROMData(TestCase):
+    def test(self):
+        envs = [NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))]
+        size = _LIB.ROMCacheSize()
+        # environments of the same game share the PRG and CHR ROM blocks
+        envs += [NESEnv(rom_file_abs_path('super-mario-bros-1.nes')) for _ in range(3)]
+        self.assertEqual(size, _LIB.ROMCacheSize())
+        # the environments run independently of each other
+        for env in envs:
+            env.reset()
+        for _ in range(60):
+            envs[0].step(8)
+        self.assertFalse(np.array_equal(envs[0].ram, envs[1].ram))
+        self.assertTrue(np.array_equal(envs[1].ram, envs[2].ram))
+        for env in envs:
+            env.close()
+
+
+class ShouldCacheValidatedROMs(TestCase):
+    def test(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'game.nes')
+            shutil.copy(rom_file_abs_path('super-mario-bros-1.nes'), path)
+            rom = _validate_rom(path)
+            self.assertIs(rom, _validate_rom(path))
+            self.assertFalse(rom.raw_data.flags.writeable)
+            # changing the file validates it again
+            shutil.copy(rom_file_abs_path('excitebike.nes'), path)
+            os.utime(path, ns=(0, 0))
+            other = _validate_rom(path)
+            self.assertIsNot(rom, other)
+            self.assertNotEqual(rom.raw_data.size, other.raw_data.size)
+            env = NESEnv(path)
+            env.reset()
+            env.close()
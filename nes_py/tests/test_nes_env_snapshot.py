@@ -0,0 +1,200 @@
+"""Test cases for the numbered snapshots of the NESEnv class."""
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import NESEnv
+from nes_py.nes_env import SNAPSHOT_SIZE
+
+
+def create_smb1_instance():
+    """Return a new SMB1 instance."""
+    return NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))
+
+
+def play(env, frames, seed):
+    """Play random actions and return the RAM and screen at the end."""
+    rng = np.random.RandomState(seed)
+    for frame in range(frames):
+        env.step(8 if frame == 30 else int(rng.randint(256)) & ~0x0c)
+    return env.ram.copy(), env.screen.copy()
+
+
+class ShouldRestoreSnapshots(TestCase):
+    def test(self):
+        env = create_smb1_instance()
+        env.reset()
+        play(env, 100, 0)
+        handles = []
+        expected = []
+        # save a branch point after each of several segments of play
+        for seed in range(5):
+            handles.append(env.snapshot())
+            expected.append(play(env, 60, seed))
+        # replaying from each branch point reproduces the same play
+        for seed in reversed(range(5)):
+            env.restore(handles[seed])
+            ram, screen = play(env, 60, seed)
+            self.assertTrue(np.array_equal(expected[seed][0], ram))
+            self.assertTrue(np.array_equal(expected[seed][1], screen))
+        # dropped snapshots cannot be restored
+        self.assertTrue(env.drop_snapshot(handles[0]))
+        self.assertFalse(env.drop_snapshot(handles[0]))
+        self.assertRaises(ValueError, env.restore, handles[0])
+        env.close()
+
+
+class ShouldEvictLeastRecentlyUsedSnapshots(TestCase):
+    def test(self):
+        env = create_smb1_instance()
+        env.reset()
+        env.set_snapshot_capacity(3 * SNAPSHOT_SIZE)
+        handles = [env.snapshot() for _ in range(3)]
+        # using the first snapshot makes the second the least recently used
+        env.restore(handles[0])
+        handles.append(env.snapshot())
+        self.assertRaises(ValueError, env.restore, handles[1])
+        for handle in (handles[0], handles[2], handles[3]):
+            env.restore(handle)
+        # shrinking the capacity keeps the most recently used snapshot
+        env.set_snapshot_capacity(0)
+        env.restore(handles[3])
+        self.assertRaises(ValueError, env.restore, handles[2])
+        env.close()
+
+
+class ShouldRestoreMapperState(TestCase):
+    def test(self):
+        env = NESEnv(rom_file_abs_path('the-legend-of-zelda.nes'))
+        env.reset()
+        play(env, 300, 0)
+        handle = env.snapshot()
+        expected = play(env, 600, 1)
+        # the game switches banks while playing, which the snapshot undoes
+        env.restore(handle)
+        ram, screen = play(env, 600, 1)
+        self.assertTrue(np.array_equal(expected[0], ram))
+        self.assertTrue(np.array_equal(expected[1], screen))
+        env.close()
+
+
+class ShouldRestoreDeltaSnapshots(TestCase):
+    def test(self):
+        env = create_smb1_instance()
+        env.reset()
+        play(env, 100, 0)
+        base = env.snapshot()
+        base_screen = env.screen.copy()
+        self.assertEqual(SNAPSHOT_SIZE, env.snapshot_memory())
+        # a delta one frame off its base takes about a kilobyte
+        play(env, 1, 0)
+        handle = env.snapshot(base=base)
+        self.assertLess(env.snapshot_memory() - SNAPSHOT_SIZE, 2048)
+        self.assertTrue(env.drop_snapshot(handle))
+        # branch off the base with a few frames of play per delta
+        handles = []
+        expected = []
+        for seed in range(5):
+            env.restore(base)
+            play(env, 5, seed)
+            handles.append(env.snapshot(base=base))
+            expected.append(play(env, 60, seed))
+        # deltas store only the pages of the hardware state that changed
+        delta_memory = env.snapshot_memory() - SNAPSHOT_SIZE
+        self.assertLess(delta_memory, 5 * 2048)
+        for seed in reversed(range(5)):
+            # a delta restores the screen of its base
+            env.restore(handles[seed])
+            self.assertTrue(np.array_equal(base_screen, env.screen))
+            ram, screen = play(env, 60, seed)
+            self.assertTrue(np.array_equal(expected[seed][0], ram))
+            self.assertTrue(np.array_equal(expected[seed][1], screen))
+        # deltas keep their base after it is overwritten or dropped
+        self.assertRaises(ValueError, env.snapshot, base=handles[0])
+        self.assertTrue(env.drop_snapshot(base))
+        self.assertRaises(ValueError, env.snapshot, base=base)
+        env.restore(handles[0])
+        ram, _ = play(env, 60, 0)
+        self.assertTrue(np.array_equal(expected[0][0], ram))
+        env.close()
+
+
+class ShouldChargeBasesOfDeltas(TestCase):
+    def test(self):
+        env = create_smb1_instance()
+        env.reset()
+        capacity = 3 * SNAPSHOT_SIZE
+        env.set_snapshot_capacity(capacity)
+        deltas = []
+        for seed in range(10):
+            base = env.snapshot()
+            play(env, 5, seed)
+            deltas.append(env.snapshot(base=base))
+            # the dropped base stays in memory with its delta
+            memory = env.snapshot_memory()
+            self.assertTrue(env.drop_snapshot(base))
+            self.assertLess(memory - env.snapshot_memory(), SNAPSHOT_SIZE // 2)
+            self.assertLessEqual(env.snapshot_memory(), capacity)
+        # the least recently used deltas were evicted with their bases
+        self.assertRaises(ValueError, env.restore, deltas[0])
+        env.restore(deltas[-1])
+        # evicting a base evicts its deltas
+        env.set_snapshot_capacity(2 * SNAPSHOT_SIZE)
+        for handle in deltas:
+            env.drop_snapshot(handle)
+        self.assertEqual(0, env.snapshot_memory())
+        base = env.snapshot()
+        delta = env.snapshot(base=base)
+        env.snapshot()
+        env.snapshot()
+        self.assertRaises(ValueError, env.restore, base)
+        self.assertRaises(ValueError, env.restore, delta)
+        self.assertLessEqual(env.snapshot_memory(), 2 * SNAPSHOT_SIZE)
+        env.close()
+
+
+class ShouldResetToPooledStates(TestCase):
+    def test(self):
+        env = create_smb1_instance()
+        env.reset()
+        # capture states at several points of the game
+        states = []
+        for seed in range(4):
+            play(env, 50, seed)
+            env.add_reset_state()
+            states.append(env.ram.copy())
+        self.assertEqual(4, env.num_reset_states)
+        # resets sample the pooled states with the seeded random generator
+        sampled = set()
+        for seed in range(20):
+            env.reset(seed=seed)
+            matches = [i for i, ram in enumerate(states) if np.array_equal(ram, env.ram)]
+            self.assertEqual(1, len(matches))
+            sampled.add(matches[0])
+            play(env, 10, seed)
+        self.assertGreater(len(sampled), 1)
+        env.reset(seed=0)
+        first = env.ram.copy()
+        env.reset(seed=0)
+        self.assertTrue(np.array_equal(first, env.ram))
+        # clearing the pool falls back to the usual reset
+        env.clear_reset_states()
+        self.assertEqual(0, env.num_reset_states)
+        env.close()
+
+
+class ShouldShareResetStatesWithClones(TestCase):
+    def test(self):
+        env = create_smb1_instance()
+        env.reset()
+        play(env, 50, 0)
+        env.add_reset_state()
+        clone = env.clone()
+        self.assertEqual(1, clone.num_reset_states)
+        # states added to either environment are in the pool of both
+        play(clone, 50, 1)
+        clone.add_reset_state()
+        self.assertEqual(2, env.num_reset_states)
+        env.clear_reset_states()
+        self.assertEqual(0, clone.num_reset_states)
+        env.close()
+        clone.close()
@@ -0,0 +1,62 @@
+"""Test cases for the binary states of the NESEnv class."""
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import NESEnv
+
+
+def play(env, frames, seed):
+    """Play random actions and return the RAM and screen at the end."""
+    rng = np.random.RandomState(seed)
+    for frame in range(frames):
+        env.step(8 if frame == 30 else int(rng.randint(256)) & ~0x0c)
+    return env.ram.copy(), env.screen.copy()
+
+
+class ShouldRoundTripState(TestCase):
+    def _test(self, rom):
+        env = NESEnv(rom_file_abs_path(rom))
+        env.reset()
+        play(env, 200, 0)
+        state = env.get_state()
+        self.assertIsInstance(state, bytes)
+        expected = play(env, 120, 1)
+        # a fresh environment of the same ROM continues identically
+        other = NESEnv(rom_file_abs_path(rom))
+        other.reset()
+        other.set_state(state)
+        ram, screen = play(other, 120, 1)
+        self.assertTrue(np.array_equal(expected[0], ram))
+        self.assertTrue(np.array_equal(expected[1], screen))
+        # serializing is deterministic
+        other.set_state(state)
+        self.assertEqual(state, other.get_state())
+        env.close()
+        other.close()
+
+    def test_nrom(self):
+        self._test('super-mario-bros-1.nes')
+
+    def test_sxrom(self):
+        self._test('the-legend-of-zelda.nes')
+
+
+class ShouldRejectInvalidState(TestCase):
+    def test(self):
+        env = NESEnv(rom_file_abs_path('super-mario-bros-1.nes'))
+        env.reset()
+        state = env.get_state()
+        ram = env.ram.copy()
+        # truncated states, other versions, and other ROMs are rejected
+        self.assertRaises(ValueError, env.set_state, state[:-1])
+        self.assertRaises(ValueError, env.set_state, b'')
+        version = bytearray(state)
+        version[4] += 1
+        self.assertRaises(ValueError, env.set_state, bytes(version))
+        zelda = NESEnv(rom_file_abs_path('the-legend-of-zelda.nes'))
+        self.assertRaises(ValueError, env.set_state, zelda.get_state())
+        # the emulator is left unchanged
+        self.assertTrue(np.array_equal(ram, env.ram))
+        self.assertEqual(state, env.get_state())
+        env.close()
+        zelda.close()
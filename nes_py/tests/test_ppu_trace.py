@@ -0,0 +1,66 @@
+"""Test cases for regressions in the screens that the PPU draws."""
+import hashlib
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import NESEnv
+
+
+# the expected digests of the screens of each bundled ROM
+SCREEN_DIGESTS = {
+    'super-mario-bros-1.nes': '82c8deac81ba1ec3c77d833435c578d63fbe5ef8',
+    'excitebike.nes': 'fe9e14ffd3cf38fef2309625dc3945268bfc5280',
+    'the-legend-of-zelda.nes': '06f2955889a2daca0ed03cfabd40b3e54f6edaca',
+    'super-mario-bros-lost-levels.nes': 'a0762bbd033851db56a576c791a37671028311be',
+}
+
+
+class ShouldDrawBundledROMs(TestCase):
+    def _test(self, rom):
+        env = NESEnv(rom_file_abs_path(rom), observation_mode='index')
+        env.reset()
+        rng = np.random.RandomState(0)
+        digest = hashlib.sha1()
+        for frame in range(600):
+            # press start to leave the title screen, then random buttons
+            action = 8 if frame in (30, 31, 120, 121) else int(rng.randint(256)) & ~0x0c
+            env.step(action if frame > 200 or action == 8 else 0)
+            digest.update(env.observation.tobytes())
+        env.close()
+        self.assertEqual(SCREEN_DIGESTS[rom], digest.hexdigest())
+
+    def test_nrom(self):
+        self._test('super-mario-bros-1.nes')
+
+    def test_nrom_excitebike(self):
+        self._test('excitebike.nes')
+
+    def test_sxrom(self):
+        self._test('the-legend-of-zelda.nes')
+
+    def test_lost_levels(self):
+        self._test('super-mario-bros-lost-levels.nes')
+
+
+class ShouldDrawRestoredCHRRAM(TestCase):
+    def test(self):
+        # the patterns of CHR RAM games follow the CHR RAM of a loaded state
+        env = NESEnv(rom_file_abs_path('the-legend-of-zelda.nes'), observation_mode='index')
+        env.reset()
+        for _ in range(30):
+            env.step(0)
+        title = env.get_state()
+        title_observations = [env.step(0)[0].copy() for _ in range(10)]
+        for frame in range(40, 300):
+            env.step(8 if frame in (40, 41, 120, 121) else 0)
+        state = env.get_state()
+        observations = [env.step(0)[0].copy() for _ in range(10)]
+        other = NESEnv(rom_file_abs_path('the-legend-of-zelda.nes'), observation_mode='index')
+        other.reset()
+        # load states back and forth, so only some patterns change per load
+        for loaded, expected in [(state, observations), (title, title_observations), (state, observations)]:
+            other.set_state(loaded)
+            for observation in expected:
+                self.assertTrue(np.array_equal(observation, other.step(0)[0]))
+        env.close()
+        other.close()
@@ -0,0 +1,94 @@
+"""Test cases for the SubprocVectorNESEnv class."""
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import NESEnv
+from nes_py.subproc_vector_nes_env import SubprocVectorNESEnv
+
+
+class ShouldRaiseValueErrorOnInvalidSubprocBatchSize(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        self.assertRaises(ValueError, SubprocVectorNESEnv, path, 0)
+
+
+class ShouldMatchIndependentEnvsFromSubprocesses(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        batch = SubprocVectorNESEnv(path, 2)
+        envs = [NESEnv(path) for _ in range(2)]
+        self.assertRaises(ValueError, batch.step, np.zeros(2, dtype=np.uint8))
+        screens = batch.reset()
+        self.assertEqual((2, 240, 256, 3), screens.shape)
+        for env in envs:
+            env.reset()
+        rng = np.random.RandomState(1)
+        for step in range(40):
+            actions = rng.randint(256, size=2).astype(np.uint8)
+            if step % 10 == 0:
+                actions[step % 2] = 8
+            screens, rewards, dones, infos = batch.step(actions)
+            self.assertEqual((2, ), rewards.shape)
+            self.assertEqual((2, ), dones.shape)
+            self.assertEqual(2, len(infos))
+            for index, env in enumerate(envs):
+                state, _, _, _ = env.step(actions[index])
+                self.assertTrue(np.array_equal(state, screens[index]))
+        batch.close()
+        for env in envs:
+            env.close()
+        # trying to close again should raise an error
+        self.assertRaises(ValueError, batch.close)
+
+
+class _FailingNESEnv(NESEnv):
+    """An environment that fails on its third step."""
+
+    def _did_step(self, done):
+        self._steps = getattr(self, '_steps', 0) + 1
+        if self._steps == 3:
+            raise KeyError('failed on step 3')
+
+
+class _BrokenNESEnv(NESEnv):
+    """An environment that fails to initialize."""
+
+    def __init__(self, rom_path):
+        raise OSError('failed to initialize')
+
+
+class ShouldDrawIntoSharedScreens(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        batch = SubprocVectorNESEnv(path, 2)
+        screens = batch.reset()
+        env = NESEnv(path)
+        env.reset()
+        # the workers draw into the shared block, so the parent's view of
+        # the screens changes without any copy
+        self.assertTrue(np.array_equal(env.screen, screens[0]))
+        for _ in range(30):
+            batch.step(np.zeros(2, dtype=np.uint8))
+            env.step(0)
+        self.assertTrue(np.array_equal(env.screen, screens[1]))
+        batch.close()
+        env.close()
+
+
+class ShouldRaiseWorkerErrors(TestCase):
+    def test(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        batch = SubprocVectorNESEnv(path, 2, env_class=_FailingNESEnv)
+        batch.reset()
+        batch.step(np.zeros(2, dtype=np.uint8))
+        batch.step(np.zeros(2, dtype=np.uint8))
+        with self.assertRaises(KeyError) as context:
+            batch.step(np.zeros(2, dtype=np.uint8))
+        self.assertIn('failed on step 3', str(context.exception.__cause__))
+        # the workers exited, so further steps raise instead of blocking
+        self.assertRaises(RuntimeError, batch.step, np.zeros(2, dtype=np.uint8))
+        batch.close()
+
+    def test_init(self):
+        path = rom_file_abs_path('super-mario-bros-1.nes')
+        self.assertRaises(OSError, SubprocVectorNESEnv, path, 2, env_class=_BrokenNESEnv)
@@ -0,0 +1,124 @@
+"""Test cases for the VectorNESEnv class."""
+from unittest import TestCase
+import numpy as np
+from .rom_file_abs_path import rom_file_abs_path
+from nes_py.nes_env import _LIB
+from nes_py.nes_env import NESEnv
+from nes_py.vector_nes_env import VectorNESEnv
+
+
+def create_smb1_batch(num_envs=3, **kwargs):
+    """Return a new batch of SMB1 instances."""
+    return VectorNESEnv(rom_file_abs_path('super-mario-bros-1.nes'), num_envs, **kwargs)
+
+
+class ShouldRaiseValueErrorOnInvalidBatchSize(TestCase):
+    def test(self):
+        self.assertRaises(ValueError, create_smb1_batch, 0)
+
+
+class ShouldRaiseErrorOnBatchStepBeforeReset(TestCase):
+    def test(self):
+        env = create_smb1_batch()
+        self.assertRaises(ValueError, env.step, np.zeros(3, dtype=np.uint8))
+        env.close()
+
+
+class ShouldRaiseValueErrorOnMismatchedBatchStep(TestCase):
+    def test(self):
+        env = create_smb1_batch()
+        env.reset()
+        # the native batch steps nothing for the wrong number of actions
+        self.assertFalse(_LIB.StepBatch(env._env, env._actions.ctypes.data, 4, 1, False))
+        env.num_envs = 4
+        self.assertRaises(ValueError, env.step, np.zeros(3, dtype=np.uint8))
+        env.num_envs = 3
+        env.close()
+
+
+class ShouldStepBatchEnv(TestCase):
+    def test(self):
+        env = create_smb1_batch()
+        screens = env.reset()
+        self.assertEqual((3, 240, 256, 3), screens.shape)
+        self.assertTrue(screens.flags['C_CONTIGUOUS'])
+        for _ in range(20):
+            output = env.step(env.action_space.sample())
+            self.assertEqual(4, len(output))
+            screens, rewards, dones, infos = output
+            self.assertEqual((3, 240, 256, 3), screens.shape)
+            self.assertEqual((3, ), rewards.shape)
+            self.assertEqual(np.float64, rewards.dtype)
+            self.assertEqual((3, ), dones.shape)
+            self.assertEqual(np.bool_, dones.dtype)
+            self.assertEqual(3, len(infos))
+        env.close()
+        # trying to close again should raise an error
+        self.assertRaises(ValueError, env.close)
+
+
+class ShouldMatchIndependentEnvs(TestCase):
+    def test(self):
+        batch = create_smb1_batch(frameskip=2)
+        envs = [NESEnv(rom_file_abs_path('super-mario-bros-1.nes')) for _ in range(3)]
+        batch.reset()
+        for env in envs:
+            env.reset()
+        rng = np.random.RandomState(1)
+        for step in range(40):
+            actions = rng.randint(256, size=3).astype(np.uint8)
+            if step % 10 == 0:
+                actions[step % 3] = 8
+            screens, _, _, _ = batch.step(actions)
+            for index, env in enumerate(envs):
+                state, _, _, _ = env.step(actions[index], frameskip=2)
+                self.assertTrue(np.array_equal(state, screens[index]))
+                self.assertTrue(np.array_equal(env.ram, batch.rams[index]))
+        batch.close()
+        for env in envs:
+            env.close()
+
+
+class ShouldRaiseValueErrorOnInvalidThreads(TestCase):
+    def test(self):
+        self.assertRaises(ValueError, create_smb1_batch, num_threads=0)
+
+
+class ShouldMatchSerialBatchWithThreads(TestCase):
+    def test(self):
+        serial = create_smb1_batch(5)
+        threaded = create_smb1_batch(5, num_threads=3, cores=[0])
+        serial.reset()
+        threaded.reset()
+        rng = np.random.RandomState(1)
+        for step in range(40):
+            actions = rng.randint(256, size=5).astype(np.uint8)
+            if step % 10 == 0:
+                actions[step % 5] = 8
+            serial.step(actions)
+            threaded.step(actions)
+            self.assertTrue(np.array_equal(serial.screens, threaded.screens))
+            for index in range(5):
+                self.assertTrue(np.array_equal(serial.rams[index], threaded.rams[index]))
+        serial.close()
+        threaded.close()
+
+
+class ShouldResetFinishedEnvsInBatch(TestCase):
+    def test(self):
+        class FirstEnvAlwaysDone(VectorNESEnv):
+            resets = []
+            def _get_done(self):
+                return np.arange(self.num_envs) == 0
+            def _did_reset(self, index):
+                self.resets.append(index)
+
+        env = FirstEnvAlwaysDone(rom_file_abs_path('super-mario-bros-1.nes'), 2)
+        env.reset()
+        self.assertEqual([0, 1], env.resets)
+        _, _, dones, _ = env.step(np.zeros(2, dtype=np.uint8))
+        self.assertEqual([True, False], dones.tolist())
+        self.assertEqual([0, 1, 0], env.resets)
+        # the finished environment was reset so the batch can keep stepping
+        env.step(np.zeros(2, dtype=np.uint8))
+        env.close()
@@ -0,0 +1,244 @@
+"""A batch of NES environments stepped by a single native call."""
+import ctypes
+from gym.spaces import Box
+from gym.spaces import MultiDiscrete
+import numpy as np
+from .nes_env import _LIB
+from .nes_env import _validate_rom
+from .nes_env import NESEnv
+from .nes_env import RAM_VECTOR
+from .nes_env import SCREEN_SHAPE_24_BIT
+
+
+class VectorNESEnv(object):
+    """A batch of NES environments that step with a single native call."""
+
+    # relevant meta-data about the environment
+    metadata = {
+        'render.modes': ['rgb_array'],
+        'video.frames_per_second': NESEnv.metadata['video.frames_per_second']
+    }
+
+    # the legal range for rewards for this environment
+    reward_range = NESEnv.reward_range
+
+    def __init__(self, rom_path, num_envs,
+        frameskip=1,
+        max_pool=False,
+        num_threads=1,
+        cores=None,
+    ):
+        """
+        Create a new batch of NES environments.
+
+        Args:
+            rom_path (str): the path to the ROM for the environments
+            num_envs (int): the number of environments in the batch
+            frameskip (int): the number of frames to hold each action for
+            max_pool (bool): whether to observe the pixel-wise maximum of the
+                last two frames of each step
+            num_threads (int): the number of native threads to step the
+                batch with, where 1 steps the emulators serially
+            cores (list): the CPU cores to pin the native threads to, where
+                None leaves the threads unpinned (pinning requires Linux)
+
+        """
+        # make sure the emulator can run the ROM
+        _validate_rom(rom_path)
+        if num_envs < 1:
+            raise ValueError('num_envs must be a positive integer')
+        if frameskip < 1:
+            raise ValueError('frameskip must be a positive integer')
+        if num_threads < 1:
+            raise ValueError('num_threads must be a positive integer')
+        # create a dedicated random number generator for the environments
+        self.np_random = np.random.RandomState()
+        # store the ROM path and the step settings
+        self._rom_path = rom_path
+        self.num_envs = num_envs
+        self.frameskip = frameskip
+        self.max_pool = max_pool
+        # setup the spaces for a single environment and for the batch
+        self.single_observation_space = NESEnv.observation_space
+        self.single_action_space = NESEnv.action_space
+        self.observation_space = Box(
+            low=0,
+            high=255,
+            shape=(num_envs, *SCREEN_SHAPE_24_BIT),
+            dtype=np.uint8
+        )
+        self.action_space = MultiDiscrete([self.single_action_space.n] * num_envs)
+        # initialize the C++ object for running the environments
+        self._env = _LIB.InitializeBatch(self._rom_path, num_envs)
+        self._emulators = [_LIB.BatchEmulator(self._env, index) for index in range(num_envs)]
+        # start the native worker threads that step the batch
+        cores = [] if cores is None else list(cores)
+        self.num_threads = num_threads
+        _LIB.SetBatchThreads(
+            self._env,
+            num_threads,
+            (ctypes.c_int * len(cores))(*cores),
+            len(cores)
+        )
+        # setup a placeholder for a pointer to a backup state
+        self._has_backup = False
+        # setup the done flags
+        self.dones = np.ones(num_envs, dtype=bool)
+        # setup the action, screen, and RAM buffers
+        self._actions = np.zeros(num_envs, dtype=np.uint8)
+        self.screens = self._screen_buffer()
+        self.rams = [self._ram_buffer(emulator) for emulator in self._emulators]
+
+    def _screen_buffer(self):
+        """Setup the batch screen buffer from the C++ code."""
+        # get the address of the screens
+        address = _LIB.ScreenBatch(self._env)
+        # create a buffer from the contents of the address location
+        tensor = ctypes.c_byte * int(np.prod(self.observation_space.shape))
+        buffer_ = ctypes.cast(address, ctypes.POINTER(tensor)).contents
+        # create a NumPy array from the buffer and shape it as the batch
+        screens = np.frombuffer(buffer_, dtype='uint8')
+        return screens.reshape(self.observation_space.shape)
+
+    @staticmethod
+    def _ram_buffer(emulator):
+        """Setup the RAM buffer of an emulator in the batch."""
+        # get the address of the RAM
+        address = _LIB.Memory(emulator)
+        # create a buffer from the contents of the address location
+        buffer_ = ctypes.cast(address, ctypes.POINTER(RAM_VECTOR)).contents
+        # create a NumPy array from the buffer
+        return np.frombuffer(buffer_, dtype='uint8')
+
+    def _backup(self):
+        """Backup the NES state in every emulator of the batch."""
+        for emulator in self._emulators:
+            _LIB.Backup(emulator)
+        self._has_backup = True
+
+    def _reset_index(self, index):
+        """Reset the environment at an index in the batch."""
+        # call the before reset callback
+        self._will_reset(index)
+        # reset the emulator
+        if self._has_backup:
+            _LIB.Restore(self._emulators[index])
+        else:
+            _LIB.Reset(self._emulators[index])
+        # call the after reset callback
+        self._did_reset(index)
+        # copy the new screen into the batch screens
+        _LIB.ObserveBatch(self._env, index)
+        self.dones[index] = False
+
+    def _will_reset(self, index):
+        """Handle any RAM hacking before the environment at index resets."""
+        pass
+
+    def seed(self, seed=None):
+        """Set the seed for this environment's RNG."""
+        if seed is None:
+            return []
+        self.np_random.seed(seed)
+        return [seed]
+
+    def reset(self, seed=None):
+        """
+        Reset every environment in the batch and return the observations.
+
+        Args:
+            seed (int): an optional seed for the random number generator
+
+        Returns:
+            (numpy.ndarray) the screens of the batch
+
+        """
+        self.seed(seed)
+        for index in range(self.num_envs):
+            self._reset_index(index)
+        return self.screens
+
+    def _did_reset(self, index):
+        """Handle any RAM hacking after the environment at index resets."""
+        pass
+
+    def step(self, actions):
+        """
+        Run a step of every environment in the batch.
+
+        Environments that finish an episode reset immediately, so the
+        returned screens of those environments are initial observations.
+
+        Args:
+            actions (numpy.ndarray): the button bitmap for each environment
+
+        Returns:
+            a tuple of:
+            - (numpy.ndarray) the screens of the batch
+            - (numpy.ndarray) the reward of each environment
+            - (numpy.ndarray) the done flag of each environment
+            - (list) a dictionary of extra information per environment
+
+        """
+        if self.dones.any():
+            raise ValueError('cannot step in a done environment! call `reset`')
+        # copy the actions into the contiguous native action buffer
+        self._actions[:] = actions
+        # step every emulator and refresh the screens in one native call
+        stepped = _LIB.StepBatch(
+            self._env,
+            self._actions.ctypes.data,
+            self.num_envs,
+            self.frameskip,
+            self.max_pool
+        )
+        if not stepped:
+            msg = 'the batch has a different number of emulators than {} environments'
+            raise ValueError(msg.format(self.num_envs))
+        # get the rewards, done flags, and info for this step
+        rewards = np.array(self._get_reward(), dtype=np.float64)
+        dones = np.array(self._get_done(), dtype=bool)
+        infos = self._get_info()
+        # call the after step callback
+        self._did_step(dones)
+        # bound the rewards
+        np.clip(rewards, *self.reward_range, out=rewards)
+        # reset the environments that finished an episode
+        for index in np.flatnonzero(dones):
+            self._reset_index(index)
+        return self.screens, rewards, dones, infos
+
+    def _get_reward(self):
+        """Return the reward of each environment after a step occurs."""
+        return np.zeros(self.num_envs)
+
+    def _get_done(self):
+        """Return the done flag of each environment after a step occurs."""
+        return np.zeros(self.num_envs, dtype=bool)
+
+    def _get_info(self):
+        """Return the info of each environment after a step occurs."""
+        return [{} for _ in range(self.num_envs)]
+
+    def _did_step(self, dones):
+        """Handle any RAM hacking after a step occurs."""
+        pass
+
+    def close(self):
+        """Close the environments."""
+        if self._env is None:
+            raise ValueError('env has already been closed.')
+        _LIB.CloseBatch(self._env)
+        self._env = None
+
+    def render(self, mode='rgb_array'):
+        """Render the environments as a batch of screens."""
+        if mode == 'rgb_array':
+            return self.screens
+        render_modes = [repr(x) for x in self.metadata['render.modes']]
+        msg = 'valid render modes are: {}'.format(', '.join(render_modes))
+        raise NotImplementedError(msg)
+
+
+# explicitly define the outward facing API of this module
+__all__ = [VectorNESEnv.__name__]
@@ -0,0 +1,53 @@
+"""Benchmark the throughput of backing up and restoring the emulator."""
+import argparse
+import time
+from nes_py import NESEnv
+
+
+# the ROMs to benchmark with (one without and one with mapper state)
+ROM_PATHS = [
+    './nes_py/tests/games/super-mario-bros-1.nes',
+    './nes_py/tests/games/the-legend-of-zelda.nes',
+]
+
+
+def benchmark(function, count):
+    """
+    Return the calls per second of a function.
+
+    Args:
+        function (callable): the function to call
+        count (int): the number of times to call the function
+
+    Returns:
+        (float) the number of calls per second
+
+    """
+    start = time.time()
+    for _ in range(count):
+        function()
+    return count / (time.time() - start)
+
+
+def main():
+    """Run the backup / restore benchmark and print a table of the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', '-c', type=int, default=100000,
+        help='the number of calls per benchmark',
+    )
+    args = parser.parse_args()
+    print('{:<32}{:>12}{:>12}'.format('ROM', 'method', 'calls/s'))
+    for rom_path in ROM_PATHS:
+        env = NESEnv(rom_path)
+        env.reset()
+        for _ in range(200):
+            env.step(0)
+        name = rom_path.split('/')[-1]
+        for method in (env._backup, env._restore, env.reset):
+            calls = benchmark(method, args.count)
+            print('{:<32}{:>12}{:>12.1f}'.format(name, method.__name__, calls))
+        env.close()
+
+
+if __name__ == '__main__':
+    main()
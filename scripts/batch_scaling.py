@@ -0,0 +1,116 @@
+"""Compare the throughput of the ways to run many environments in parallel."""
+import argparse
+from multiprocessing import Process
+import os
+from threading import Thread
+import time
+import numpy as np
+from nes_py import NESEnv
+from nes_py import VectorNESEnv
+
+
+# the ROM to benchmark with
+ROM_PATH = './nes_py/tests/games/super-mario-bros-1.nes'
+
+
+def play(steps):
+    """
+    Play the environment making uniformly random decisions.
+
+    Args:
+        steps (int): the number of steps to take
+
+    Returns:
+        None
+
+    """
+    env = NESEnv(ROM_PATH)
+    done = True
+    for _ in range(steps):
+        if done:
+            _ = env.reset()
+        action = env.action_space.sample()
+        _, _, done, _ = env.step(action)
+    env.close()
+
+
+def benchmark_parallel(parallel_initializer, num_envs, steps):
+    """
+    Return the frames per second of independent environments in parallel.
+
+    Args:
+        parallel_initializer (type): the class to run each environment with
+            (i.e., Thread or Process)
+        num_envs (int): the number of environments to run
+        steps (int): the number of steps to take per environment
+
+    Returns:
+        (float) the total frames per second across all environments
+
+    """
+    procs = [parallel_initializer(target=play, args=(steps, )) for _ in range(num_envs)]
+    start = time.time()
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    return num_envs * steps / (time.time() - start)
+
+
+def benchmark_batch(num_envs, steps, num_threads, cores=None):
+    """
+    Return the frames per second of a batch of environments.
+
+    Args:
+        num_envs (int): the number of environments in the batch
+        steps (int): the number of steps to take per environment
+        num_threads (int): the number of native threads to step the batch with
+        cores (list): the CPU cores to pin the native threads to
+
+    Returns:
+        (float) the total frames per second across all environments
+
+    """
+    env = VectorNESEnv(ROM_PATH, num_envs, num_threads=num_threads, cores=cores)
+    env.reset()
+    start = time.time()
+    for _ in range(steps):
+        env.step(env.action_space.sample())
+    fps = num_envs * steps / (time.time() - start)
+    env.close()
+    return fps
+
+
+def main():
+    """Run the scaling benchmark and print a table of the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--envs', '-e', type=int, default=8,
+        help='the number of environments to run',
+    )
+    parser.add_argument('--steps', '-s', type=int, default=1000,
+        help='the number of steps to take per environment',
+    )
+    parser.add_argument('--threads', '-t', type=int, default=os.cpu_count(),
+        help='the maximal number of native threads to scale the batch to',
+    )
+    parser.add_argument('--pin', '-p', action='store_true',
+        help='whether to pin native thread i to core i',
+    )
+    args = parser.parse_args()
+    print('{:<28}{:>12}'.format('method', 'frames/s'))
+    fps = benchmark_parallel(Thread, args.envs, args.steps)
+    print('{:<28}{:>12.1f}'.format('NESEnv x Thread', fps))
+    fps = benchmark_parallel(Process, args.envs, args.steps)
+    print('{:<28}{:>12.1f}'.format('NESEnv x Process', fps))
+    # scale the native threads by powers of two up to the maximum
+    threads = [2**power for power in range(int(np.log2(args.threads)) + 1)]
+    threads = sorted(set(threads) | {args.threads})
+    for num_threads in threads:
+        cores = list(range(num_threads)) if args.pin else None
+        fps = benchmark_batch(args.envs, args.steps, num_threads, cores)
+        name = 'VectorNESEnv ({} threads)'.format(num_threads)
+        print('{:<28}{:>12.1f}'.format(name, fps))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark the frames per second of the emulator on the bundled ROMs."""
+import argparse
+import time
+import numpy as np
+from nes_py import NESEnv
+
+
+# the ROMs to benchmark with (one per supported mapper)
+ROM_PATHS = [
+    './nes_py/tests/games/super-mario-bros-1.nes',
+    './nes_py/tests/games/excitebike.nes',
+    './nes_py/tests/games/super-mario-bros-lost-levels.nes',
+    './nes_py/tests/games/the-legend-of-zelda.nes',
+]
+
+
+def benchmark(env, frames, frameskip, seed):
+    """
+    Return the frames per second of an environment taking random actions.
+
+    Args:
+        env (NESEnv): the environment to benchmark
+        frames (int): the number of frames to run
+        frameskip (int): the number of frames per step, of which only the
+            last is drawn
+        seed (int): the seed of the random actions
+
+    Returns:
+        (float) the number of frames per second
+
+    """
+    rng = np.random.RandomState(seed)
+    env.reset()
+    # press start to leave the title screen, then play random actions
+    actions = rng.randint(256, size=frames // frameskip) & ~0x0c
+    actions[30 // frameskip] = 8
+    start = time.time()
+    for action in actions:
+        env.step(int(action), frameskip=frameskip)
+    return len(actions) * frameskip / (time.time() - start)
+
+
+def main():
+    """Run the FPS benchmark and print a table of the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', '-f', type=int, default=20000,
+        help='the number of frames to run per benchmark',
+    )
+    parser.add_argument('--repeats', '-r', type=int, default=3,
+        help='the number of runs per benchmark (the fastest is reported)',
+    )
+    args = parser.parse_args()
+    print('{:<40}{:>16}{:>16}'.format('ROM', 'draw all fps', 'draw 1/60 fps'))
+    for rom_path in ROM_PATHS:
+        env = NESEnv(rom_path)
+        fps = [
+            max(benchmark(env, args.frames, frameskip, seed) for seed in range(args.repeats))
+            for frameskip in (1, 60)
+        ]
+        name = rom_path.split('/')[-1]
+        print('{:<40}{:>16.1f}{:>16.1f}'.format(name, *fps))
+        env.close()
+
+
+if __name__ == '__main__':
+    main()
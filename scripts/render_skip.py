@@ -0,0 +1,63 @@
+"""Benchmark the throughput gain of skipping the drawing of frames."""
+import argparse
+import time
+from nes_py import NESEnv
+
+
+# the ROM to benchmark with
+ROM_PATH = './nes_py/tests/games/super-mario-bros-1.nes'
+
+
+def benchmark(step, frames):
+    """
+    Return the frames per second of a function that steps the emulator.
+
+    Args:
+        step (callable): a function that runs a frame with a frame index
+        frames (int): the number of frames to run
+
+    Returns:
+        (float) the number of frames per second
+
+    """
+    start = time.time()
+    for frame in range(frames):
+        step(frame)
+    return frames / (time.time() - start)
+
+
+def main():
+    """Run the render-skip benchmark and print a table of the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--frames', '-f', type=int, default=10000,
+        help='the number of frames to run per benchmark',
+    )
+    parser.add_argument('--frameskip', '-k', type=int, default=4,
+        help='the number of frames per step of the frameskip benchmarks',
+    )
+    args = parser.parse_args()
+    env = NESEnv(ROM_PATH)
+    env.reset()
+    # hold right after starting the game to scroll through the level
+    action = lambda frame: 8 if frame % 1000 == 30 else 0b10000010
+    print('{:<32}{:>12}'.format('method', 'frames/s'))
+    fps = benchmark(lambda frame: env._frame_advance(action(frame)), args.frames)
+    print('{:<32}{:>12.1f}'.format('render every frame', fps))
+    fps = benchmark(lambda frame: env._frame_advance(action(frame), render=False), args.frames)
+    print('{:<32}{:>12.1f}'.format('skip drawing every frame', fps))
+    # frameskip steps draw only the last frame
+    steps = args.frames // args.frameskip
+    def draw_all(frame):
+        for _ in range(args.frameskip):
+            env._frame_advance(action(frame))
+    fps = args.frameskip * benchmark(draw_all, steps)
+    name = 'frameskip {} (draw all)'.format(args.frameskip)
+    print('{:<32}{:>12.1f}'.format(name, fps))
+    fps = args.frameskip * benchmark(lambda frame: env.step(action(frame), frameskip=args.frameskip), steps)
+    name = 'frameskip {} (draw last)'.format(args.frameskip)
+    print('{:<32}{:>12.1f}'.format(name, fps))
+    env.close()
+
+
+if __name__ == '__main__':
+    main()